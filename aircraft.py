@@ -4,6 +4,8 @@ state.
 import enum
 import logging
 
+from copy import copy
+
 
 class State(enum.Enum):
     """`State` is a enum object that represents a possible state of an aircraft.
@@ -25,11 +27,25 @@ class Aircraft:
 
         self.callsign = callsign
         self.model = model
-        self.location = location
         self.__state = state
 
+        # Spatial index of the airport tracking this aircraft (if any)
+        self.location_index = None
+        self.location = location
+
         self.itinerary = None
 
+    @property
+    def location(self):
+        """Returns the current location of this aircraft."""
+        return self.__location
+
+    @location.setter
+    def location(self, location):
+        self.__location = location
+        if self.location_index is not None:
+            self.location_index.update(self, location)
+
     def set_location(self, location):
         """Sets the location of this aircraft to a given location."""
 
@@ -124,9 +140,21 @@ class Aircraft:
     def __repr__(self):
         return "<Aircraft: %s %s>" % (self.callsign, self.state)
 
+    def __copy__(self):
+        # Copies the mutable state (location and itinerary) only; the copy is
+        # not tracked by any spatial index until an airport links it
+        aircraft = Aircraft.__new__(Aircraft)
+        aircraft.__dict__.update(self.__dict__)
+        aircraft.location_index = None
+        if self.itinerary is not None:
+            aircraft.itinerary = copy(self.itinerary)
+        return aircraft
+
     def __getstate__(self):
         attrs = dict(self.__dict__)
         del attrs["logger"]
+        # The airport owning the index links it again (see `Airport`)
+        attrs["location_index"] = None
         return attrs
 
     def __setstate__(self, attrs):
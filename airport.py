@@ -3,13 +3,15 @@ airport.
 """
 import os
 import logging
-import itertools
 
+from copy import copy
 from collections import deque
 from surface import SurfaceFactory
+from compiled_airport import CompiledAirport
 from config import Config
 from conflict import Conflict
-from utils import get_seconds_after
+from spatial_index import SpatialIndex
+from fleet import Fleet
 
 
 class Airport:
@@ -23,7 +25,15 @@ class Airport:
         self.logger = logging.getLogger(__name__)
 
         # Runtime data
-        self.aircrafts = []
+        self.__aircrafts = []
+
+        # Arrays the aircrafts are ticked with if the fleet engine is enabled
+        # (see `Fleet`); the aircrafts are materialised from it when they're
+        # looked at
+        self.__fleet = None
+
+        # Spatial index of the aircraft locations, updated as they move
+        self.aircraft_index = SpatialIndex()
 
         # Queues for departure flights at gates
         self.gate_queue = {}
@@ -35,6 +45,26 @@ class Airport:
         self.name = name
         self.surface = surface
 
+        # Compiled airport this airport is loaded from if any; only used for
+        # setting up the routing expert
+        self.compiled = None
+
+    @property
+    def aircrafts(self):
+        """Returns the aircrafts currently in this airport."""
+        self.__materialise()
+        return self.__aircrafts
+
+    @aircrafts.setter
+    def aircrafts(self, aircrafts):
+        self.__materialise()
+        self.__aircrafts = aircrafts
+        self.__fleet = None
+
+    def __materialise(self):
+        if self.__fleet is not None:
+            self.__fleet.materialise()
+
     def apply_schedule(self, schedule):
         """Applies a schedule onto the active aircrafts in the airport."""
 
@@ -70,6 +100,8 @@ class Airport:
         we have a cached itinerary for it.
         """
         self.aircrafts.append(aircraft)
+        aircraft.location_index = self.aircraft_index
+        self.aircraft_index.add(aircraft, aircraft.location)
 
         if aircraft in self.itinerary_cache:
             itinerary = self.itinerary_cache[aircraft]
@@ -92,14 +124,10 @@ class Airport:
     def __add_aircrafts_from_scenario(self, scenario, now, sim_time):
 
         # NOTE: we will only focus on departures now
-        next_tick_time = get_seconds_after(now, sim_time)
+        next_tick_time = now + sim_time
 
-        # For all departure flights
-        for flight in scenario.departures:
-
-            # Only if the scheduled appear time is between now and next tick
-            if not (now <= flight.appear_time < next_tick_time):
-                continue
+        # For the departure flights appearing between now and next tick
+        for flight in scenario.get_released_departures(now, next_tick_time):
 
             gate, aircraft = flight.from_gate, flight.aircraft
 
@@ -118,9 +146,7 @@ class Airport:
 
         # Deal with the arrival flights, assume that the runway is always not
         #  occupied because this is an arrival flight
-        for flight in scenario.arrivals:
-            if not (now <= flight.appear_time < next_tick_time):
-                continue
+        for flight in scenario.get_released_arrivals(now, next_tick_time):
             runway, aircraft = flight.runway.start, flight.aircraft
             aircraft.set_location(runway)
             self.add_aircraft(aircraft)
@@ -131,17 +157,22 @@ class Airport:
         """Removes departure aircrafts if they've moved to the runway.
         """
 
+        self.__materialise()
         to_remove_aircrafts = []
 
-        for aircraft in self.aircrafts:
-            flight = scenario.get_flight(aircraft)
-            # Deletion shouldn't be done in the fly
-            if aircraft.location.is_close_to(flight.runway.start):
-                to_remove_aircrafts.append(aircraft)
+        # Only the aircrafts close to a runway start are looked up
+        for runway in self.surface.runways:
+            for aircraft in self.aircraft_index.get_close_items(runway.start):
+                flight = scenario.get_flight(aircraft)
+                # Deletion shouldn't be done in the fly
+                if flight.runway.start == runway.start:
+                    to_remove_aircrafts.append(aircraft)
 
         for aircraft in to_remove_aircrafts:
             self.logger.info("Removes %s from the airport", aircraft)
             self.aircrafts.remove(aircraft)
+            self.aircraft_index.remove(aircraft)
+            aircraft.location_index = None
 
     @property
     def conflicts(self):
@@ -158,50 +189,117 @@ class Airport:
 
     def __get_conflicts(self, is_next=False):
         __conflicts = []
-        aircraft_pairs = list(itertools.combinations(self.aircrafts, 2))
-        for pair in aircraft_pairs:
+
+        # Broad phase: buckets the aircrafts by location so only the ones in
+        # neighbouring cells are compared. The pairs come in the same order as
+        # the combinations of `self.aircrafts`.
+        index = SpatialIndex()
+        for i, aircraft in enumerate(self.aircrafts):
+            index.add(i, aircraft.next_location if is_next
+                      else aircraft.location)
+
+        # Narrow phase
+        for i, j in index.get_close_pairs():
+            pair = (self.aircrafts[i], self.aircrafts[j])
             if is_next:
                 loc1, loc2 = pair[0].next_location, pair[1].next_location
             else:
                 loc1, loc2 = pair[0].location, pair[1].location
-            if not loc1.is_close_to(loc2):
-                continue
             __conflicts.append(Conflict((loc1, loc2), pair))
         return __conflicts
 
     def is_occupied_at(self, node):
         """Check if an aircraft is occupied at the given node."""
-        for aircraft in self.aircrafts:
-            if aircraft.location.is_close_to(node):
-                return True
-        return False
+        self.__materialise()
+        return self.aircraft_index.has_close_item(node)
 
     def tick(self):
         """Ticks on all subobjects under the airport to move them into the next
         state.
         """
-        for aircraft in self.aircrafts:
-            aircraft.tick()
+        if not Config.params["simulation"]["fleet_engine"]:
+            self.__materialise()
+            self.__fleet = None
+            for aircraft in self.__aircrafts:
+                aircraft.tick()
+            return
+
+        if self.__fleet is None or not self.__fleet.track(self.__aircrafts):
+            self.__materialise()
+            self.__fleet = Fleet(self.__aircrafts)
+        self.__fleet.tick()
 
     def print_stats(self):
         """Prints a summary of the current airport state.
         """
         self.surface.print_stats()
 
+    def __copy__(self):
+        # The surface is static so it's shared; only the aircrafts (their
+        # locations and itineraries) and the queues are copied. Objects shared
+        # between the aircraft list, the queues and the itinerary cache are
+        # copied once so they're still shared in the copy.
+        self.__materialise()
+        airport = Airport.__new__(Airport)
+        airport.__dict__.update(self.__dict__)
+
+        aircrafts = {}
+        itineraries = {}
+
+        def copy_aircraft(aircraft):
+            if id(aircraft) not in aircrafts:
+                new_aircraft = copy(aircraft)
+                if aircraft.itinerary is not None:
+                    new_aircraft.itinerary = itineraries.setdefault(
+                        id(aircraft.itinerary), new_aircraft.itinerary)
+                aircrafts[id(aircraft)] = new_aircraft
+            return aircrafts[id(aircraft)]
+
+        def copy_itinerary(itinerary):
+            if id(itinerary) not in itineraries:
+                itineraries[id(itinerary)] = copy(itinerary)
+            return itineraries[id(itinerary)]
+
+        airport.aircrafts = [copy_aircraft(a) for a in self.aircrafts]
+        airport.gate_queue = {
+            gate: deque(copy_aircraft(a) for a in queue)
+            for gate, queue in self.gate_queue.items()
+        }
+        airport.itinerary_cache = {
+            copy_aircraft(aircraft): copy_itinerary(itinerary)
+            for aircraft, itinerary in self.itinerary_cache.items()
+        }
+
+        airport.aircraft_index = self.aircraft_index.copy(
+            {aircraft: copy_aircraft(aircraft)
+             for aircraft in self.aircraft_index.locations})
+        for aircraft in airport.aircrafts:
+            aircraft.location_index = airport.aircraft_index
+
+        return airport
+
     def __getstate__(self):
+        self.__materialise()
         attrs = dict(self.__dict__)
         del attrs["logger"]
+        # The compiled airport holds a memory map
+        attrs["compiled"] = None
+        attrs["_Airport__fleet"] = None
         return attrs
 
     def __setstate__(self, attrs):
         self.__dict__.update(attrs)
+        for aircraft in self.aircrafts:
+            aircraft.location_index = self.aircraft_index
 
-    def set_quiet(self, logger):
+    def set_quiet(self, logger, include_surface=True):
         """Puts the aircraft object to quiet mode where only important logs are
-        printed.
+        printed. The surface may be shared with other airports (see
+        `__copy__`); it's left untouched if `include_surface` is false.
         """
         self.logger = logger
-        self.surface.set_quiet(logger)
+        if include_surface:
+            self.surface.set_quiet(logger)
         for aircraft in self.aircrafts:
             aircraft.set_quiet(logger)
         for queue in self.gate_queue.values():
@@ -220,5 +318,12 @@ class Airport:
         if not os.path.exists(dir_path):
             raise Exception("Surface data is missing")
 
+        # Uses the compiled airport if it's up to date
+        compiled = CompiledAirport.load(name)
+        if compiled is not None:
+            airport = Airport(name, compiled.surface)
+            airport.compiled = compiled
+            return airport
+
         surface = SurfaceFactory.create(dir_path)
         return Airport(name, surface)
@@ -9,8 +9,9 @@ import json
 import matplotlib.pyplot as plt
 import pandas as pd
 
-from utils import get_time_delta, get_output_dir_name
+from utils import get_output_dir_name, format_seconds
 from config import Config
+from snapshot import Snapshot
 
 
 class TaxitimeMetric():
@@ -24,15 +25,14 @@ class TaxitimeMetric():
         self.moving_aircraft_count_on_tick = 0
         self.sim_time = sim_time
 
-    def update_on_tick(self, aircrafts, scenario):
-        """Updates the metric with the current aircrafts states and the
-        scenario.
+    def update_on_tick(self, aircrafts, snapshot):
+        """Updates the metric with the active aircrafts and the snapshot of
+        the current tick.
         """
 
         for aircraft in aircrafts:
             # If an aircraft is not close to its gate, it's on its taxiway
-            flight = scenario.get_flight(aircraft)
-            if not aircraft.location.is_close_to(flight.from_gate):
+            if not snapshot.is_at_gate(aircraft):
                 self.moving_aircraft_count_on_tick += 1
 
     @property
@@ -69,13 +69,12 @@ class MakespanMetric():
 
     @property
     def __is_ready(self):
-        return self.aircraft_first_time and self.aircraft_last_time
+        return self.aircraft_first_time is not None
 
     @property
     def makespan(self):
         """Returns the makespan value."""
-        return (get_time_delta(self.aircraft_last_time,
-                               self.aircraft_first_time)
+        return (self.aircraft_last_time - self.aircraft_first_time
                 if self.__is_ready else 0)
 
     @property
@@ -177,22 +176,33 @@ class GateQueueMetric():
 
 class ExecutionTimeMetric():
     """`ExecutionTimeMetric` logs the execution time taken each time the
-    scheduler schedules.
+    scheduler schedules and how long it runs over the time budget (see
+    `time_budget_ms`).
     """
 
     def __init__(self):
-        # Reschedule execution time
-        self.rs_exec_time = pd.DataFrame(columns=["rs_exec_time"])
+        # Reschedule execution time and the time over the budget in seconds
+        self.rs_exec_time = pd.DataFrame(
+            columns=["rs_exec_time", "rs_over_budget"])
 
     def update_on_reschedule(self, rs_exec_time, now):
         """Updates the metric with the execution time taken for scheduling."""
+        budget = Config.params["scheduler"]["time_budget_ms"]
+        over_budget = 0.0 if budget is None \
+            else max(0.0, rs_exec_time - budget / 1000.0)
         self.rs_exec_time.set_value(now, "rs_exec_time", rs_exec_time)
+        self.rs_exec_time.set_value(now, "rs_over_budget", over_budget)
 
     @property
     def avg_reschedule_exec_time(self):
         """Returns the reschedule execution time."""
         return self.rs_exec_time["rs_exec_time"].mean()
 
+    @property
+    def n_over_budget(self):
+        """Returns the number of reschedules running over the budget."""
+        return int((self.rs_exec_time["rs_over_budget"] > 0).sum())
+
     @property
     def summary(self):
         """Returns a summary string of this metric."""
@@ -202,9 +212,11 @@ class ExecutionTimeMetric():
 
         rst = self.rs_exec_time
 
-        return "Reschedule execution time: top %d low %d mean %d" % (
-            rst.max(), rst.min(), rst.mean()
-        )
+        return "Reschedule execution time: top %d low %d mean %d, " \
+            "%d over budget" % (
+                rst["rs_exec_time"].max(), rst["rs_exec_time"].min(),
+                rst["rs_exec_time"].mean(), self.n_over_budget
+            )
 
 
 class DelayMetric():
@@ -216,20 +228,12 @@ class DelayMetric():
             columns=["n_scheduler_delay", "n_uncertainty_delay"]
         )
 
-    def update_on_tick(self, aircrafts, now):
+    def update_on_tick(self, aircrafts, snapshot, now):
         """Updates the metric with the active aircrafts."""
 
-        n_scheduler_delay = len([
-            aircraft for aircraft in aircrafts
-            if aircraft.itinerary is not None and
-            aircraft.itinerary.is_delayed_by_scheduler
-        ])
-
-        n_uncertainty_delay = len([
-            aircraft for aircraft in aircrafts
-            if aircraft.itinerary is not None and
-            aircraft.itinerary.is_delayed_by_uncertainty
-        ])
+        delays = [snapshot.get_delay(aircraft) for aircraft in aircrafts]
+        n_scheduler_delay = len([delay for delay in delays if delay[0]])
+        n_uncertainty_delay = len([delay for delay in delays if delay[1]])
 
         self.delay.set_value(now, "n_scheduler_delay", n_scheduler_delay)
         self.delay.set_value(now, "n_uncertainty_delay", n_uncertainty_delay)
@@ -265,6 +269,30 @@ class DelayMetric():
                                                  delay.min(), delay.mean())
 
 
+class SnapshotMetric():
+    """`SnapshotMetric` logs how many derived quantities were served from the
+    per-tick snapshots (see `Snapshot`) instead of being computed again.
+    """
+
+    def __init__(self):
+        self.hits = {quantity: 0 for quantity in Snapshot.QUANTITIES}
+        self.misses = {quantity: 0 for quantity in Snapshot.QUANTITIES}
+
+    def update_on_tick(self, snapshot):
+        """Updates the metric with the lookups of the snapshot of a tick."""
+        for quantity in Snapshot.QUANTITIES:
+            self.hits[quantity] += snapshot.hits[quantity]
+            self.misses[quantity] += snapshot.misses[quantity]
+
+    @property
+    def summary(self):
+        """Returns a summary string of this metric."""
+        return "Snapshot: %s" % ", ".join(
+            "%s %d hits %d misses" % (quantity, self.hits[quantity],
+                                      self.misses[quantity])
+            for quantity in Snapshot.QUANTITIES)
+
+
 class Analyst:
     """`Analyst` maintains multiple metrics by observing the simulation states
     on tick and schedule events, then generates the final output metrics to
@@ -285,6 +313,7 @@ class Analyst:
         self.gate_queue_metric = GateQueueMetric()
         self.execution_time_metric = ExecutionTimeMetric()
         self.delay_metric = DelayMetric()
+        self.snapshot_metric = SnapshotMetric()
 
         self.__save_airport_name()
 
@@ -292,24 +321,27 @@ class Analyst:
         """Observe the simulation state on tick."""
 
         now = simulation.now
+        time = format_seconds(now)
         airport = simulation.airport
         aircrafts = airport.aircrafts
-        scenario = simulation.scenario
-        conflicts = simulation.airport.conflicts
+        snapshot = simulation.snapshot
+        conflicts = snapshot.conflicts
 
-        self.taxitime_metric.update_on_tick(aircrafts, scenario)
+        self.taxitime_metric.update_on_tick(aircrafts, snapshot)
         self.makespan_metric.update_on_tick(aircrafts, now)
-        self.aircraft_count_metric.update_on_tick(aircrafts, now)
-        self.conflict_metric.update_on_tick(conflicts, now)
-        self.gate_queue_metric.update_on_tick(airport, now)
-        self.delay_metric.update_on_tick(aircrafts, now)
+        # Metrics logged per tick are indexed by the formatted time
+        self.aircraft_count_metric.update_on_tick(aircrafts, time)
+        self.conflict_metric.update_on_tick(conflicts, time)
+        self.gate_queue_metric.update_on_tick(airport, time)
+        self.delay_metric.update_on_tick(aircrafts, snapshot, time)
+        self.snapshot_metric.update_on_tick(snapshot)
 
     def observe_on_reschedule(self, simulation):
         """Observe the simulation state on reschedule."""
 
-        now = simulation.now
+        time = format_seconds(simulation.now)
         self.execution_time_metric.update_on_reschedule(
-            simulation.last_schedule_exec_time, now)
+            simulation.last_schedule_exec_time, time)
 
     def print_summary(self):
         """Prints the summary."""
@@ -321,6 +353,7 @@ class Analyst:
         self.logger.debug(self.gate_queue_metric.summary)
         self.logger.debug(self.execution_time_metric.summary)
         self.logger.debug(self.delay_metric.summary)
+        self.logger.debug(self.snapshot_metric.summary)
 
     def save(self):
         """Saves the output metrics to file."""
@@ -378,11 +411,15 @@ class Analyst:
             "avg_queue_size": self.gate_queue_metric.avg_queue_size,
             "avg_reschedule_exec_time":
             self.execution_time_metric.avg_reschedule_exec_time,
+            "n_reschedule_over_budget":
+            self.execution_time_metric.n_over_budget,
             "n_delay": self.delay_metric.n_delay,
             "n_scheduler_delay":
             self.delay_metric.n_scheduler_delay,
             "n_uncertainty_delay":
-            self.delay_metric.n_uncertainty_delay
+            self.delay_metric.n_uncertainty_delay,
+            "snapshot_hits": self.snapshot_metric.hits,
+            "snapshot_misses": self.snapshot_metric.misses
         }
         with open(filename, "w") as fout:
             fout.write(json.dumps(response, indent=4))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Benchmarks the conflict detection of `Airport` against the pairwise scan it
+replaced by placing an increasing number of aircrafts on random nodes of an
+airport surface.
+
+Example:
+
+    $ ./benchmarks/conflict_detection.py
+    $ ./benchmarks/conflict_detection.py -a sfo-all-terminals -n 10 100 1000
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import itertools
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airport import Airport
+from aircraft import Aircraft, State
+from conflict import Conflict
+from config import Config
+
+
+def get_pairwise_conflicts(aircrafts):
+    """Returns the conflicts found by comparing every pair of aircrafts."""
+    conflicts = []
+    for pair in itertools.combinations(aircrafts, 2):
+        loc1, loc2 = pair[0].location, pair[1].location
+        if loc1.is_close_to(loc2):
+            conflicts.append(Conflict((loc1, loc2), pair))
+    return conflicts
+
+
+def measure(func, repeat):
+    """Returns the best execution time of `func` in seconds and its result."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    """Main function of the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-a", "--airport", default="sfo-all-terminals")
+    parser.add_argument("-n", "--n-aircrafts", type=int, nargs="+",
+                        default=[10, 30, 100, 300, 1000])
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("--skip-pairwise", action="store_true",
+                        help="Skips the pairwise scan (slow on large n)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    Config.params["simulation"]["cache"] = False
+
+    airport = Airport.create(args.airport)
+    nodes = []
+    for link in airport.surface.links:
+        nodes += link.nodes
+
+    print("%8s %14s %14s %10s" % ("aircraft", "grid (ms)", "pairwise (ms)",
+                                  "conflicts"))
+
+    rand = random.Random(0)
+    for n_aircrafts in args.n_aircrafts:
+        airport.aircrafts = [
+            Aircraft("A%d" % i, None, rand.choice(nodes), State.stop)
+            for i in range(n_aircrafts)
+        ]
+
+        grid_time, conflicts = measure(lambda: airport.conflicts,
+                                       args.repeat)
+
+        if args.skip_pairwise:
+            print("%8d %14.2f %14s %10d" % (n_aircrafts, grid_time * 1000,
+                                            "-", len(conflicts)))
+            continue
+
+        pairwise_time, expected = measure(
+            lambda: get_pairwise_conflicts(airport.aircrafts), 1)
+        if conflicts != expected:
+            raise Exception("Conflicts differ from the pairwise scan")
+
+        print("%8d %14.2f %14.2f %10d" % (n_aircrafts, grid_time * 1000,
+                                          pairwise_time * 1000,
+                                          len(conflicts)))
+
+
+if __name__ == "__main__":
+    main()
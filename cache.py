@@ -1,44 +1,165 @@
-"""`Cache` offers put/get inferface for a simple key-value store on disk."""
+"""`Cache` offers put/get inferface for a simple key-value store on disk.
+
+Keys are content-addressed: they are digests of the inputs an object is
+built from (data files, links and nodes, etc.), the config values that
+change the result, the version of the code building it and `SCHEMA_VERSION`
+of this store. A stale entry is therefore never hit; it is just not used
+anymore and eventually evicted.
+
+Entries are written into a temporary file then renamed so readers (e.g.
+batch workers sharing the same directory) never see a partial file. When
+the store grows over `simulation.cache_max_megabytes`, the least recently
+used entries are removed.
+"""
 import os
+import json
 import pickle
+import hashlib
 import logging
+import tempfile
+
+from config import Config
 
 CACHE_DIR = "./cache/"
 LOGGER = logging.getLogger(__name__)
 
+# Bump this when the way entries are stored changes
+SCHEMA_VERSION = 2
+
+# Counters of the cache usage within this process
+STATS = {"hits": 0, "misses": 0, "puts": 0, "evictions": 0}
+
 
 def put(key, obj):
     """Puts a key value pair into the store."""
     LOGGER.debug("Putting a new cache with key %s", key)
     if not os.path.exists(CACHE_DIR):
-        os.makedirs(CACHE_DIR)
-    with open(CACHE_DIR + key + ".pkl", 'wb') as fout:
-        pickle.dump(obj, fout, pickle.HIGHEST_PROTOCOL)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+
+    # Writes into a temporary file first so readers never see partial data
+    fd, tmp_filepath = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as fout:
+            pickle.dump(obj, fout, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filepath, _get_filepath(key))
+    except BaseException:
+        _remove(tmp_filepath)
+        raise
+
+    STATS["puts"] += 1
+    evict(Config.params["simulation"]["cache_max_megabytes"] * 1024 * 1024)
 
 
 def get(key):
     """Gets the value stored using the given key."""
     LOGGER.debug("Getting a cache with key %s", key)
+    filepath = _get_filepath(key)
     try:
-        with open(CACHE_DIR + key + ".pkl", 'rb') as fout:
-            return pickle.load(fout)
+        with open(filepath, 'rb') as fin:
+            obj = pickle.load(fin)
     except FileNotFoundError:
         LOGGER.debug("No cache file found")
+        STATS["misses"] += 1
         return None
+    except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        LOGGER.warning("Removing unreadable cache file %s", filepath)
+        _remove(filepath)
+        STATS["misses"] += 1
+        return None
+
+    # Marks the entry as recently used for the eviction
+    try:
+        os.utime(filepath)
+    except OSError:
+        pass
+
+    STATS["hits"] += 1
+    return obj
+
+
+def evict(max_bytes):
+    """Removes the least recently used entries until the store takes no more
+    than `max_bytes` bytes.
+    """
+
+    entries = []
+    total_bytes = 0
+    for filename in os.listdir(CACHE_DIR):
+        if not filename.endswith(".pkl"):
+            continue
+        try:
+            stat = os.stat(CACHE_DIR + filename)
+        except FileNotFoundError:
+            # Removed by another process
+            continue
+        entries.append((stat.st_mtime, filename, stat.st_size))
+        total_bytes += stat.st_size
+
+    for _, filename, size in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        LOGGER.debug("Evicting cache file %s", filename)
+        _remove(CACHE_DIR + filename)
+        total_bytes -= size
+        STATS["evictions"] += 1
+
+
+def get_key(namespace, version, content_hash, params=None):
+    """Gets the key of an object of the given `namespace` built by the given
+    `version` of the code from the content whose digest is `content_hash`.
+    `params` are the config values the object depends on.
+    """
+
+    __hash = hashlib.md5()
+    __hash.update(json.dumps([SCHEMA_VERSION, namespace, version,
+                              content_hash, params],
+                             sort_keys=True).encode('utf-8'))
+    return "%s-%s" % (namespace, __hash.hexdigest())
 
 
 def get_hash(links, nodes):
     """Gets the hash value of the given links and nodes."""
 
-    import hashlib
-
-    __hash = 0.0
+    # Object IDs are only valid within a process, so the keys are used
+    __hash = hashlib.md5()
     for link in links:
-        __hash += link.__hash__()
-        __hash += link.__hash__()
+        __hash.update(link.key.encode('utf-8'))
 
     for node in nodes:
-        __hash += node.__hash__()
-        __hash += node.__hash__()
+        __hash.update(node.key.encode('utf-8'))
+
+    return __hash.hexdigest()
+
+
+def get_file_hash(filepaths):
+    """Gets the hash value of the content of the given files."""
+
+    __hash = hashlib.md5()
+    for filepath in filepaths:
+        __hash.update(os.path.basename(filepath).encode('utf-8'))
+        with open(filepath, 'rb') as fin:
+            __hash.update(hashlib.md5(fin.read()).digest())
 
-    return hashlib.md5(('%d' % __hash).encode('utf-8')).hexdigest()
+    return __hash.hexdigest()
+
+
+def get_surface_params():
+    """Gets the config values that change how a surface is built and routed.
+    """
+    params = Config.params["simulation"]
+    return {
+        "close_node_threshold": params["close_node_threshold"],
+        "close_node_link_threshold": params["close_node_link_threshold"],
+        "distance": params["distance"]
+    }
+
+
+def _get_filepath(key):
+    return CACHE_DIR + key + ".pkl"
+
+
+def _remove(filepath):
+    try:
+        os.remove(filepath)
+    except FileNotFoundError:
+        pass
@@ -1,32 +1,40 @@
 """`Clock` keeps the simulated time of the simulation and it raises a
 `ClockException` if it's the end of the day.
 """
-from datetime import time
 from config import Config
-from utils import get_seconds_after
+from utils import format_seconds
 
 
 class Clock:
-    """`Clock` simulates the the virtual time used in the simulation."""
+    """`Clock` simulates the the virtual time used in the simulation. The time
+    is kept in integer seconds since 00:00 of the first day of the scenario,
+    so runs may last more than 24 hours; use `format_seconds` to print it.
+    """
 
     def __init__(self):
 
         # Starts at 00:00
-        self.now = time(0, 0)
+        self.now = 0
         self.sim_time = Config.params["simulation"]["time_unit"]
-        end_time_raw = Config.params["simulation"]["end_time"].split(":")
-        self.end_time = time(int(end_time_raw[0]), int(end_time_raw[1]))
+        self.end_time = self.parse_time(
+            Config.params["simulation"]["end_time"])
+
+    @classmethod
+    def parse_time(cls, time_str):
+        """Parses a "H:MM" string into seconds; hours can be over 23."""
+        hours, minutes = time_str.split(":")
+        return int(hours) * 3600 + int(minutes) * 60
 
     def tick(self):
         """Moves the clock to next tick."""
 
-        time_after_tick = get_seconds_after(self.now, self.sim_time)
+        time_after_tick = self.now + self.sim_time
         if time_after_tick > self.end_time:
             raise ClockException("End of the day")
         self.now = time_after_tick
 
     def __repr__(self):
-        return "<Clock: %s>" % self.now
+        return "<Clock: %s>" % format_seconds(self.now)
 
 
 class ClockException(Exception):
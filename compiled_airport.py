@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""`CompiledAirport` stores an airport surface with its links already broken
+and its routing tables into a single binary file, so a simulation can load
+the airport without parsing the data files, breaking the links and building
+the routes again.
+
+The file starts with `MAGIC`, followed by the length of a JSON header and the
+header itself. The header describes the surface (names, types, etc.) and
+where each NumPy array (node coordinates, link geometry, adjacency and
+routing tables) starts in the file. Arrays are aligned so they are used
+directly from a read-only memory map of the file.
+
+Compile an airport with:
+
+    $ ./compiled_airport.py sfo-all-terminals
+
+`Airport.create` then loads `data/<airport>/build/airport.bin` as long as it
+has been compiled from the same data files, config values and code versions;
+otherwise, the airport is built from the data files as usual.
+"""
+import os
+import sys
+import mmap
+import json
+import struct
+import logging
+import argparse
+import numpy
+import cache
+
+from link import Link
+from config import Config
+from projection import Projection
+from routing_expert import RoutingExpert
+from surface import Surface, SurfaceFactory, Gate, Spot, RunwayNode, \
+    Runway, Taxiway, PushbackWay
+
+
+class CompiledAirport:
+    """`CompiledAirport` is an airport surface and its routing tables loaded
+    from a compiled file.
+    """
+
+    FILENAME = "airport.bin"
+    MAGIC = b"ASSET2AP"
+
+    # Bump this when the layout of the file changes
+    FORMAT_VERSION = 1
+
+    ALIGNMENT = 8
+
+    NODE_TYPES = [Gate, Spot, RunwayNode]
+    LINK_TYPES = [Runway, Taxiway, PushbackWay, Link]
+    LINK_LISTS = ["runways", "taxiways", "pushback_ways"]
+
+    # Edges of the adjacency that are not surface links
+    CLOSE_NODE_LINK = -1
+
+    def __init__(self, surface, index_node, adjacency_map, routing_tables):
+
+        self.surface = surface
+        self.index_node = index_node
+        self.adjacency_map = adjacency_map
+
+        # (depart_routing_table, arrival_routing_table)
+        self.routing_tables = routing_tables
+
+    @classmethod
+    def get_filepath(cls, name):
+        """Returns the filepath of the compiled file of the given airport."""
+        return Config.DATA_ROOT_DIR_PATH % name + cls.FILENAME
+
+    @classmethod
+    def get_source_key(cls, surface):
+        """Returns the key of everything a compiled airport depends on: the
+        data files, the config values, and the versions of the code.
+        """
+        return cache.get_key("airport", [cls.FORMAT_VERSION,
+                                         Surface.CACHE_FORMAT_VERSION,
+                                         RoutingExpert.CACHE_FORMAT_VERSION],
+                             surface.source_hash, cache.get_surface_params())
+
+    @classmethod
+    def compile(cls, name):
+        """Builds the surface and the routing tables of the given airport
+        from its data files and writes them into the compiled file.
+        """
+
+        dir_path = Config.DATA_ROOT_DIR_PATH % name
+        surface = SurfaceFactory.create(dir_path)
+        routing_expert = RoutingExpert(surface.links, surface.nodes, False)
+
+        filepath = cls.get_filepath(name)
+        cls.__write(filepath, cls.__encode(surface, routing_expert))
+        return filepath
+
+    @classmethod
+    def load(cls, name):
+        """Loads the compiled airport of the given name. Returns None if it
+        has not been compiled or it is stale.
+        """
+
+        logger = logging.getLogger(__name__)
+        dir_path = Config.DATA_ROOT_DIR_PATH % name
+        filepath = cls.get_filepath(name)
+        if not os.path.exists(filepath):
+            return None
+
+        header, arrays = cls.__read(filepath)
+        if header is None:
+            logger.warning("Ignoring %s with an unknown format", filepath)
+            return None
+
+        surface = Surface(header["center"], header["corners"],
+                          dir_path + "airport.jpg")
+        surface.source_hash = SurfaceFactory.get_source_hash(dir_path)
+        if header["key"] != cls.get_source_key(surface):
+            logger.info("Ignoring %s compiled from other data or config",
+                        filepath)
+            return None
+
+        return cls.__decode(surface, header, arrays)
+
+    @classmethod
+    def __encode(cls, surface, routing_expert):
+
+        # Nodes are stored once no matter how many links use them
+        nodes, node_index = [], {}
+
+        def get_node_index(node):
+            if node not in node_index:
+                node_index[node] = len(nodes)
+                nodes.append(node)
+            return node_index[node]
+
+        for node in surface.nodes:
+            get_node_index(node)
+
+        links, link_index, link_lists = [], {}, {}
+        link_indptr, link_nodes = [0], []
+        for list_name in cls.LINK_LISTS:
+            link_lists[list_name] = []
+            for link in getattr(surface, list_name):
+                link_lists[list_name].append(len(links))
+                link_index[link] = len(links)
+                links.append(link)
+                link_nodes += [get_node_index(node) for node in link.nodes]
+                link_indptr.append(len(link_nodes))
+
+        # Adjacency of the routing expert over the order of its nodes
+        edge_indptr, edge_indices, edge_links, edge_reversed = [0], [], [], []
+        for node in routing_expert.index_node:
+            for neighbor, link in routing_expert.adjacency_map[node].items():
+                edge_indices.append(routing_expert.node_index[neighbor])
+                if link in link_index:
+                    edge_links.append(link_index[link])
+                    edge_reversed.append(0)
+                elif link.reverse in link_index:
+                    edge_links.append(link_index[link.reverse])
+                    edge_reversed.append(1)
+                else:
+                    edge_links.append(cls.CLOSE_NODE_LINK)
+                    edge_reversed.append(0)
+            edge_indptr.append(len(edge_indices))
+
+        depart_dests = list(routing_expert.depart_routing_table)
+        arrival_dests = list(routing_expert.arrival_routing_table)
+        n_routing_nodes = len(routing_expert.index_node)
+
+        header = {
+            "key": cls.get_source_key(surface),
+            "center": surface.center,
+            "corners": surface.corners,
+            "node_names": [node.name for node in nodes],
+            "node_types": [cls.NODE_TYPES.index(type(node))
+                           for node in nodes],
+            "gate_spots": [get_node_index(node.spot)
+                           if type(node) is Gate and node.spot is not None
+                           else -1 for node in nodes],
+            "link_names": [link.name for link in links],
+            "link_types": [cls.LINK_TYPES.index(type(link))
+                           for link in links],
+            "gates": [node_index[node] for node in surface.gates],
+            "spots": [node_index[node] for node in surface.spots],
+            "link_lists": link_lists,
+        }
+
+        arrays = {
+            "node_lat": numpy.array([n.geo_pos["lat"] for n in nodes],
+                                    dtype=numpy.float64),
+            "node_lng": numpy.array([n.geo_pos["lng"] for n in nodes],
+                                    dtype=numpy.float64),
+            "link_indptr": numpy.array(link_indptr, dtype=numpy.int32),
+            "link_nodes": numpy.array(link_nodes, dtype=numpy.int32),
+            "routing_nodes": numpy.array(
+                [node_index[node] for node in routing_expert.index_node],
+                dtype=numpy.int32),
+            "edge_indptr": numpy.array(edge_indptr, dtype=numpy.int32),
+            "edge_indices": numpy.array(edge_indices, dtype=numpy.int32),
+            "edge_links": numpy.array(edge_links, dtype=numpy.int32),
+            "edge_reversed": numpy.array(edge_reversed, dtype=numpy.int8),
+            "depart_dests": numpy.array(
+                [node_index[node] for node in depart_dests],
+                dtype=numpy.int32),
+            "depart_next_hops": numpy.array(
+                [routing_expert.depart_routing_table[node]
+                 for node in depart_dests],
+                dtype=numpy.int32).reshape(-1, n_routing_nodes),
+            "arrival_dests": numpy.array(
+                [node_index[node] for node in arrival_dests],
+                dtype=numpy.int32),
+            "arrival_next_hops": numpy.array(
+                [routing_expert.arrival_routing_table[node]
+                 for node in arrival_dests],
+                dtype=numpy.int32).reshape(-1, n_routing_nodes),
+        }
+
+        return header, arrays
+
+    @classmethod
+    def __decode(cls, surface, header, arrays):
+
+        Projection.set_origin(surface.center)
+
+        nodes = []
+        for name, node_type, lat, lng in zip(header["node_names"],
+                                             header["node_types"],
+                                             arrays["node_lat"].tolist(),
+                                             arrays["node_lng"].tolist()):
+            geo_pos = {"lat": lat, "lng": lng}
+            node_type = cls.NODE_TYPES[node_type]
+            # Runway nodes keep the names generated when they were compiled
+            nodes.append(node_type(geo_pos, name) if node_type == RunwayNode
+                         else node_type(name, geo_pos))
+
+        for node, spot in zip(nodes, header["gate_spots"]):
+            if spot != -1:
+                node.set_spots(nodes[spot])
+
+        link_indptr = arrays["link_indptr"].tolist()
+        link_nodes = arrays["link_nodes"].tolist()
+        links = [
+            cls.LINK_TYPES[link_type](name, [
+                nodes[i] for i in link_nodes[link_indptr[j]:
+                                             link_indptr[j + 1]]])
+            for j, (name, link_type) in enumerate(zip(header["link_names"],
+                                                      header["link_types"]))
+        ]
+
+        surface.gates = [nodes[i] for i in header["gates"]]
+        surface.spots = [nodes[i] for i in header["spots"]]
+        for list_name in cls.LINK_LISTS:
+            setattr(surface, list_name,
+                    [links[j] for j in header["link_lists"][list_name]])
+
+        index_node = [nodes[i] for i in arrays["routing_nodes"].tolist()]
+        adjacency_map = {node: {} for node in index_node}
+        edge_indptr = arrays["edge_indptr"].tolist()
+        edge_indices = arrays["edge_indices"].tolist()
+        edge_links = arrays["edge_links"].tolist()
+        edge_reversed = arrays["edge_reversed"].tolist()
+        for u, node in enumerate(index_node):
+            for edge in range(edge_indptr[u], edge_indptr[u + 1]):
+                neighbor = index_node[edge_indices[edge]]
+                if edge_links[edge] == cls.CLOSE_NODE_LINK:
+                    link = Link("CLOSE_NODE_LINK", [node, neighbor])
+                elif edge_reversed[edge]:
+                    link = links[edge_links[edge]].reverse
+                else:
+                    link = links[edge_links[edge]]
+                adjacency_map[node][neighbor] = link
+
+        # Rows of the routing tables are views on the memory map
+        routing_tables = tuple(
+            {nodes[dest]: next_hops for dest, next_hops
+             in zip(arrays[name + "_dests"].tolist(),
+                    arrays[name + "_next_hops"])}
+            for name in ["depart", "arrival"])
+
+        return CompiledAirport(surface, index_node, adjacency_map,
+                               routing_tables)
+
+    @classmethod
+    def __write(cls, filepath, header_arrays):
+
+        header, arrays = header_arrays
+
+        # Offsets are relative to the end of the header, which is padded
+        offset, header["arrays"] = 0, {}
+        for name, array in arrays.items():
+            header["arrays"][name] = [array.dtype.str, list(array.shape),
+                                      offset]
+            offset += cls.__get_padded_size(array.nbytes)
+
+        raw_header = json.dumps(header).encode("utf-8")
+        raw_header += b" " * (cls.__get_padded_size(
+            len(cls.MAGIC) + 8 + len(raw_header)) -
+            len(cls.MAGIC) - 8 - len(raw_header))
+
+        tmp_filepath = filepath + ".tmp"
+        with open(tmp_filepath, "wb") as fout:
+            fout.write(cls.MAGIC)
+            fout.write(struct.pack("<Q", len(raw_header)))
+            fout.write(raw_header)
+            for array in arrays.values():
+                raw = numpy.ascontiguousarray(array).tobytes()
+                fout.write(raw)
+                fout.write(b"\0" * (cls.__get_padded_size(len(raw)) -
+                                    len(raw)))
+        os.replace(tmp_filepath, filepath)
+
+    @classmethod
+    def __read(cls, filepath):
+
+        with open(filepath, "rb") as fin:
+            buffer = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+
+        start = len(cls.MAGIC) + 8
+        if buffer[:len(cls.MAGIC)] != cls.MAGIC:
+            return None, None
+        (header_size,) = struct.unpack("<Q", buffer[len(cls.MAGIC):start])
+        header = json.loads(buffer[start:start + header_size].decode("utf-8"))
+
+        arrays = {}
+        for name, (dtype, shape, offset) in header["arrays"].items():
+            dtype = numpy.dtype(dtype)
+            count = int(numpy.prod(shape))
+            arrays[name] = numpy.frombuffer(
+                buffer, dtype=dtype, count=count,
+                offset=start + header_size + offset).reshape(shape)
+
+        return header, arrays
+
+    @classmethod
+    def __get_padded_size(cls, size):
+        return (size + cls.ALIGNMENT - 1) // cls.ALIGNMENT * cls.ALIGNMENT
+
+
+def main():
+    """Compiles the airports given in the command line."""
+
+    parser = argparse.ArgumentParser(
+        description="Compiles airports into binary files for fast loading")
+    parser.add_argument("airports", nargs="+", help="Names of the airports")
+    parser.add_argument("-f", "--plan-filepath",
+                        help="Experiment plan with the config values to use")
+    args = parser.parse_args()
+
+    if args.plan_filepath:
+        Config.load_plan(args.plan_filepath)
+
+    for name in args.airports:
+        print("%s compiled into %s" % (name, CompiledAirport.compile(name)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
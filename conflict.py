@@ -1,5 +1,4 @@
 """Class file for `Conflict`."""
-from utils import str2sha1
 
 
 class Conflict:
@@ -17,15 +16,16 @@ class Conflict:
             callsigns.append(aircraft.callsign)
         callsigns.sort()
 
-        self.hash = str2sha1("%s#%s" %
-                             ("#".join(callsigns),
-                              "#".join(str(self.locations))))
+        self.key = (tuple(callsigns),
+                    tuple(location.id for location in locations)
+                    if locations is not None else None)
+        self.hash = hash(self.key)
 
     def __hash__(self):
         return self.hash
 
     def __eq__(self, other):
-        return self.hash == other.hash
+        return self.key == other.key
 
     def __ne__(self, other):
         return not self == other
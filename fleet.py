@@ -0,0 +1,164 @@
+"""Class file for `Fleet`."""
+import numpy
+
+
+class Fleet:
+    """`Fleet` keeps the itinerary cursors of the aircrafts of an airport as
+    arrays (one row per aircraft) so they're all ticked in one vectorised
+    step instead of one `Aircraft.tick` each. The number of delays held at
+    each node of the routes is flattened into one array; `base[row]` is where
+    the route of a row starts in it.
+
+    The aircrafts and their itineraries aren't touched while ticking: they're
+    brought up to date (materialised) from the arrays by `materialise()`,
+    which the airport calls before anything looks at its aircrafts. Changes
+    made to the itineraries in the meantime (e.g. delays added) are loaded
+    back by `track()`.
+    """
+
+    # State codes (see `states` and `State`)
+    STOP = 0
+    HOLD = 1
+    MOVING = 2
+
+    def __init__(self, aircrafts):
+
+        self.aircrafts = list(aircrafts)
+        self.itineraries = [aircraft.itinerary for aircraft in self.aircrafts]
+        self.versions = [None] * len(self.aircrafts)
+
+        n_aircrafts = len(self.aircrafts)
+        self.length = numpy.array(
+            [len(itinerary.route) if itinerary is not None else 0
+             for itinerary in self.itineraries], dtype=int)
+        self.base = numpy.cumsum(self.length) - self.length
+
+        # Rows past their routes point at the sentinel at the end
+        self.n_holds = numpy.zeros(self.length.sum() + 1, dtype=int)
+
+        # Cursors (see `Itinerary.cursor`)
+        self.index = numpy.zeros(n_aircrafts, dtype=int)
+        self.position = numpy.zeros(n_aircrafts, dtype=int)
+        self.offset = numpy.zeros(n_aircrafts, dtype=int)
+
+        # Route position of the last location set by a tick (-1 if none) and
+        # the one the aircraft was last materialised with
+        self.located = numpy.full(n_aircrafts, -1, dtype=int)
+        self.materialised = numpy.full(n_aircrafts, -1, dtype=int)
+
+        # Rows whose itinerary cursor is behind the arrays
+        self.is_dirty = numpy.zeros(n_aircrafts, dtype=bool)
+
+        # Whether each node of the routes is close to the next one (see
+        # `states`), found the first time it's needed
+        self.is_close_to_next = None
+
+        for row, itinerary in enumerate(self.itineraries):
+            if itinerary is not None:
+                self.__load(row)
+
+    def __load(self, row):
+
+        itinerary = self.itineraries[row]
+        (self.index[row], self.position[row], self.offset[row]) = \
+            itinerary.cursor
+
+        start = self.base[row]
+        self.n_holds[start:start + self.length[row]] = 0
+        for position, hold in itinerary.holds.items():
+            self.n_holds[start + position] = len(hold)
+
+        self.versions[row] = itinerary.version
+
+    def track(self, aircrafts):
+        """Loads the itineraries changed since they were materialised and
+        returns true, or returns false if this fleet isn't built on the given
+        aircrafts (in the same order) and their itineraries.
+        """
+        if len(aircrafts) != len(self.aircrafts):
+            return False
+        changed = []
+        for row, (aircraft, tracked, itinerary, version) in enumerate(zip(
+                aircrafts, self.aircrafts, self.itineraries, self.versions)):
+            if aircraft is not tracked or aircraft.itinerary is not itinerary:
+                return False
+            if itinerary is not None and itinerary.version != version:
+                changed.append(row)
+        for row in changed:
+            self.__load(row)
+        return True
+
+    def tick(self):
+        """Ticks all the aircrafts at once; mirrors `Aircraft.tick`."""
+
+        # Aircrafts holding a delay stay; the others move to the next node
+        active = self.position < self.length
+        held = active & (self.offset < self.n_holds[self.base + self.position])
+        moving = active & ~held
+
+        self.offset += held
+        self.position += moving
+        self.offset[moving] = 0
+        self.index += active
+
+        # Aircrafts completing their itineraries stay where they are
+        located = active & (self.position < self.length)
+        self.located[located] = self.position[located]
+        self.is_dirty |= active
+
+    def materialise(self):
+        """Brings the itineraries and the locations of the aircrafts up to
+        date with the arrays.
+        """
+
+        rows = numpy.flatnonzero(self.is_dirty)
+        if len(rows) == 0:
+            return
+
+        for row, index, located, materialised in zip(
+                rows.tolist(), self.index[rows].tolist(),
+                self.located[rows].tolist(),
+                self.materialised[rows].tolist()):
+            # The setter walks the delays passed, so the ones taken are kept
+            # track of the same way as ticking the itinerary
+            itinerary = self.itineraries[row]
+            itinerary.index = index
+            self.versions[row] = itinerary.version
+            if located != materialised:
+                self.aircrafts[row].set_location(itinerary.route[located])
+
+        self.materialised[rows] = self.located[rows]
+        self.is_dirty[:] = False
+
+    @property
+    def states(self):
+        """Returns the state code of each aircraft as given by `Aircraft.state`
+        once materialised: `STOP` if it has no itinerary or no next target,
+        `HOLD` if its next target is close to the current one (e.g. it's
+        holding a delay) and `MOVING` otherwise.
+        """
+        if self.is_close_to_next is None:
+            self.is_close_to_next = numpy.zeros(len(self.n_holds), dtype=bool)
+            for itinerary, start in zip(self.itineraries, self.base.tolist()):
+                if itinerary is None:
+                    continue
+                route = itinerary.route
+                for position in range(len(route) - 1):
+                    self.is_close_to_next[start + position] = \
+                        route[position].is_close_to(route[position + 1])
+
+        # Each target of an itinerary is a node of the route or a delay
+        n_held = numpy.concatenate(([0], numpy.cumsum(self.n_holds)))
+        n_targets = self.length + n_held[self.base + self.length] - \
+            n_held[self.base]
+
+        at = self.base + self.position
+        active = (self.position < self.length) & (self.index < n_targets - 1)
+        held = (self.offset < self.n_holds[at]) | self.is_close_to_next[at]
+        states = numpy.full(len(self.aircrafts), self.MOVING, dtype=int)
+        states[active & held] = self.HOLD
+        states[~active] = self.STOP
+        return states
+
+    def __repr__(self):
+        return "<Fleet: %d aircrafts>" % len(self.aircrafts)
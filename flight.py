@@ -2,6 +2,7 @@
 possible flight that is planned before the simulation started.
 """
 from aircraft import Aircraft, State
+from utils import format_seconds
 
 
 class Flight:
@@ -31,7 +32,8 @@ class ArrivalFlight(Flight):
 
     def __repr__(self):
         return "<Arrival:%s time:%s appear:%s>" \
-                % (self.aircraft.callsign, self.arrival_time, self.appear_time)
+                % (self.aircraft.callsign, format_seconds(self.arrival_time),
+                   format_seconds(self.appear_time))
 
 
 class DepartureFlight(Flight):
@@ -51,4 +53,5 @@ class DepartureFlight(Flight):
 
     def __repr__(self):
         return "<Departure:%s time:%s appear:%s>" % \
-                (self.aircraft.callsign, self.departure_time, self.appear_time)
+                (self.aircraft.callsign, format_seconds(self.departure_time),
+                 format_seconds(self.appear_time))
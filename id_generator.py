@@ -19,3 +19,49 @@ def get_new_node_id():
     i = LastAssignedId.node_id
     LastAssignedId.node_id += 1
     return i
+
+
+class IdTable:
+    """`IdTable` interns hashable keys into compact integer IDs: objects built
+    from equal keys get the same ID, so they can be compared and hashed with
+    integer operations.
+    """
+
+    def __init__(self):
+        self.ids = {}
+
+    def get_id(self, key):
+        """Returns the ID of the given key, assigning a new one if needed."""
+        i = self.ids.get(key)
+        if i is None:
+            i = len(self.ids)
+            self.ids[key] = i
+        return i
+
+    def __len__(self):
+        return len(self.ids)
+
+
+# Tables shared by all the nodes and links created in this process. Nodes
+# built outside of a surface (scenarios, tests) must compare equal to the
+# surface nodes with the same key, so the tables are not per surface.
+NODE_IDS = IdTable()
+LINK_IDS = IdTable()
+
+# Routes are interned by the IDs of their nodes
+ROUTE_IDS = IdTable()
+
+
+def get_node_id(key):
+    """Retrieve the interned ID of a node key."""
+    return NODE_IDS.get_id(key)
+
+
+def get_link_id(key):
+    """Retrieve the interned ID of a link key."""
+    return LINK_IDS.get_id(key)
+
+
+def get_route_id(key):
+    """Retrieve the interned ID of a route key."""
+    return ROUTE_IDS.get_id(key)
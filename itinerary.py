@@ -1,10 +1,25 @@
 """Class file for `Itinerary`."""
-from copy import deepcopy
-from utils import str2sha1
+from id_generator import get_route_id
+
+# Kinds of the delays held at the nodes of a route
+UNCERTAINTY_DELAY = "uncertainty"
+SCHEDULER_DELAY = "scheduler"
 
 
 class Itinerary:
     """Itinerary is a list of target nodes that an aircraft follows per tick.
+
+    The itinerary is kept as its route, which is never changed and is shared
+    with the copies, and the delays held at each node of the route: the
+    aircraft stays at `route[i]` for one tick plus one tick per delay in
+    `holds[i]`. `targets`, with one target per tick, is only built when it's
+    asked for. The route position and the offset within the delays held
+    there are kept along with `index`, so adding a delay and the delay
+    queries don't go through the targets.
+
+    Itineraries are equal if they have the same route and delays. The route
+    is interned (see `route_id`) and the hash is only computed when it's
+    asked for.
     """
 
     def __init__(self, targets=None):
@@ -12,75 +27,223 @@ class Itinerary:
         if targets is None:
             targets = []
 
-        self.targets = targets
-        self.backup = deepcopy(targets)
-        self.index = 0
+        self.route = tuple(targets)
+        self.__route_id = None
+        self.__hash = None
+
+        # holds[position] = kinds of the delays held at route[position] in the
+        # order they're taken (before the tick the route itself spends there)
+        self.holds = {}
+        self.n_delays = {UNCERTAINTY_DELAY: 0, SCHEDULER_DELAY: 0}
+
+        # n_kept_scheduler_delay[position] = scheduler delays held at
+        # route[position] kept from a previous schedule (see `restore`)
+        self.n_kept_scheduler_delay = {}
 
-        self.hash = str2sha1("#".join(str(self.targets)))
-        self.uncertainty_delayed_index = []
-        self.scheduler_delayed_index = []
+        # Cursor of the index and the uncertainty delays taken before it
+        self.__index = 0
+        self.__position = 0
+        self.__offset = 0
+        self.__n_past_uncertainty_delay = 0
+
+        # Expanded targets (see `targets`)
+        self.__targets = None
+
+        # Bumped whenever the delays or the cursor are changed (see `Fleet`)
+        self.version = 0
 
     def tick(self):
         """Ticks this itinerary for moving to the next state."""
         if self.is_completed:
             return
-        self.index += 1
+        self.__forward()
+
+    def __forward(self):
+
+        hold = self.holds.get(self.__position, ())
+        if self.__offset < len(hold):
+            if hold[self.__offset] == UNCERTAINTY_DELAY:
+                self.__n_past_uncertainty_delay += 1
+            self.__offset += 1
+        else:
+            self.__position += 1
+            self.__offset = 0
+        self.__index += 1
+        self.version += 1
 
-    def __add_delay(self):
+    def __backward(self):
+
+        if self.__offset > 0:
+            self.__offset -= 1
+            hold = self.holds[self.__position]
+            if hold[self.__offset] == UNCERTAINTY_DELAY:
+                self.__n_past_uncertainty_delay -= 1
+        else:
+            self.__position -= 1
+            self.__offset = len(self.holds.get(self.__position, ()))
+        self.__index -= 1
+        self.version += 1
+
+    def __add_delay(self, kind):
         if self.is_completed:
             return None
-        self.targets.insert(self.index, self.targets[self.index])
-        return self.targets[self.index]
+        self.holds.setdefault(self.__position, []).insert(self.__offset, kind)
+        self.n_delays[kind] += 1
+        self.version += 1
+        self.__targets = None
+        self.__hash = None
+        return self.route[self.__position]
 
     def add_uncertainty_delay(self, amount=1):
         """Adds `amount` of uncertainty delays at the head of this itinerary.
         """
         for _ in range(amount):
-            self.__update_delayed_index(self.index)
-            self.uncertainty_delayed_index.append(self.index)
-            self.__add_delay()
+            self.__add_delay(UNCERTAINTY_DELAY)
 
     def add_scheduler_delay(self):
         """Adds a single scheduler delay at the head of this itinerary."""
-        self.__update_delayed_index(self.index)
-        self.scheduler_delayed_index.append(self.index)
-        return self.__add_delay()
-
-    def __update_delayed_index(self, new_index):
-        for i in range(len(self.uncertainty_delayed_index)):
-            if self.uncertainty_delayed_index[i] >= new_index:
-                self.uncertainty_delayed_index[i] += 1
-        for i in range(len(self.scheduler_delayed_index)):
-            if self.scheduler_delayed_index[i] >= new_index:
-                self.scheduler_delayed_index[i] += 1
+        return self.__add_delay(SCHEDULER_DELAY)
+
+    def __get_kind_at(self, offset):
+        hold = self.holds.get(self.__position, ())
+        return hold[offset] if 0 <= offset < len(hold) else None
+
+    def __get_delayed_index(self, kind):
+        delayed_index = []
+        n_held = 0
+        for position in sorted(self.holds):
+            for i, kind_held in enumerate(self.holds[position]):
+                if kind_held == kind:
+                    delayed_index.append(position + n_held + i)
+            n_held += len(self.holds[position])
+        return delayed_index
+
+    def get_remaining(self):
+        """Returns a new itinerary made of the targets from the current index
+        on, keeping the delays added to them.
+        """
+        itinerary = Itinerary(self.route[self.__position:])
+        for position, hold in self.holds.items():
+            if position < self.__position:
+                continue
+            if position == self.__position:
+                hold = hold[self.__offset:]
+            if hold:
+                itinerary.holds[position - self.__position] = list(hold)
+                for kind in hold:
+                    itinerary.n_delays[kind] += 1
+                itinerary.n_kept_scheduler_delay[position - self.__position] \
+                    = hold.count(SCHEDULER_DELAY)
+        return itinerary
+
+    def restore(self):
+        """Removes the delays added by the scheduler from this itinerary, but
+        the ones kept from the previous schedule (see `get_remaining`).
+        """
+        index = self.__index
+        for position in list(self.holds):
+            n_removed = self.holds[position].count(SCHEDULER_DELAY) - \
+                self.n_kept_scheduler_delay.get(position, 0)
+            hold = []
+            for offset, kind in enumerate(self.holds[position]):
+                if kind == SCHEDULER_DELAY and n_removed > 0:
+                    n_removed -= 1
+                    if (position, offset) < (self.__position, self.__offset):
+                        index -= 1
+                    continue
+                hold.append(kind)
+            if hold:
+                self.holds[position] = hold
+            else:
+                del self.holds[position]
+        self.n_delays[SCHEDULER_DELAY] = \
+            sum(self.n_kept_scheduler_delay.values())
+        self.__targets = None
+        self.__hash = None
+
+        self.reset()
+        self.index = index
 
     def reset(self):
         """Reset the index of this itinerary."""
-        self.index = 0
+        self.__index = 0
+        self.__position = 0
+        self.__offset = 0
+        self.__n_past_uncertainty_delay = 0
+        self.version += 1
+
+    @property
+    def cursor(self):
+        """Returns the (index, route position, offset within the delays held
+        there) cursor of this itinerary.
+        """
+        return (self.__index, self.__position, self.__offset)
+
+    @property
+    def index(self):
+        """Returns the index of the current target in `targets`."""
+        return self.__index
+
+    @index.setter
+    def index(self, index):
+        while self.__index < index:
+            self.__forward()
+        while self.__index > index:
+            self.__backward()
+
+    @property
+    def route_id(self):
+        """Returns the interned ID of the route of this itinerary."""
+        if self.__route_id is None:
+            self.__route_id = get_route_id(
+                tuple(target.id for target in self.route))
+        return self.__route_id
+
+    @property
+    def targets(self):
+        """Returns the list of targets per tick; it must not be changed."""
+        if self.__targets is None:
+            targets = []
+            for position, target in enumerate(self.route):
+                n_held = len(self.holds.get(position, ()))
+                targets.extend([target] * (n_held + 1))
+            self.__targets = targets
+        return self.__targets
+
+    @property
+    def uncertainty_delayed_index(self):
+        """Returns the indexes of the targets delayed by the uncertainty."""
+        return self.__get_delayed_index(UNCERTAINTY_DELAY)
+
+    @property
+    def scheduler_delayed_index(self):
+        """Returns the indexes of the targets delayed by the scheduler."""
+        return self.__get_delayed_index(SCHEDULER_DELAY)
 
     @property
     def length(self):
         """Returns the length of this itinerary."""
-        return len(self.targets)
+        return len(self.route) + self.n_delays[UNCERTAINTY_DELAY] + \
+            self.n_delays[SCHEDULER_DELAY]
 
     @property
     def is_delayed_by_uncertainty(self):
         """Returns true if the next tick is delayed by the uncertainty."""
-        if self.next_target is None or self.index <= 0:
+        if self.next_target is None or self.__index <= 0:
             return False
-        return self.index - 1 in self.uncertainty_delayed_index
+        return self.__get_kind_at(self.__offset - 1) == UNCERTAINTY_DELAY
 
     @property
     def is_delayed_by_uncertainty_now(self):
         """Returns true if the current tick is delayed by the uncertainty."""
-        return self.index in self.uncertainty_delayed_index
+        return self.__get_kind_at(self.__offset) == UNCERTAINTY_DELAY
 
     @property
     def is_delayed_by_scheduler(self):
         """Returns true if the next tick is delayed by the scheduler."""
-        if self.next_target is None or self.index <= 0:
+        if self.next_target is None or self.__index <= 0:
             return False
-        return self.index - 1 in self.scheduler_delayed_index
+        return self.__get_kind_at(self.__offset - 1) == SCHEDULER_DELAY
 
     @property
     def is_delayed(self):
@@ -92,45 +255,72 @@ class Itinerary:
         """Returns the current target."""
         if self.is_completed:
             return None
-        return self.targets[self.index]
+        return self.route[self.__position]
 
     @property
     def next_target(self):
         """Returns the next target."""
-        if self.index >= self.length - 1:
+        if self.__index >= self.length - 1:
             return None
-        return self.targets[self.index + 1]
+        if self.__offset < len(self.holds.get(self.__position, ())):
+            return self.route[self.__position]
+        return self.route[self.__position + 1]
 
     @property
     def is_completed(self):
         """Returns true if this itinerary had been completed."""
-        return self.index >= self.length
+        return self.__position >= len(self.route)
 
     @property
     def n_scheduler_delay(self):
         """Returns the number of delays added by the scheduler."""
-        return len(self.scheduler_delayed_index)
+        return self.n_delays[SCHEDULER_DELAY]
 
     @property
     def n_uncertainty_delay(self):
         """Returns the number of delays added by the uncertainty."""
-        return len(self.uncertainty_delayed_index)
+        return self.n_delays[UNCERTAINTY_DELAY]
 
     @property
     def n_future_uncertainty_delay(self):
         """Returns the number of delays added by the uncertainty from now on.
         """
-        return len([i for i in self.uncertainty_delayed_index
-                    if i >= self.index])
+        return self.n_delays[UNCERTAINTY_DELAY] - \
+            self.__n_past_uncertainty_delay
+
+    def __copy__(self):
+        # The route is shared, so only the delays are copied
+        itinerary = Itinerary.__new__(Itinerary)
+        itinerary.__dict__.update(self.__dict__)
+        itinerary.holds = {position: list(hold)
+                           for position, hold in self.holds.items()}
+        itinerary.n_delays = dict(self.n_delays)
+        return itinerary
 
     def __repr__(self):
-        return "<Itinerary: %d target>" % len(self.targets)
+        return "<Itinerary: %d target>" % self.length
+
+    def __getstate__(self):
+        attrs = dict(self.__dict__)
+        # Route IDs are only valid in the process which interned them
+        attrs["_Itinerary__route_id"] = None
+        attrs["_Itinerary__hash"] = None
+        return attrs
+
+    def __setstate__(self, attrs):
+        self.__dict__.update(attrs)
 
     def __hash__(self):
-        return self.hash
+        if self.__hash is None:
+            self.__hash = hash((self.route_id, tuple(sorted(
+                (position, tuple(hold))
+                for position, hold in self.holds.items()))))
+        return self.__hash
 
     def __eq__(self, other):
-        return self.hash == other.hash
+        if not isinstance(other, Itinerary):
+            return NotImplemented
+        return self.route_id == other.route_id and self.holds == other.holds
 
     def __ne__(self, other):
         return not self == other
@@ -1,7 +1,7 @@
 """Class file for `Link`."""
+import math
 from config import Config
-from utils import str2sha1
-from id_generator import get_new_link_id
+from id_generator import get_new_link_id, get_link_id
 from geopy.distance import vincenty
 
 
@@ -20,8 +20,16 @@ class Link:
 
         self.name = name
         self.nodes = nodes
-        self.boundary = self.__calculate_boundary(nodes)
-        self.hash = str2sha1("%s#%s" % (self.name, self.nodes))
+        self.__boundary = None  # boundary is calculated lazily
+        self.id = self.__get_id()
+
+    def __get_id(self):
+        return get_link_id((self.name, tuple(node.id for node in self.nodes)))
+
+    @property
+    def key(self):
+        """Returns a key of this link that is stable across processes."""
+        return "%s#%s" % (self.name, "#".join(node.key for node in self.nodes))
 
     @property
     def length(self):
@@ -49,6 +57,15 @@ class Link:
         """
         return Link(self.name, self.nodes[::-1])
 
+    @property
+    def boundary(self):
+        """Returns the [min lat, max lat, min lng, max lng] of the area this
+        link may contain nodes in.
+        """
+        if self.__boundary is None:
+            self.__boundary = self.__calculate_boundary(self.nodes)
+        return self.__boundary
+
     def __calculate_boundary(self, nodes):
         """Returns the boundary nodes for the area the link formed """
         boundary = None
@@ -78,16 +95,24 @@ class Link:
         return self.boundary[0] <= node.geo_pos["lat"] <= self.boundary[1] and \
             self.boundary[2] <= node.geo_pos["lng"] <= self.boundary[3]
 
-    def contains_node(self, node):
-        """Returns true if this link contains a given `node`."""
+    def contains_node(self, node, segments=None):
+        """Returns true if this link contains a given `node`. `segments` can
+        be given to only check some of the segments (see `contains_node_at`).
+        """
         if not self.__node_in_boundary(node) or self.start.is_close_to(node) or self.end.is_close_to(node):
             return False
-        return self.contains_node_at(node) is not None
+        return self.contains_node_at(node, segments) is not None
+
+    def contains_node_at(self, node, segments=None):
+        """Returns the index of the given node in this link. Segment `i` is
+        the one between the i-th and the (i+1)-th nodes; if `segments` (a
+        sorted list of indices) is given, the other segments are skipped.
+        """
 
-    def contains_node_at(self, node):
-        """Returns the index of the given node in this link."""
+        if segments is None:
+            segments = range(len(self.nodes) - 1)
 
-        for i in range(len(self.nodes) - 1):
+        for i in segments:
             src, dst = self.nodes[i], self.nodes[i + 1]
             if self.contains_node_on_segment(src, dst, node):
                 return i
@@ -104,6 +129,19 @@ class Link:
         return (src.get_distance_to(node) + dst.get_distance_to(node) -
                 src.get_distance_to(dst)) < threshold
 
+    @classmethod
+    def get_segment_reach(cls, src, dst):
+        """Returns how far in feets a node can be from the segment between
+        `src` and `dst` while still being contained by it, i.e. the semi-minor
+        axis of the ellipse checked in `contains_node_on_segment`. The length
+        of the segment is taken on the projected plane.
+        """
+
+        threshold = Config.params["simulation"]["close_node_link_threshold"]
+        (x1, y1), (x2, y2) = src.xy, dst.xy
+        length = math.hypot(x2 - x1, y2 - y1)
+        return math.sqrt(2 * length * threshold + threshold ** 2) / 2
+
     def break_at(self, node):
         """Breaks this link into two links at a given `node`. An expection is
         raised if the node isn't be contained by this link.
@@ -131,11 +169,40 @@ class Link:
         return (Link(self.name + "-b1", nodes_first),
                 Link(self.name + "-b2", nodes_second))
 
+    def break_at_nodes(self, breaks):
+        """Breaks this link into pieces at once. `breaks` is a list of
+        (marker, node) pairs sorted by their position along this link, where
+        `marker` is the index of the segment containing the node as returned
+        by `contains_node_at`.
+        """
+
+        pieces = []
+        nodes = [self.start]
+        next_index = 1
+
+        for marker, node in breaks:
+            nodes += self.nodes[next_index:marker + 1]
+            next_index = max(next_index, marker + 1)
+            nodes.append(node)
+            pieces.append(nodes)
+            nodes = [node]
+
+        nodes += self.nodes[next_index:]
+        pieces.append(nodes)
+
+        return [Link("%s-b%d" % (self.name, i + 1), piece_nodes)
+                for i, piece_nodes in enumerate(pieces)]
+
+    def __setstate__(self, attrs):
+        self.__dict__.update(attrs)
+        # IDs are only valid in the process which interned them
+        self.id = self.__get_id()
+
     def __hash__(self):
-        return self.hash
+        return self.id
 
     def __eq__(self, other):
-        return self.hash == other.hash
+        return self.id == other.id
 
     def __ne__(self, other):
         return not self == other
@@ -1,8 +1,10 @@
 """Class file for `Node`."""
-from utils import is_valid_geo_pos, str2sha1
+import math
+from utils import is_valid_geo_pos
 from geopy.distance import vincenty
 from config import Config
-from id_generator import get_new_node_id
+from id_generator import get_new_node_id, get_node_id
+from projection import Projection
 
 
 class Node:
@@ -20,11 +22,43 @@ class Node:
 
         self.name = name
         self.geo_pos = geo_pos
-        self.hash = str2sha1("%s#%.5f#%.5f" %
-                             (name, geo_pos["lat"], geo_pos["lng"]))
+
+        # Nodes with the same key share the same interned integer ID
+        self.key = "%s#%.5f#%.5f" % (name, geo_pos["lat"], geo_pos["lng"])
+        self.id = get_node_id(self.key)
+
+        # Projected coordinates are calculated lazily
+        self.__xy = None
+        self.__xy_version = None
+
+    @property
+    def xy(self):
+        """Returns the local east/north coordinates of this node in feets
+        (see `Projection`).
+        """
+        if self.__xy_version != Projection.version:
+            self.__xy = Projection.project(self.geo_pos)
+            self.__xy_version = Projection.version
+        return self.__xy
 
     def get_distance_to(self, node):
-        """Returns the distance from this node to another in feets."""
+        """Returns the distance from this node to another in feets. The
+        `distance` simulation parameter selects the exact geodesic distance or
+        the planar one computed on the projected coordinates.
+        """
+        if Config.params["simulation"]["distance"] == "planar":
+            return self.get_planar_distance_to(node)
+        return self.get_exact_distance_to(node)
+
+    def get_planar_distance_to(self, node):
+        """Returns the distance from this node to another in feets using the
+        projected coordinates.
+        """
+        (x_1, y_1), (x_2, y_2) = self.xy, node.xy
+        return round(math.hypot(x_1 - x_2, y_1 - y_2), Config.DECIMAL_ROUND)
+
+    def get_exact_distance_to(self, node):
+        """Returns the geodesic distance from this node to another in feets."""
         this_node = self.geo_pos
         another_node = node.geo_pos
         distance = vincenty(
@@ -41,11 +75,32 @@ class Node:
         threshold = Config.params["simulation"]["close_node_threshold"]
         return distance_feet < threshold
 
+    def __getstate__(self):
+        attrs = dict(self.__dict__)
+        # Projected coordinates depend on the origin used by this process
+        del attrs["_Node__xy"]
+        del attrs["_Node__xy_version"]
+        return attrs
+
+    def __setstate__(self, attrs):
+        self.__dict__.update(attrs)
+        self.__xy = None
+        self.__xy_version = None
+        # IDs are only valid in the process which interned them
+        self.id = get_node_id(self.key)
+
+    def __copy__(self):
+        # Nodes are immutable; copies share the same object
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
     def __hash__(self):
-        return self.hash
+        return self.id
 
     def __eq__(self, other):
-        return self.hash == other.hash
+        return self.id == other.id
 
     def __ne__(self, other):
         return not self == other
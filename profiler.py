@@ -0,0 +1,121 @@
+"""Class file for `Profiler`."""
+import json
+import logging
+import time
+
+from config import Config
+from utils import get_output_dir_name
+
+
+class Profiler:
+    """`Profiler` times the phases of the simulation (and of the scheduler)
+    with `time.perf_counter_ns`, which is monotonic. Each phase keeps its
+    count, total, minimum, maximum and a histogram of durations whose buckets
+    double in width from one microsecond. Phases are timed with
+
+        start = profiler.start()
+        ...
+        profiler.stop("name", start)
+
+    When the profiler is disabled (see `simulator.profile`), `start()` returns
+    None without reading the clock and `stop()` returns right away, which is
+    cheaper than entering and exiting a context manager.
+    """
+
+    def __init__(self, is_enabled=None):
+
+        self.logger = logging.getLogger(__name__)
+
+        if is_enabled is None:
+            is_enabled = Config.params["simulator"]["profile"]
+        self.is_enabled = is_enabled
+
+        # timings[name] = `PhaseTimings`
+        self.timings = {}
+
+    def start(self):
+        """Returns the start time of a phase, or None if disabled."""
+        return time.perf_counter_ns() if self.is_enabled else None
+
+    def stop(self, name, start):
+        """Records the duration of the given phase started at `start`."""
+        if start is None:
+            return
+        duration = time.perf_counter_ns() - start
+        timings = self.timings.get(name)
+        if timings is None:
+            timings = self.timings[name] = PhaseTimings()
+        timings.add(duration)
+
+    @property
+    def summary(self):
+        """Returns the timings of all the phases as a dictionary."""
+        return {name: timings.summary
+                for name, timings in sorted(self.timings.items())}
+
+    def save(self):
+        """Saves the timings of the phases to a JSON file next to the output
+        metrics.
+        """
+        filename = "%sprofile.json" % get_output_dir_name()
+        with open(filename, "w") as fout:
+            fout.write(json.dumps(self.summary, indent=4))
+        self.logger.info("Profile saved to %s", filename)
+
+    def __repr__(self):
+        return "<Profiler: %d phases>" % len(self.timings)
+
+    def __getstate__(self):
+        attrs = dict(self.__dict__)
+        del attrs["logger"]
+        return attrs
+
+    def __setstate__(self, attrs):
+        self.__dict__.update(attrs)
+
+
+class PhaseTimings:
+    """`PhaseTimings` keeps the durations of a phase in nanoseconds: the
+    count, the total, the extremes and a histogram where bucket `i` counts the
+    durations under `2 ** i` microseconds (and not counted in a lower bucket).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.buckets = []
+
+    def add(self, duration):
+        """Adds a duration in nanoseconds."""
+        self.count += 1
+        self.total += duration
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if self.max is None or duration > self.max:
+            self.max = duration
+
+        bucket = (duration // 1000).bit_length()
+        if bucket >= len(self.buckets):
+            self.buckets.extend([0] * (bucket + 1 - len(self.buckets)))
+        self.buckets[bucket] += 1
+
+    @property
+    def summary(self):
+        """Returns the timings as a dictionary in seconds; the histogram maps
+        the upper bound of each bucket in microseconds to its count.
+        """
+        return {
+            "count": self.count,
+            "total": self.total / 1e9,
+            "mean": self.total / self.count / 1e9 if self.count else None,
+            "min": self.min / 1e9 if self.min is not None else None,
+            "max": self.max / 1e9 if self.max is not None else None,
+            "histogram_us": {str(2 ** i): count
+                             for i, count in enumerate(self.buckets)
+                             if count}
+        }
+
+    def __repr__(self):
+        return "<PhaseTimings: %d durations>" % self.count
@@ -0,0 +1,76 @@
+"""`Projection` maps geo positions onto a local east/north plane in feet so
+distances between nodes can be computed with plain arithmetic instead of
+solving the geodesic problem on every call.
+
+The projection is a local tangent plane (equirectangular) around an origin,
+which is the center of the airport surface being loaded. The WGS-84 radii of
+curvature at the origin are used for the east and north axes. For two points
+within `radius` feet of the origin at latitude `lat0`, the relative error of
+the planar distance against the exact geodesic distance is bounded by
+
+    (|tan(lat0)| + radius / R) * radius / R
+
+where R is the meridional radius of curvature (about 20.9 million feet). At
+SFO (lat0 ~= 37.6) and within two miles of the center, that is below 0.04%,
+i.e. less than 0.02 feet on a 50 feet separation check.
+"""
+import math
+
+# WGS-84 ellipsoid
+SEMI_MAJOR_AXIS_FEET = 6378137.0 / 0.3048
+ECCENTRICITY_SQUARED = 0.00669437999014
+
+
+class Projection:
+    """Static class that stores the origin of the local plane and projects
+    geo positions onto it. `version` increases whenever the origin changes so
+    objects caching their projected coordinates know they are stale.
+    """
+
+    origin = None
+    version = 0
+
+    # Feet per radian on the east and north axes at the origin
+    east_scale = None
+    north_scale = None
+
+    @classmethod
+    def set_origin(cls, geo_pos):
+        """Sets the origin of the local plane, normally the center of the
+        airport surface.
+        """
+        if cls.origin is not None and \
+           cls.origin == (geo_pos["lat"], geo_pos["lng"]):
+            return
+
+        lat = math.radians(geo_pos["lat"])
+        factor = 1 - ECCENTRICITY_SQUARED * math.sin(lat) ** 2
+        prime_vertical = SEMI_MAJOR_AXIS_FEET / math.sqrt(factor)
+        meridional = SEMI_MAJOR_AXIS_FEET * (1 - ECCENTRICITY_SQUARED) / \
+            factor ** 1.5
+
+        cls.origin = (geo_pos["lat"], geo_pos["lng"])
+        cls.east_scale = prime_vertical * math.cos(lat)
+        cls.north_scale = meridional
+        cls.version += 1
+
+    @classmethod
+    def project(cls, geo_pos):
+        """Returns the (east, north) coordinates in feet of a geo position.
+        If no origin has been set yet, the given position becomes the origin.
+        """
+        if cls.origin is None:
+            cls.set_origin(geo_pos)
+        lat0, lng0 = cls.origin
+        return (math.radians(geo_pos["lng"] - lng0) * cls.east_scale,
+                math.radians(geo_pos["lat"] - lat0) * cls.north_scale)
+
+    @classmethod
+    def max_relative_error(cls, radius):
+        """Returns the upper bound of the relative error of planar distances
+        between points that are within `radius` feet of the origin.
+        """
+        if cls.origin is None:
+            return 0.0
+        ratio = radius / cls.north_scale
+        return (abs(math.tan(math.radians(cls.origin[0]))) + ratio) * ratio
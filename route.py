@@ -17,7 +17,7 @@ class Route:
         self.links.extend(links)
         self.__distance = None  # distance is calculated lazily
         self.__is_completed = None  # is_completed is calculated lazily
-        self.__nodes = []   # nodes are calculated lazily
+        self.__nodes = None   # nodes are calculated lazily
 
     def get_links(self):
         return self.links
@@ -62,8 +62,10 @@ class Route:
 
     @property
     def nodes(self):
-        """Returns all nodes among this route."""
-        if self.__nodes:
+        """Returns all nodes among this route as a tuple which is shared by
+        the itineraries following this route.
+        """
+        if self.__nodes is not None:
             return self.__nodes
 
         nodes = [self.start]
@@ -71,7 +73,7 @@ class Route:
             nodes.append(link.start)
         nodes.append(self.end)
 
-        self.__nodes = nodes
+        self.__nodes = tuple(nodes)
         return self.__nodes
 
     @property
@@ -142,7 +144,7 @@ class Route:
     def __reset_cache(self):
         self.__distance = None
         self.__is_completed = None
-        self.__nodes = []
+        self.__nodes = None
 
     def __repr__(self):
         return "<Route: %s - %s>" % (self.start, self.end)
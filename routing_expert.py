@@ -1,9 +1,15 @@
 """Class file for `RoutingExpert`."""
+import heapq
 import logging
+import numpy
 import cache
 
+from collections import OrderedDict
+from config import Config
+
 from link import Link
 from route import Route
+from spatial_index import SpatialIndex
 from surface import Runway, Spot, Gate, RunwayNode
 
 
@@ -12,47 +18,84 @@ class RoutingExpert:
     two nodes in the airport surfact. It provides `get_shortest_route`
     interface for the scheduler to use for providing itineraries. The routes
     are precomputed and cached per airport.
+
+    For each destination, the routing tables only store the next hop (as an
+    index into `index_node`) of every node on its shortest route to the
+    destination. `Route` objects are reconstructed from the next hops when
+    they are requested and the most recently used ones are memoized.
     """
 
-    def __init__(self, links, nodes, enable_cache):
+    # Bump this when the format of the cached routing tables (or the pickled
+    # `Link` in the adjacency map) changes
+    CACHE_FORMAT_VERSION = 4
+
+    def __init__(self, links, nodes, enable_cache, compiled=None):
 
         # Setups the logger
         self.logger = logging.getLogger(__name__)
 
+        # routing_table[dest][node index] = index of the next hop (or -1)
         self.depart_routing_table = {}
         self.arrival_routing_table = {}
 
-        # Adds the two ends of a links as a node as well
+        # Memoized routes: route_cache[(start, end)] = route, and
+        # route_cache[("arrival", start, gate)] = route for the arrivals
+        self.route_cache = OrderedDict()
+        self.route_cache_size = \
+            Config.params["simulation"]["route_cache_size"]
+
+        # Adds the two ends of a links as a node as well; links share their
+        # ends so the duplicates are removed (keeping the first occurrence)
+        all_nodes = list(nodes)
         for link in links:
-            nodes.append(link.start)
-            nodes.append(link.end)
+            all_nodes.append(link.start)
+            all_nodes.append(link.end)
 
         # Saves all the links and nodes
         self.links = links
-        self.nodes = nodes
+        self.nodes = list(dict.fromkeys(all_nodes))
         self.runway_nodes = list(map(lambda l: l.start, list(filter(lambda l: type(l) == Runway, self.links))))
         self.spot_nodes = list(filter(lambda l: type(l) == Spot, self.nodes))
         self.logger.info("%d links and %d nodes are loaded",
                          len(self.links), len(self.nodes))
 
-        # Builds or loads the routing table from cache
-        if enable_cache:
+        # Builds or loads the routing table from the compiled airport or
+        # from cache
+        if compiled is not None and compiled.index_node == self.nodes:
+            self.__load_compiled_routes(compiled)
+        elif enable_cache:
             self.__build_or_load_routes()
         else:
             self.__build_routes()
 
     def __build_or_load_routes(self):
 
-        hash_key = cache.get_hash(self.links, self.nodes)
+        hash_key = cache.get_key("routes", self.CACHE_FORMAT_VERSION,
+                                 cache.get_hash(self.links, self.nodes),
+                                 cache.get_surface_params())
         cached = cache.get(hash_key)
 
         if cached:
-            (self.depart_routing_table, self.arrival_routing_table) = cached
+            (self.index_node, self.adjacency_map, self.depart_routing_table,
+             self.arrival_routing_table) = cached
+            self.node_index = {node: index
+                               for index, node in enumerate(self.index_node)}
             self.logger.debug("Cached routing table is loaded")
         else:
             # Builds the routes
             self.__build_routes()
-            cache.put(hash_key, (self.depart_routing_table, self.arrival_routing_table))
+            cache.put(hash_key, (self.index_node, self.adjacency_map,
+                                 self.depart_routing_table,
+                                 self.arrival_routing_table))
+
+    def __load_compiled_routes(self, compiled):
+        self.index_node = compiled.index_node
+        self.node_index = {node: index
+                           for index, node in enumerate(self.index_node)}
+        self.adjacency_map = compiled.adjacency_map
+        (self.depart_routing_table, self.arrival_routing_table) = \
+            compiled.routing_tables
+        self.logger.debug("Compiled routing table is loaded")
 
     def __build_routes(self):
         self.logger.debug("Starts building routes, # nodes: %d # links: %d",
@@ -68,10 +111,16 @@ class RoutingExpert:
         self.logger.debug("Starts linking existing links")
         self.__link_existing_links()
 
-        # Step 3: Applies SPFA to get shortest routes for all node pairs
-        self.logger.debug("Starts SPFA for finding shortest routes")
-        self.depart_routing_table = self.__finds_shortest_route_spfa(self.runway_nodes)
-        self.arrival_routing_table = self.__finds_shortest_route_spfa(self.spot_nodes)
+        # Step 3: Compiles the adjacency map into a CSR graph
+        self.__compile_graph()
+
+        # Step 4: Applies Dijkstra from each destination to get the shortest
+        # routes of all the nodes to it
+        self.logger.debug("Starts Dijkstra for finding shortest routes")
+        self.depart_routing_table = \
+            self.__finds_shortest_route_dijkstra(self.runway_nodes)
+        self.arrival_routing_table = \
+            self.__finds_shortest_route_dijkstra(self.spot_nodes)
 
         # Prints result
         self.print_depart_route(self.depart_routing_table)
@@ -89,8 +138,17 @@ class RoutingExpert:
     def __link_close_nodes(self):
         counter = 0
 
+        # Only the nodes in the grid cells around a node can be close to it
+        threshold = Config.params["simulation"]["close_node_threshold"]
+        node_index = SpatialIndex()
+        for i, node in enumerate(self.nodes):
+            node_index.add(i, node)
+
         for start in self.nodes:
-            for end in self.nodes:
+            # Sorted by the order of the nodes so the adjacency map doesn't
+            # depend on the layout of the cells
+            for _, end in sorted(node_index.get_candidates(start, threshold),
+                                 key=lambda candidate: candidate[0]):
                 if start != end and start.is_close_to(end):
                     link = Link("CLOSE_NODE_LINK", [start, end])
                     self.adjacency_map[start][end] = link
@@ -112,55 +170,129 @@ class RoutingExpert:
                 self.adjacency_map[start][end] = link
                 self.adjacency_map[end][start] = link.reverse
 
-    def __finds_shortest_route_spfa(self, dest_nodes):
+    def __compile_graph(self):
+        """Compiles the adjacency map into a compressed sparse row (CSR)
+        graph over integer node indices: the neighbors of node `u` are
+        `indices[indptr[u]:indptr[u + 1]]` and the length of each edge is
+        stored in `weights`.
+        """
+
+        self.node_index = {}
+        self.index_node = []
+        for node in self.adjacency_map:
+            self.node_index[node] = len(self.index_node)
+            self.index_node.append(node)
+
+        indptr, indices, weights = [0], [], []
+        for node in self.index_node:
+            for neighbor, link in self.adjacency_map[node].items():
+                indices.append(self.node_index[neighbor])
+                weights.append(link.length)
+            indptr.append(len(indices))
+
+        self.indptr = numpy.array(indptr, dtype=numpy.int32)
+        self.indices = numpy.array(indices, dtype=numpy.int32)
+        self.weights = numpy.array(weights, dtype=numpy.float64)
+
+        self.logger.debug("Compiled graph with %d nodes and %d edges",
+                          len(self.index_node), len(indices))
+
+    def __finds_shortest_route_dijkstra(self, dest_nodes):
+
+        # Plain lists are faster than numpy arrays for scalar accesses
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        weights = self.weights.tolist()
+
         routing_table = {}
         for r in dest_nodes:
-            routing_table[r] = {}
+            next_hops = self.__get_next_hops(self.node_index[r], indptr,
+                                             indices, weights)
+            routing_table[r] = numpy.array(next_hops, dtype=numpy.int32)
+        return routing_table
 
-            for n in self.nodes:
-                if n == r:
-                    continue
-                routing_table[r][n] = Route(n, r, [])
+    @classmethod
+    def __get_next_hops(cls, dest, indptr, indices, weights):
+        """Runs Dijkstra from the destination node and returns the next hop
+        of each node on its shortest route to the destination (-1 if the node
+        is unreachable or is the destination itself). Routes of the same
+        distance are told apart by their number of links, then by the lowest
+        index of the next hop, so the routes don't depend on the order of the
+        edges.
+        """
 
-            candidates = CandidateNeighbors(r)
+        # keys[u] = (distance, number of links) of the route from u
+        keys = [(float("Inf"), 0)] * (len(indptr) - 1)
+        next_hops = [-1] * (len(indptr) - 1)
+        keys[dest] = (0.0, 0)
 
-            while candidates.length:
-                u = candidates.pop()
+        heap = [(0.0, 0, dest)]
+        while heap:
+            distance, n_links, u = heapq.heappop(heap)
+            if (distance, n_links) > keys[u]:
+                continue
+            for edge in range(indptr[u], indptr[u + 1]):
+                v = indices[edge]
+                key = (distance + weights[edge], n_links + 1)
+                if key < keys[v]:
+                    keys[v] = key
+                    next_hops[v] = u
+                    heapq.heappush(heap, (key[0], key[1], v))
+                elif key == keys[v] and u < next_hops[v]:
+                    next_hops[v] = u
+
+        return next_hops
+
+    def __get_links(self, start, next_hops):
+        """Returns the links on the route from `start` following the next
+        hops until the destination.
+        """
+        links = []
+        u = start
+        v = int(next_hops[u])
+        while v != -1:
+            links.append(self.adjacency_map[self.index_node[u]]
+                         [self.index_node[v]])
+            u, v = v, int(next_hops[v])
+        return links
+
+    def __get_route(self, routing_table, start, end):
+        """Returns the shortest route from start to end (a destination of the
+        routing table), or None if start is not a known node or is the
+        destination itself. Unreachable nodes get a route without links.
+        """
 
-                for v in self.adjacency_map[u]:
-                    new_distance = routing_table[r][u].distance + self.adjacency_map[u][v].length \
-                        if r != u else self.adjacency_map[u][v].length
-                    old_distance = routing_table[r][v].distance if r != v else 0
-                    if new_distance < old_distance:
-                        routing_table[r][v].reset_links()
-                        routing_table[r][v].add_link(self.adjacency_map[v][u])
-                        if r != u:
-                            routing_table[r][v].add_links(routing_table[r][u].links)
+        key = (start, end)
+        route = self.route_cache.get(key)
+        if route is not None:
+            self.route_cache.move_to_end(key)
+            return route
 
-                        self.logger.debug("%s -> %s -> %s is shorter than "
-                                          "%s -> %s", v, u, r, v, r)
+        if start == end or start not in self.node_index:
+            return None
 
-                        if not candidates.has(v):
-                            candidates.push(v)
-                            candidates.re_order(routing_table[r])
+        route = Route(start, end, self.__get_links(self.node_index[start],
+                                                   routing_table[end]))
+        self.__memoize(key, route)
+        return route
 
-            for node in self.nodes:
-                # r is in the routing table; some nodes could be unreachable
-                if node not in routing_table[r] or not len(routing_table[r][node].links):
-                    continue
-                if not routing_table[r][node].is_completed:
-                    raise Exception("Incomplete route found.")
-        return routing_table
+    def __memoize(self, key, route):
+        self.route_cache[key] = route
+        if len(self.route_cache) > self.route_cache_size:
+            self.route_cache.popitem(last=False)
 
     def print_depart_route(self, routing_table):
         """Prints all the routes into STDOUT."""
 
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+
         for start in self.runway_nodes:
             for end in self.nodes:
                 if start == end:
                     continue
                 self.logger.debug("[%s - %s]", end, start)
-                route = routing_table[start][end]
+                route = self.__get_route(routing_table, end, start)
                 if route:
                     self.logger.debug(route.description)
                 else:
@@ -176,19 +308,30 @@ class RoutingExpert:
         # GEO_MIDDLE_NORTH = {"lat": 37.122000, "lng": -122.079057}
         # SP1 = Spot("SP1", GEO_MIDDLE_NORTH)
         if end in self.runway_nodes:
-            if start not in self.depart_routing_table[end]:
-                return None
-            return self.depart_routing_table[end][start]
+            return self.__get_route(self.depart_routing_table, start, end)
 
         if type(end) == Gate:
+            # Arrival routes are memoized too, so the itineraries following
+            # the same route share its nodes
+            key = ("arrival", start, end)
+            route = self.route_cache.get(key)
+            if route is not None:
+                self.route_cache.move_to_end(key)
+                return route
+
             spot = end.get_spots()
             # spot = SP1
-            node_to_spot = self.arrival_routing_table[spot][start]
-            spot_to_gate = self.arrival_routing_table[spot][end]
-            spot_to_gate.reverse()
+            node_to_spot = self.__get_route(self.arrival_routing_table,
+                                            start, spot)
+            gate_to_spot = self.__get_route(self.arrival_routing_table,
+                                            end, spot)
+            # Memoized routes are shared so the links are reversed into a new
+            # list instead of reversing the route in place
             result = Route(start, end, [])
             result.add_links(node_to_spot.get_links())
-            result.add_links(spot_to_gate.get_links())
+            result.add_links([link.reverse for link in
+                              reversed(gate_to_spot.get_links())])
+            self.__memoize(key, result)
             return result
 
         raise Exception("End node is not a runway node nor a gate node.")
@@ -204,55 +347,3 @@ class RoutingExpert:
     def set_quiet(self, logger):
         """Sets this object into quiet mode where less logs are printed."""
         self.logger = logger
-
-
-class CandidateNeighbor:
-    def __init__(self, node):
-        self.node = node
-        self.next = None
-        self.prev = None
-
-
-class CandidateNeighbors:
-    def __init__(self, node):
-        self.tail = self.head = CandidateNeighbor(node)
-        self.set = {node}
-
-    def pop(self):
-        if not self.head:
-            return None
-
-        node, self.head = self.head.node, self.head.next
-        if self.head:
-            self.head.prev = None
-        else:
-            self.tail = None
-
-        self.set.remove(node)
-
-        return node
-
-    def push(self, node):
-        self.set.add(node)
-
-        if self.tail:
-            self.tail.next = CandidateNeighbor(node)
-            self.tail.next.prev = self.tail
-            self.tail = self.tail.next
-        else:
-            self.tail = self.head = CandidateNeighbor(node)
-
-    def has(self, node):
-        return node in self.set
-
-    @property
-    def length(self):
-        return len(self.set)
-
-    def re_order(self, routes):
-        if routes[self.tail.node].distance < routes[self.head.node].distance:
-            front, self.head = self.head.node, self.head.next
-            if self.head:
-                self.head.prev = None
-
-            self.push(front)
@@ -3,7 +3,9 @@ import os
 import json
 import logging
 
-from utils import str2time
+from bisect import bisect_left
+
+from utils import str2seconds
 from flight import ArrivalFlight, DepartureFlight
 from config import Config
 
@@ -23,12 +25,43 @@ class Scenario:
         self.arrivals = arrivals
         self.departures = departures
         self.__build_lookup_table()
+        self.__build_release_queues()
 
     def __build_lookup_table(self):
         self.flight_table = {}
         for flight in self.arrivals + self.departures:
             self.flight_table[flight.aircraft] = flight
 
+    def __build_release_queues(self):
+        # Release queues are the indices of the flights sorted by their appear
+        # time along with the sorted appear times for bisecting
+        self.arrival_queue = self.__get_release_queue(self.arrivals)
+        self.departure_queue = self.__get_release_queue(self.departures)
+
+    @classmethod
+    def __get_release_queue(cls, flights):
+        order = sorted(range(len(flights)),
+                       key=lambda i: flights[i].appear_time)
+        return ([flights[i].appear_time for i in order], order)
+
+    @classmethod
+    def __get_released(cls, queue, flights, start, end):
+        appear_times, order = queue
+        indices = order[bisect_left(appear_times, start):
+                        bisect_left(appear_times, end)]
+        # Keeps the order of the flights in the scenario
+        return [flights[i] for i in sorted(indices)]
+
+    def get_released_arrivals(self, start, end):
+        """Gets the arrival flights appearing in [start, end)."""
+        return self.__get_released(self.arrival_queue, self.arrivals,
+                                   start, end)
+
+    def get_released_departures(self, start, end):
+        """Gets the departure flights appearing in [start, end)."""
+        return self.__get_released(self.departure_queue, self.departures,
+                                   start, end)
+
     def __repr__(self):
         n_flights = len(self.arrivals) + len(self.departures)
         return "<Scenario: " + str(n_flights) + " flights>"
@@ -88,8 +121,8 @@ class Scenario:
                 surface.get_node(arrival["gate"]),
                 surface.get_node(arrival["spot"]),
                 surface.get_link(arrival["runway"]),
-                str2time(arrival["time"]),
-                str2time(arrival["appear_time"])
+                str2seconds(arrival["time"]),
+                str2seconds(arrival["appear_time"])
             ))
 
         # Parse departure flights into the array
@@ -102,8 +135,8 @@ class Scenario:
                 surface.get_node(departure["gate"]),
                 surface.get_node(departure["spot"]),
                 surface.get_link(departure["runway"]),
-                str2time(departure["time"]),
-                str2time(departure["appear_time"])
+                str2seconds(departure["time"]),
+                str2seconds(departure["appear_time"])
             ))
 
         return Scenario(arrivals, departures)
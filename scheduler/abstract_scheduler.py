@@ -1,20 +1,84 @@
 """Class file for the deterministic `AbstractScheduler`."""
+import time
 import logging
 
-from copy import deepcopy
+from config import Config
 from itinerary import Itinerary
 from flight import ArrivalFlight
+from profiler import Profiler
 
 class AbstractScheduler:
-    """Parent class for different schedulers to extend."""
+    """Parent class for different schedulers to extend. Schedulers should
+    call `start_budget()` when they start scheduling and check
+    `is_over_budget` while they're working; once the budget is over, they
+    return the best schedule found so far where the remaining conflicts are
+    marked unsolvable.
+
+    Schedulers may warm start from the previous schedule (see
+    `scheduler.warm_start`): `get_kept_itinerary()` gives the rest of the
+    itinerary an aircraft got last time if it's still following it, and
+    `keep_schedule()` records the schedule being returned.
+
+    The phases of scheduling are timed with `profiler`, which the simulation
+    replaces with its own.
+    """
 
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
+        # Wall-clock time (see `time.time()`) when the budget is over
+        self.deadline = None
+
+        # kept_itineraries[aircraft] = (itinerary, n_uncertainty_delay) of
+        # the previous schedule
+        self.kept_itineraries = {}
+
+        self.profiler = Profiler()
+
     def schedule(self, simulation):
         """Schedule the aircraft within a simulation."""
         raise NotImplementedError("Schedule function should be overrided.")
 
+    def start_budget(self):
+        """Starts the wall-clock budget of a `schedule()` call which is given
+        by `time_budget_ms` (no budget if it's null).
+        """
+        budget = Config.params["scheduler"]["time_budget_ms"]
+        self.deadline = None if budget is None \
+            else time.time() + budget / 1000.0
+
+    @property
+    def is_over_budget(self):
+        """Returns true if the budget of the current schedule is over."""
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def get_kept_itinerary(self, aircraft):
+        """Returns the rest of the itinerary the aircraft got in the previous
+        schedule with the delays added to it, or None if the aircraft should
+        be scheduled again: it's new, it has been delayed by the uncertainty
+        or it has completed its itinerary.
+        """
+        if not Config.params["scheduler"]["warm_start"] or \
+           aircraft not in self.kept_itineraries:
+            return None
+
+        itinerary, n_uncertainty_delay = self.kept_itineraries[aircraft]
+        if aircraft.itinerary is not itinerary or \
+           itinerary.n_uncertainty_delay != n_uncertainty_delay or \
+           itinerary.is_completed:
+            return None
+
+        return itinerary.get_remaining()
+
+    def keep_schedule(self, schedule):
+        """Records the itineraries of the given schedule for warm starting the
+        next one.
+        """
+        self.kept_itineraries = {
+            aircraft: (itinerary, itinerary.n_uncertainty_delay)
+            for aircraft, itinerary in schedule.itineraries.items()
+        }
+
     @classmethod
     def schedule_aircraft(cls, aircraft, simulation):
         """Schedule a single aircraft."""
@@ -28,7 +92,8 @@ class AbstractScheduler:
 
         route = simulation.routing_expert.get_shortest_route(src, dst)
 
-        itinerary = Itinerary(deepcopy(route.nodes))
+        # Nodes are immutable, so the itinerary shares the route nodes
+        itinerary = Itinerary(route.nodes)
 
         # Aggregates the uncertainty delay in previous itinerary if found
         if aircraft.itinerary:
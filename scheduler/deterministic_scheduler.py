@@ -1,7 +1,16 @@
 """Class file for the deterministic `Scheduler`."""
+import os
+import time
+import pickle
+import select
+import signal
+import logging
+
 from schedule import Schedule
 from config import Config
 from aircraft import State
+from trajectory_matrix import TrajectoryMatrix
+from wait_for_graph import WaitForGraph
 from scheduler.abstract_scheduler import AbstractScheduler
 
 
@@ -10,12 +19,52 @@ class Scheduler(AbstractScheduler):
     by offering `scheduler(simulation)`. The scheduler first generates a list
     of itinerary ignoring any conflict then it resolves the conflicts by
     cloning the simulation and ticking on the cloned simulation. Conflicts are
-    resolved by adding delays on one of the aircrafts.
+    resolved by adding delays on one of the aircrafts. When warm started,
+    the delays kept from the previous schedule already resolve most of the
+    conflicts, so only the ones brought by the changes are left.
+
+    When `speculative_workers` is set, the first conflicts resolved by
+    priority (see `Conflict.get_less_priority_aircraft`) are also resolved in
+    other ways: the scheduler forks at the decision and the child processes
+    carry on delaying the other aircraft (`FLIP`) or delaying the same one by
+    `speculative_hold_ticks` at once (`HOLD`) while this one goes on
+    greedily. The schedule with the fewest unsolvable conflicts, then the
+    least delay, is kept. A branch does about as much work as this process
+    after the fork, so it's given as long as this process took since then
+    (at least `BRANCH_MIN_WAIT` seconds, and never past the time budget);
+    branches still running then are killed and the conflict keeps the
+    resolution found here.
     """
 
+    # Ways of resolving a conflict in a branch
+    FLIP = "flip"
+    HOLD = "hold"
+
+    # Least seconds given to a branch to send its schedule back after this
+    # process is done
+    BRANCH_MIN_WAIT = 0.05
+
+    def __init__(self):
+        super().__init__()
+
+        # Forked branches as (pid, reader, wall-clock time of the fork)
+        # tuples and the (conflict, kind) pairs they resolve
+        self.branches = []
+        self.branched_conflicts = set()
+
+        # Within a branch, the way the conflict is resolved (branch_kinds[
+        # conflict] = kind) and the pipe to send the schedule back
+        self.branch_kinds = {}
+        self.branch_writer = None
+
+        # skipped_conflicts[conflict] = times found without any aircraft to
+        # delay
+        self.skipped_conflicts = {}
+
     def schedule(self, simulation):
 
         self.logger.info("Scheduling start")
+        self.start_budget()
         itineraries = {}
 
         # Assigns route per aircraft without any separation constraint
@@ -25,11 +74,24 @@ class Scheduler(AbstractScheduler):
             # object will be used in other objects; however, be ware that the
             # object will be shared instead of being cloned in the later
             # phases.
-            itinerary = self.schedule_aircraft(aircraft, simulation)
+            itinerary = self.get_kept_itinerary(aircraft)
+            if itinerary is None:
+                itinerary = self.schedule_aircraft(aircraft, simulation)
             itineraries[aircraft] = itinerary
 
         # Resolves conflicts
-        schedule = self.__resolve_conflicts(itineraries, simulation)
+        self.branches = []
+        self.branched_conflicts = set()
+        try:
+            schedule = self.__resolve_conflicts(itineraries, simulation)
+        except BaseException:
+            if self.branch_writer is not None:
+                self.__end_branch(None)
+            raise
+        if self.branch_writer is not None:
+            self.__end_branch(schedule)
+        schedule = self.__join_branches(schedule, itineraries)
+        self.keep_schedule(schedule)
 
         self.logger.info("Scheduling end")
         return schedule
@@ -37,66 +99,273 @@ class Scheduler(AbstractScheduler):
     def __resolve_conflicts(self, itineraries, simulation):
 
         # Gets configuration parameters
-        (tick_times, max_attempt) = self.__get_params()
+        (tick_times, max_attempt, is_incremental, use_trajectory_matrix) = \
+            self.__get_params()
 
         # Setups variables
         attempts = {}   # attemps[conflict] = count
+        self.skipped_conflicts = {}
         unsolvable_conflicts = set()
+        predict_simulation = None
+        profiler = self.profiler
 
         while True:
 
-            # Resets the itineraries (set their state to start node)
-            self.__reset_itineraries(itineraries)
-
-            # Creates simulation copy for prediction
-            predict_simulation = simulation.copy
-            predict_simulation.airport.apply_schedule(
-                Schedule(itineraries, 0, 0))
-
-            for i in range(tick_times):
-
-                # Adds aircrafts
-                predict_simulation.pre_tick()
-
-                # Check if all aircrafts has an itinerary, if not, assign one
-                self.__schedule_new_aircrafts(simulation, predict_simulation,
-                                              itineraries)
-
-                # Gets conflict in current state
-                conflict = self.__get_conflict_to_solve(
-                    predict_simulation.airport.next_conflicts,
-                    unsolvable_conflicts
+            if predict_simulation is None:
+
+                # Resets the itineraries (set their state to start node)
+                self.__reset_itineraries(itineraries)
+
+                # Creates simulation copy for prediction
+                phase = profiler.start()
+                predict_simulation = simulation.copy
+                predict_simulation.airport.apply_schedule(
+                    Schedule(itineraries, 0, 0))
+                profiler.stop("scheduler.clone", phase)
+                i = 0
+                trajectory = None
+                waits = WaitForGraph()
+
+                # Adds aircrafts and assigns itineraries to the new ones
+                is_resumable = self.__pre_tick(
+                    simulation, predict_simulation, itineraries)
+
+            # Expands the itineraries till the end of the prediction so the
+            # ticks without any conflict are skipped; the matrix is built
+            # again once aircrafts are added or removed
+            phase = profiler.start()
+            aircrafts = predict_simulation.airport.aircrafts
+            if use_trajectory_matrix and (
+                    trajectory is None or
+                    not trajectory.is_tracking(aircrafts)):
+                trajectory = TrajectoryMatrix(aircrafts, i, tick_times - 1)
+
+            # Gets conflict in current state
+            conflicts = []
+            conflict = None
+            if trajectory is None or trajectory.is_close_at(i):
+                conflicts = predict_simulation.airport.next_conflicts
+                conflict = self.__get_conflict_to_solve(conflicts,
+                                                        unsolvable_conflicts)
+            profiler.stop("scheduler.conflict_search", phase)
+
+            # Out of time, the remaining conflicts are left unsolved
+            if self.is_over_budget and \
+               (conflict is not None or i < tick_times - 1):
+                self.logger.warning("Time budget is over at tick %d", i)
+                return self.__give_up(simulation, itineraries,
+                                      unsolvable_conflicts | set(conflicts))
+
+            # If a conflict is found, tries to resolve it
+            if conflict is not None:
+                try:
+                    delayed_aircraft = self.__resolve_conflict(
+                        simulation, itineraries, conflict, attempts,
+                        max_attempt, waits)
+                    # A delay is inserted at the current index of an
+                    # itinerary, so the states predicted before this tick are
+                    # the same after the change and the prediction resumes
+                    # here. Otherwise, re-run everything again.
+                    if not (is_incremental and is_resumable and
+                            delayed_aircraft is not None):
+                        predict_simulation = None
+                    elif trajectory is not None:
+                        trajectory.update(delayed_aircraft, i)
+                except ConflictException:
+                    # The conflict isn't able to be solved, skip it in later
+                    # runs. Giving up may revert the delays added in the
+                    # previous ticks, so everything is re-run again.
+                    unsolvable_conflicts.add(conflict)
+                    self.logger.warning("Gave up solving %s", conflict)
+                    predict_simulation = None
+                continue
+
+            if i == tick_times - 1:
+                # Done, conflicts are all handled, return the schedule
+                return self.__get_schedule(itineraries, attempts,
+                                           unsolvable_conflicts)
+
+            # After dealing with the conflicts in current state, tick to next
+            # state
+            phase = profiler.start()
+            predict_simulation.tick()
+            predict_simulation.post_tick()
+            i += 1
+
+            # Aircrafts moving on aren't waiting for others anymore
+            for aircraft in waits.waiters:
+                if not aircraft.is_delayed:
+                    waits.release(aircraft)
+            is_resumable &= self.__pre_tick(
+                simulation, predict_simulation, itineraries)
+            profiler.stop("scheduler.predict_tick", phase)
+
+    def __branch(self, conflict):
+        """Forks a branch for each way of resolving the given conflict while
+        workers are left, and returns the way in the forked process (None in
+        this one).
+        """
+
+        n_workers = Config.params["scheduler"]["speculative_workers"]
+        if self.branch_writer is not None or not hasattr(os, "fork"):
+            return None
+
+        for kind in [self.FLIP, self.HOLD]:
+            if (conflict, kind) in self.branched_conflicts or \
+               len(self.branches) >= n_workers:
+                continue
+            self.branched_conflicts.add((conflict, kind))
+
+            reader, writer = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(reader)
+                self.logger = logging.getLogger("QUIET_MODE")
+                self.branch_writer = writer
+                self.branch_kinds[conflict] = kind
+                return kind
+
+            os.close(writer)
+            self.branches.append((pid, reader, time.time()))
+
+        return None
+
+    def __end_branch(self, schedule):
+        """Sends the schedule found in a branch back and exits the forked
+        process; itineraries are keyed by callsigns as the aircrafts are
+        copies there.
+        """
+        try:
+            result = None
+            if schedule is not None:
+                result = (
+                    schedule.n_delay_added,
+                    schedule.n_unsolvable_conflicts,
+                    {aircraft.callsign: itinerary
+                     for aircraft, itinerary in schedule.itineraries.items()}
                 )
+            with os.fdopen(self.branch_writer, "wb") as fout:
+                pickle.dump(result, fout, pickle.HIGHEST_PROTOCOL)
+        finally:
+            os._exit(0)
+
+    def __join_branches(self, schedule, itineraries):
+        """Waits for the branches and returns the best schedule among the ones
+        sent back in time and the given one, which wins the ties.
+        """
+
+        # Each branch is given as long as this process took since its fork
+        now = time.time()
+        deadlines = {}
+        for _, reader, started in self.branches:
+            deadline = now + max(now - started, self.BRANCH_MIN_WAIT)
+            if self.deadline is not None:
+                deadline = min(deadline, self.deadline)
+            deadlines[reader] = deadline
+
+        # Reads the pipes till they're all closed or over time
+        chunks = {reader: [] for reader in deadlines}
+        running = set(deadlines)
+        while True:
+            now = time.time()
+            waiting = [reader for reader in running if deadlines[reader] > now]
+            if not waiting:
+                break
+            timeout = min(deadlines[reader] for reader in waiting) - now
+            ready, _, _ = select.select(waiting, [], [], timeout)
+            for reader in ready:
+                chunk = os.read(reader, 65536)
+                if chunk:
+                    chunks[reader].append(chunk)
+                else:
+                    running.remove(reader)
+
+        # Kills the branches still running, so the conflicts they flip keep
+        # the resolution found here
+        for pid, reader, _ in self.branches:
+            if reader in running:
+                self.logger.warning("Killed the branch %d over time", pid)
+                os.kill(pid, signal.SIGKILL)
+            os.close(reader)
+            os.waitpid(pid, 0)
+
+        aircrafts = {aircraft.callsign: aircraft for aircraft in itineraries}
+        for _, reader, _ in self.branches:
+            data = b"".join(chunks[reader])
+            result = pickle.loads(data) \
+                if reader not in running and data else None
+            if result is None or \
+               not all(callsign in aircrafts for callsign in result[2]):
+                continue
+
+            n_delay_added, n_unsolvable_conflicts, found = result
+            found = Schedule(
+                {aircrafts[callsign]: itinerary
+                 for callsign, itinerary in found.items()},
+                n_delay_added, n_unsolvable_conflicts)
+            if self.__get_cost(found) < self.__get_cost(schedule):
+                self.logger.info("Took the schedule of a branch with %d "
+                                 "delays added", n_delay_added)
+                schedule = found
+
+        self.branches = []
+        return schedule
 
-                # If a conflict is found, tries to resolve it
-                if conflict is not None:
-                    try:
-                        self.__resolve_conflict(
-                            simulation, itineraries, conflict, attempts,
-                            max_attempt)
-                        # Okay, then re-run everything again
-                        break
-                    except ConflictException:
-                        # The conflict isn't able to be solved, skip it in
-                        # later runs
-                        unsolvable_conflicts.add(conflict)
-                        self.logger.warning("Gave up solving %s", conflict)
-                        # Re-run eveything again
-                        break
-
-                if i == tick_times - 1:
-                    # Done, conflicts are all handled, return the schedule
-                    self.__reset_itineraries(itineraries)
-                    return Schedule(
-                        itineraries,
-                        self.__get_n_delay_added(attempts),
-                        len(unsolvable_conflicts)
-                    )
-
-                # After dealing with the conflicts in current state, tick to
-                # next state
-                predict_simulation.tick()
-                predict_simulation.post_tick()
+    @classmethod
+    def __get_cost(cls, schedule):
+        return (
+            schedule.n_unsolvable_conflicts,
+            sum(itinerary.n_scheduler_delay
+                for itinerary in schedule.itineraries.values())
+        )
+
+    def __get_schedule(self, itineraries, attempts, unsolvable_conflicts):
+
+        self.__reset_itineraries(itineraries)
+        return Schedule(
+            itineraries,
+            self.__get_n_delay_added(attempts),
+            len(unsolvable_conflicts)
+        )
+
+    def __give_up(self, simulation, itineraries, unsolvable_conflicts):
+        """Returns the schedule once the budget is over: the aircrafts keep
+        the itineraries they're following, so only the new ones get the
+        itineraries resolved so far. The given conflicts (the ones given up
+        and the ones found where the prediction stopped) are unsolvable; the
+        rest of the prediction isn't run.
+        """
+
+        for aircraft in simulation.airport.aircrafts:
+            if aircraft.itinerary is not None:
+                itineraries.pop(aircraft, None)
+
+        # Only the delays of the itineraries scheduled are counted
+        self.__reset_itineraries(itineraries)
+        n_delay_added = sum(itinerary.n_scheduler_delay
+                            for itinerary in itineraries.values())
+        return Schedule(itineraries, n_delay_added, len(unsolvable_conflicts))
+
+    def __pre_tick(self, simulation, predict_simulation, itineraries):
+        """Adds aircrafts to the prediction and returns false if the
+        prediction can't be resumed after this tick.
+        """
+
+        # Adds aircrafts
+        predict_simulation.pre_tick()
+
+        # Check if all aircrafts has an itinerary, if not, assign one
+        self.__schedule_new_aircrafts(simulation, predict_simulation,
+                                      itineraries)
+
+        # Aircrafts added from the scenario may carry an itinerary assigned in
+        # an earlier schedule. It isn't reset when the prediction restarts,
+        # so a restarted prediction doesn't replay the same states.
+        for aircraft in predict_simulation.airport.aircrafts:
+            if aircraft.itinerary is not itineraries.get(aircraft) and \
+               aircraft is simulation.scenario.get_flight(aircraft).aircraft:
+                return False
+        return True
 
     def __schedule_new_aircrafts(self, simulation, predict_simulation,
                                  itineraries):
@@ -111,7 +380,7 @@ class Scheduler(AbstractScheduler):
                 itineraries[aircraft] = itinerary
 
     def __resolve_conflict(self, simulation, itineraries, conflict, attempts,
-                           max_attempt):
+                           max_attempt, waits):
 
         self.logger.info("Try to solve %s", conflict)
 
@@ -119,21 +388,46 @@ class Scheduler(AbstractScheduler):
         aircraft = self.__get_aircraft_to_delay(conflict, simulation)
         if aircraft in itineraries:
 
+            # Waiting for an aircraft which is waiting for this one (directly
+            # or not) never resolves the conflict
+            first, second = conflict.aircrafts
+            cycle = waits.add(aircraft, second if aircraft is first else first)
+            if cycle is not None:
+                self.logger.warning("Found deadlock among %s", cycle)
+                raise ConflictException("Deadlock found")
+
+            # The branch holding the aircraft adds its delays at once, the
+            # first time only
+            n_delays = 1
+            if self.branch_kinds.get(conflict) == self.HOLD:
+                n_delays = \
+                    Config.params["scheduler"]["speculative_hold_ticks"]
+                del self.branch_kinds[conflict]
+
             # NOTE: New aircrafts that only appear in prediction are ignored
-            aircraft.add_scheduler_delay()
-            self.__mark_attempt(attempts, max_attempt, conflict, aircraft,
-                                itineraries)
-            self.logger.info("Added delay on %s", aircraft)
+            for _ in range(n_delays):
+                aircraft.add_scheduler_delay()
+                self.__mark_attempt(attempts, max_attempt, conflict, aircraft,
+                                    itineraries)
+                self.logger.info("Added delay on %s", aircraft)
+            return aircraft
+
+        # The prediction is re-run as the aircraft may get an itinerary to
+        # delay then, but it's given up as often as adding delays
+        skipped = self.skipped_conflicts.get(conflict, 0) + 1
+        self.skipped_conflicts[conflict] = skipped
+        if skipped >= max_attempt:
+            raise ConflictException("No aircraft to delay")
+        return None
 
     def __mark_attempt(self, attempts, max_attempt, conflict, aircraft,
                        itineraries):
 
         attempts[conflict] = attempts.get(conflict, 0) + 1
         if attempts[conflict] >= max_attempt:
-            self.logger.error("Found deadlock")
-            import pdb
-            pdb.set_trace()
-            # Reverse the delay
+            self.logger.error("Gave up %s after %d attempts", conflict,
+                              attempts[conflict])
+            # Reverse the delays
             itineraries[aircraft].restore()
             # Forget the attempts
             del attempts[conflict]
@@ -147,8 +441,12 @@ class Scheduler(AbstractScheduler):
         tick_times = int(rs_time / sim_time) + 1
         max_attempt = \
             Config.params["scheduler"]["max_resolve_conflict_attempt"]
+        is_incremental = \
+            Config.params["scheduler"]["incremental_prediction"]
+        use_trajectory_matrix = \
+            Config.params["scheduler"]["trajectory_matrix"]
 
-        return (tick_times, max_attempt)
+        return (tick_times, max_attempt, is_incremental, use_trajectory_matrix)
 
     @classmethod
     def __get_conflict_to_solve(cls, conflicts, unsolvable_conflicts):
@@ -164,19 +462,24 @@ class Scheduler(AbstractScheduler):
     def __get_aircraft_to_delay(self, conflict, simulation):
 
         first, second = conflict.aircrafts
+        states = (first.state, second.state)
 
-        if first.state == State.moving and second.state == State.hold:
+        if states == (State.moving, State.hold):
             return first
-        if first.state == State.hold and second.state == State.moving:
+        if states == (State.hold, State.moving):
             return second
-        if first.state == State.hold and second.state == State.hold:
+        if states == (State.hold, State.hold):
             # This is the case generated by uncertainty in simulation and it's
             # unsolvable. However, if it's not generated by the uncertainty,
             # then this will be a bug needed to be fixed.
             self.logger.debug("Found conflict with two hold aircrafts")
             raise ConflictException("Unsolvable conflict found")
 
-        return conflict.get_less_priority_aircraft(simulation.scenario)
+        aircraft = conflict.get_less_priority_aircraft(simulation.scenario)
+        kind = self.branch_kinds.get(conflict) or self.__branch(conflict)
+        if kind == self.FLIP:
+            return second if aircraft is first else first
+        return aircraft
 
     @classmethod
     def __get_n_delay_added(cls, attempts):
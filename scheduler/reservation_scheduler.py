@@ -0,0 +1,204 @@
+"""Class file for the reservation `Scheduler`."""
+from schedule import Schedule
+from config import Config
+from aircraft import State
+from flight import DepartureFlight
+from spatial_index import SpatialIndex
+from scheduler.abstract_scheduler import AbstractScheduler
+
+
+class Scheduler(AbstractScheduler):
+    """The reservation scheduler implements the `AbstractScheduler` by
+    planning the aircrafts one by one in priority order (earliest departure
+    or arrival time first) against a space-time reservation table. An aircraft
+    waits at its current node whenever the next node of its route is reserved
+    by an aircraft planned before it on the next tick, so the itineraries are
+    conflict-free within the reschedule cycle without predicting the
+    simulation again and again.
+    """
+
+    def schedule(self, simulation):
+
+        self.logger.info("Scheduling start")
+        self.start_budget()
+        n_ticks = self.__get_n_ticks()
+        reservations = ReservationTable(n_ticks)
+
+        # Aircrafts are where they are on the first tick whatever their
+        # priority, and the ones not moving stay there on the next one
+        for aircraft in simulation.airport.aircrafts:
+            reservations.reserve(0, aircraft, aircraft.location)
+            if aircraft.state != State.moving:
+                reservations.reserve(1, aircraft, aircraft.location)
+
+        # Aircrafts appearing before the next reschedule stay at where they
+        # appear till they get an itinerary; the ones appearing at occupied
+        # gates are queued instead
+        phase = self.profiler.start()
+        self.__reserve_new_aircrafts(simulation, reservations)
+        self.profiler.stop("scheduler.reserve_new_aircrafts", phase)
+
+        itineraries = {}
+        n_delay_added = 0
+        n_unsolvable_conflicts = 0
+
+        for aircraft in self.__get_aircrafts_by_priority(simulation):
+
+            # Out of time, the aircrafts left keep their previous itineraries
+            # (or take their routes without any wait)
+            if self.is_over_budget:
+                n_unsolvable_conflicts += self.__follow(
+                    simulation, aircraft, itineraries, reservations)
+                continue
+
+            itinerary = self.get_kept_itinerary(aircraft)
+            if itinerary is None:
+                itinerary = self.schedule_aircraft(aircraft, simulation)
+            phase = self.profiler.start()
+            (n_delay, n_unsolvable) = self.__plan(
+                simulation, aircraft, itinerary, reservations)
+            self.profiler.stop("scheduler.plan", phase)
+            itineraries[aircraft] = itinerary
+            n_delay_added += n_delay
+            n_unsolvable_conflicts += n_unsolvable
+
+        schedule = Schedule(itineraries, n_delay_added, n_unsolvable_conflicts)
+        self.keep_schedule(schedule)
+
+        self.logger.info("Scheduling end")
+        return schedule
+
+    def __plan(self, simulation, aircraft, itinerary, reservations):
+        """Inserts waits into the itinerary where its next node is reserved
+        and reserves the nodes it passes through. The aircraft is at
+        `targets[tick]` after `tick` ticks.
+        """
+
+        n_delay, n_unsolvable = 0, 0
+        itinerary.reset()
+        reservations.reserve(0, aircraft, itinerary.current_target)
+
+        tick = 0
+        while tick + 1 < min(itinerary.length, reservations.n_ticks):
+            current, upcoming = \
+                itinerary.current_target, itinerary.next_target
+            if reservations.is_reserved(tick + 1, upcoming, aircraft):
+                if reservations.is_reserved(tick + 1, current, aircraft):
+                    # Can't either move on or wait here
+                    self.logger.warning("%s can't avoid a conflict at tick "
+                                        "%d", aircraft, tick + 1)
+                    n_unsolvable += 1
+                else:
+                    itinerary.add_scheduler_delay()
+                    n_delay += 1
+            tick += 1
+            itinerary.tick()
+            reservations.reserve(tick, aircraft, itinerary.current_target)
+
+        # Departures leave the airport at the runway while the others stay
+        # at their last node
+        flight = simulation.scenario.get_flight(aircraft)
+        if not isinstance(flight, DepartureFlight):
+            for later_tick in range(tick + 1, reservations.n_ticks):
+                reservations.reserve(later_tick, aircraft,
+                                     itinerary.targets[-1])
+
+        itinerary.reset()
+        return (n_delay, n_unsolvable)
+
+    def __follow(self, simulation, aircraft, itineraries, reservations):
+        """Reserves the nodes of the itinerary an aircraft is following
+        without inserting any wait and returns the number of conflicts found.
+        """
+
+        itinerary = aircraft.itinerary
+        if itinerary is None:
+            itinerary = self.schedule_aircraft(aircraft, simulation)
+            itineraries[aircraft] = itinerary
+
+        is_departure = isinstance(simulation.scenario.get_flight(aircraft),
+                                  DepartureFlight)
+
+        n_unsolvable = 0
+        location = aircraft.location
+        index = itinerary.index
+        for tick in range(reservations.n_ticks):
+            # Mirrors `Aircraft.tick`
+            if tick > 0 and index < itinerary.length:
+                index += 1
+                if index < itinerary.length:
+                    location = itinerary.targets[index]
+                elif is_departure:
+                    break
+            if reservations.is_reserved(tick, location, aircraft):
+                n_unsolvable += 1
+            reservations.reserve(tick, aircraft, location)
+
+        return n_unsolvable
+
+    @classmethod
+    def __reserve_new_aircrafts(cls, simulation, reservations):
+
+        sim_time = Config.params["simulation"]["time_unit"]
+        for tick in range(reservations.n_ticks - 1):
+            start = simulation.now + tick * sim_time
+            end = start + sim_time
+            for flight in simulation.scenario.get_released_departures(
+                    start, end):
+                location = flight.from_gate
+                if simulation.airport.is_occupied_at(location):
+                    continue
+                for later_tick in range(tick + 1, reservations.n_ticks):
+                    reservations.reserve(later_tick, flight.aircraft,
+                                         location)
+            for flight in simulation.scenario.get_released_arrivals(
+                    start, end):
+                location = flight.runway.start
+                for later_tick in range(tick + 1, reservations.n_ticks):
+                    reservations.reserve(later_tick, flight.aircraft,
+                                         location)
+
+    @classmethod
+    def __get_aircrafts_by_priority(cls, simulation):
+
+        def get_priority(aircraft):
+            flight = simulation.scenario.get_flight(aircraft)
+            if isinstance(flight, DepartureFlight):
+                return (flight.departure_time, aircraft.callsign)
+            return (flight.arrival_time, aircraft.callsign)
+
+        return sorted(simulation.airport.aircrafts, key=get_priority)
+
+    @classmethod
+    def __get_n_ticks(cls):
+
+        rs_time = Config.params["simulation"]["reschedule_cycle"]
+        sim_time = Config.params["simulation"]["time_unit"]
+        return int(rs_time / sim_time) + 1
+
+
+class ReservationTable:
+    """`ReservationTable` keeps the nodes reserved by the aircrafts on each
+    tick. Reservations are indexed with a `SpatialIndex` per tick, so a node
+    is reserved if any reserved node is close to it (see `Node.is_close_to`),
+    which is the same condition used for finding conflicts.
+    """
+
+    def __init__(self, n_ticks):
+        self.n_ticks = n_ticks
+        self.ticks = [SpatialIndex() for _ in range(n_ticks)]
+
+    def reserve(self, tick, aircraft, node):
+        """Reserves the node for the aircraft on the given tick."""
+        if tick < self.n_ticks:
+            self.ticks[tick].add(aircraft, node)
+
+    def is_reserved(self, tick, node, aircraft=None):
+        """Returns true if the node is reserved on the given tick by another
+        aircraft than the given one.
+        """
+        return any(item is not aircraft
+                   for item in self.ticks[tick].get_close_items(node))
+
+    def __repr__(self):
+        return "<ReservationTable: %d ticks>" % self.n_ticks
@@ -8,16 +8,18 @@ import logging
 import traceback
 import importlib
 
-from copy import deepcopy, copy
+from copy import copy
 from clock import Clock, ClockException
 from airport import Airport
 from scenario import Scenario
 from routing_expert import RoutingExpert
 from analyst import Analyst
-from utils import get_seconds_after
+from utils import format_seconds
 from uncertainty import Uncertainty
 from config import Config
 from state_logger import StateLogger
+from snapshot import Snapshot
+from profiler import Profiler
 
 
 class Simulation:
@@ -47,14 +49,20 @@ class Simulation:
         # Sets up the routing expert monitoring the airport surface
         self.routing_expert = RoutingExpert(self.airport.surface.links,
                                             self.airport.surface.nodes,
-                                            params["simulation"]["cache"])
+                                            params["simulation"]["cache"],
+                                            self.airport.compiled)
 
         # Sets up the uncertainty module
         self.uncertainty = (Uncertainty(params["uncertainty"]["prob_hold"])
                             if params["uncertainty"]["enabled"] else (None))
 
+        # Times the phases of the ticks; the scheduler records its phases
+        # into the same profiler
+        self.profiler = Profiler()
+
         # Loads the requested scheduler
         self.scheduler = get_scheduler()
+        self.scheduler.profiler = self.profiler
 
         if not params["simulator"]["test_mode"]:
             # Sets up the analyst
@@ -69,45 +77,66 @@ class Simulation:
         # Initializes the last execution time for rescheduling to None
         self.last_schedule_exec_time = None
 
+        # Derived quantities of the airport state in the current tick, shared
+        # by the state logger and the analyst
+        self.snapshot = None
+
         self.__print_stats()
 
     def tick(self):
         """Moves the states of this simulation to the next state."""
 
-        self.logger.debug("\nCurrent Time: %s", self.now)
+        self.logger.debug("\nCurrent Time: %s", format_seconds(self.now))
 
         try:
 
+            profiler = self.profiler
+
             # Reschedule happens before the tick
             if self.__is_time_to_reschedule():
                 self.logger.info("Time to reschedule")
                 start = time.time()
+                phase = profiler.start()
                 self.__reschedule()
+                profiler.stop("reschedule", phase)
                 self.last_schedule_exec_time = time.time() - start  # seconds
                 self.last_schedule_time = self.now
                 self.logger.info("Last schedule time is updated to %s",
                                  self.last_schedule_time)
 
             # Add aircraft
+            phase = profiler.start()
             self.airport.add_aircrafts(self.scenario, self.now,
                                        self.clock.sim_time)
+            profiler.stop("add_aircrafts", phase)
 
             # Inject uncertainties
             if self.uncertainty:
+                phase = profiler.start()
                 self.uncertainty.inject(self)
+                profiler.stop("uncertainty_inject", phase)
 
             # Tick
+            phase = profiler.start()
             self.airport.tick()
+            profiler.stop("airport_tick", phase)
+            self.snapshot = Snapshot(self.airport, self.scenario)
             state = None
             if not Config.params["simulator"]["test_mode"]:
+                phase = profiler.start()
                 state = self.state_logger.log_on_tick(self)
+                profiler.stop("state_logging", phase)
             self.clock.tick()
 
             # Remove aircraft
+            phase = profiler.start()
             self.airport.remove_aircrafts(self.scenario)
+            profiler.stop("remove_aircrafts", phase)
 
             # Abort on conflict
-            conflicts = self.airport.conflicts
+            phase = profiler.start()
+            conflicts = self.snapshot.conflicts
+            profiler.stop("conflict_check", phase)
             if conflicts:
                 for conflict in conflicts:
                     self.logger.error("Found %s", conflict)
@@ -115,7 +144,9 @@ class Simulation:
 
             # Observe
             if not Config.params["simulator"]["test_mode"]:
+                phase = profiler.start()
                 self.analyst.observe_on_tick(self)
+                profiler.stop("analyst_observe", phase)
 
             # return current state for streaming visualization
             return state
@@ -124,6 +155,8 @@ class Simulation:
             # Finishes
             if not Config.params["simulator"]["test_mode"]:
                 self.analyst.save()
+                if self.profiler.is_enabled:
+                    self.profiler.save()
             raise error
         except SimulationException as error:
             raise error
@@ -134,9 +167,8 @@ class Simulation:
     def __is_time_to_reschedule(self):
         reschedule_cycle = Config.params["simulation"]["reschedule_cycle"]
         last_time = self.last_schedule_time
-        next_time = (get_seconds_after(last_time, reschedule_cycle)
-                     if last_time is not None else None)
-        return last_time is None or next_time <= self.now
+        return last_time is None or \
+            last_time + reschedule_cycle <= self.now
 
     def __reschedule(self):
         schedule = self.scheduler.schedule(self)
@@ -146,7 +178,7 @@ class Simulation:
 
     @property
     def now(self):
-        """Return the current time of the simulation."""
+        """Return the current time of the simulation in seconds."""
         return self.clock.now
 
     def __print_stats(self):
@@ -158,6 +190,7 @@ class Simulation:
         del __dict["logger"]
         __dict["uncertainty"] = None
         __dict["routing_expert"] = None
+        __dict["snapshot"] = None
         return __dict
 
     def __setstate__(self, new_dict):
@@ -182,20 +215,22 @@ class Simulation:
 class ClonedSimulation:
     """ClonedSimulation is a copy of a `Simulation` object; however, it shares
     objects with the source `Simulation` object on immutable data objects in
-    order to avoid the overhead in copying.
+    order to avoid the overhead in copying. The airport surface is shared and
+    only the aircraft states and the gate queues are copied (see
+    `Airport.__copy__`), so creating a clone is cheap.
     The `tick()` function is divided into `pre_tick`, `tick`, and `post_tick`
     to allow the called (mainly the scheduler) to inject operations in between.
     """
 
     def __init__(self, simulation):
 
-        self.clock = deepcopy(simulation.clock)
-        self.airport = deepcopy(simulation.airport)
+        self.clock = copy(simulation.clock)
+        self.airport = copy(simulation.airport)
         self.scenario = copy(simulation.scenario)
 
         # Sets up the logger in quiet mode
         self.logger = logging.getLogger("QUIET_MODE")
-        self.airport.set_quiet(self.logger)
+        self.airport.set_quiet(self.logger, include_surface=False)
         self.scenario.set_quiet(self.logger)
 
     def pre_tick(self):
@@ -205,7 +240,7 @@ class ClonedSimulation:
 
     def tick(self):
         """Turn off the logger, reschedule, and analyst."""
-        self.logger.debug("\nPredicted Time: %s", self.now)
+        self.logger.debug("\nPredicted Time: %s", format_seconds(self.now))
         self.airport.tick()
         try:
             self.clock.tick()
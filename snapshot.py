@@ -0,0 +1,82 @@
+"""Class file for `Snapshot`."""
+
+
+class Snapshot:
+    """`Snapshot` caches the quantities derived from the airport state of one
+    tick, so the simulation, the state logger and the analyst compute each of
+    them at most once. It's taken right after the aircrafts are ticked and
+    it's only valid within that tick. Aircrafts are removed from the airport
+    after the state is logged, which doesn't change the aircrafts left, so the
+    conflicts are only found when they're first asked for (after the
+    removal).
+
+    `hits` and `misses` count the lookups served from the cache and the ones
+    computed, per quantity.
+    """
+
+    QUANTITIES = ["conflicts", "state", "delay", "is_at_gate"]
+
+    def __init__(self, airport, scenario):
+
+        self.airport = airport
+        self.scenario = scenario
+
+        self.__conflicts = None
+        self.__states = {}
+        self.__delays = {}
+        self.__is_at_gate = {}
+
+        self.hits = {quantity: 0 for quantity in self.QUANTITIES}
+        self.misses = {quantity: 0 for quantity in self.QUANTITIES}
+
+    @property
+    def conflicts(self):
+        """Returns the conflicts observed in the airport."""
+        if self.__conflicts is None:
+            self.misses["conflicts"] += 1
+            self.__conflicts = self.airport.conflicts
+        else:
+            self.hits["conflicts"] += 1
+        return self.__conflicts
+
+    def get_state(self, aircraft):
+        """Returns the state of the given aircraft (see `Aircraft.state`)."""
+        return self.__lookup("state", self.__states, aircraft,
+                             lambda: aircraft.state)
+
+    def get_delay(self, aircraft):
+        """Returns whether the next tick of the given aircraft is delayed by
+        the scheduler and by the uncertainty as a (scheduler, uncertainty)
+        tuple.
+        """
+        def get():
+            itinerary = aircraft.itinerary
+            if itinerary is None:
+                return (False, False)
+            return (itinerary.is_delayed_by_scheduler,
+                    itinerary.is_delayed_by_uncertainty)
+
+        return self.__lookup("delay", self.__delays, aircraft, get)
+
+    def is_at_gate(self, aircraft):
+        """Returns true if the given aircraft is close to the gate of its
+        flight.
+        """
+        def get():
+            flight = self.scenario.get_flight(aircraft)
+            return self.airport.aircraft_index.is_close_to(aircraft,
+                                                           flight.from_gate)
+
+        return self.__lookup("is_at_gate", self.__is_at_gate, aircraft, get)
+
+    def __lookup(self, quantity, cache, aircraft, get):
+        if aircraft in cache:
+            self.hits[quantity] += 1
+        else:
+            self.misses[quantity] += 1
+            cache[aircraft] = get()
+        return cache[aircraft]
+
+    def __repr__(self):
+        return "<Snapshot: %d hits %d misses>" % (sum(self.hits.values()),
+                                                  sum(self.misses.values()))
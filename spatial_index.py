@@ -0,0 +1,249 @@
+"""Class file for `SpatialIndex`."""
+import math
+from config import Config
+from projection import Projection
+
+
+class SpatialIndex:
+    """`SpatialIndex` is a uniform grid over the projected coordinates of the
+    nodes (see `Projection`). Each item (an aircraft, a node, etc.) is stored
+    with its location node in the cell covering that node. Cells are as large
+    as the `close_node_threshold` by default so finding the items close to a
+    node only visits the 3x3 cells around it instead of scanning all items.
+    Candidates found in the cells are checked with `Node.is_close_to` so the
+    results are the same as the ones of a linear scan.
+    """
+
+    def __init__(self, cell_size=None):
+
+        if cell_size is None:
+            cell_size = Config.params["simulation"]["close_node_threshold"]
+
+        self.cell_size = float(cell_size)
+
+        # cells[cell][item] = node
+        self.cells = {}
+
+        # locations[item] = (cell, node)
+        self.locations = {}
+
+    def get_cell(self, node):
+        """Returns the cell covering the given node."""
+        x, y = node.xy
+        return (int(math.floor(x / self.cell_size)),
+                int(math.floor(y / self.cell_size)))
+
+    def add(self, item, node):
+        """Adds an item located at the given node or moves it there if the
+        item is already indexed. The item is removed if the node is None.
+        """
+
+        if node is None:
+            self.remove(item)
+            return
+
+        cell = self.get_cell(node)
+        location = self.locations.get(item)
+
+        if location is not None:
+            if location[0] == cell:
+                self.cells[cell][item] = node
+                self.locations[item] = (cell, node)
+                return
+            self.remove(item)
+
+        self.cells.setdefault(cell, {})[item] = node
+        self.locations[item] = (cell, node)
+
+    def update(self, item, node):
+        """Updates the location of an item."""
+        self.add(item, node)
+
+    def remove(self, item):
+        """Removes an item from the index if it exists."""
+        location = self.locations.pop(item, None)
+        if location is None:
+            return
+        cell = self.cells[location[0]]
+        del cell[item]
+        if not cell:
+            del self.cells[location[0]]
+
+    def get_candidates(self, node, radius):
+        """Yields (item, item_node) pairs that may be within `radius` feets of
+        the given node. Items farther than that are skipped cheaply; items
+        yielded still need an exact check.
+        """
+
+        x, y = node.xy
+        reach = self.__get_reach(x, y, radius)
+        n_cells = int(math.ceil(reach / self.cell_size))
+        cell_x = int(math.floor(x / self.cell_size))
+        cell_y = int(math.floor(y / self.cell_size))
+
+        for i in range(cell_x - n_cells, cell_x + n_cells + 1):
+            for j in range(cell_y - n_cells, cell_y + n_cells + 1):
+                cell = self.cells.get((i, j))
+                if cell:
+                    yield from list(cell.items())
+
+    def get_close_items(self, node):
+        """Returns the items located close to the given node."""
+        threshold = Config.params["simulation"]["close_node_threshold"]
+        return [item for item, item_node in self.get_candidates(node,
+                                                                threshold)
+                if item_node.is_close_to(node)]
+
+    def has_close_item(self, node):
+        """Returns true if any item is located close to the given node."""
+        threshold = Config.params["simulation"]["close_node_threshold"]
+        for _, item_node in self.get_candidates(node, threshold):
+            if item_node.is_close_to(node):
+                return True
+        return False
+
+    def get_close_pairs(self):
+        """Returns all the pairs (a, b) of items located close to each other
+        where a < b. The pairs are sorted so the result doesn't depend on the
+        layout of the cells.
+        """
+        threshold = Config.params["simulation"]["close_node_threshold"]
+        pairs = []
+        for item, (_, node) in self.locations.items():
+            for other, other_node in self.get_candidates(node, threshold):
+                if item < other and node.is_close_to(other_node):
+                    pairs.append((item, other))
+        pairs.sort()
+        return pairs
+
+    def is_close_to(self, item, node):
+        """Returns true if the indexed item is located close to the given
+        node. Items in cells far from the node are rejected without
+        calculating the distance.
+        """
+        location = self.locations.get(item)
+        if location is None:
+            return False
+
+        threshold = Config.params["simulation"]["close_node_threshold"]
+        x, y = node.xy
+        reach = self.__get_reach(x, y, threshold)
+        n_cells = int(math.ceil(reach / self.cell_size))
+        (item_x, item_y) = location[0]
+        if abs(item_x - math.floor(x / self.cell_size)) > n_cells or \
+           abs(item_y - math.floor(y / self.cell_size)) > n_cells:
+            return False
+        return location[1].is_close_to(node)
+
+    @classmethod
+    def __get_reach(cls, x, y, radius):
+        # Inflates the radius by the error bound of the projection so that
+        # no item within `radius` on the exact distance is missed
+        distance_to_origin = math.hypot(x, y) + radius
+        return radius * (1 + 2 * Projection.max_relative_error(
+            distance_to_origin))
+
+    def copy(self, items=None):
+        """Returns a copy of this index where the items are replaced by
+        `items[item]` if a mapping is given. The layout of the cells is kept
+        so the copy yields the items in the same order.
+        """
+
+        index = SpatialIndex.__new__(SpatialIndex)
+        index.cell_size = self.cell_size
+        if items is None:
+            index.cells = {cell: dict(cell_items)
+                           for cell, cell_items in self.cells.items()}
+            index.locations = dict(self.locations)
+        else:
+            index.cells = {cell: {items[item]: node
+                                  for item, node in cell_items.items()}
+                           for cell, cell_items in self.cells.items()}
+            index.locations = {items[item]: location
+                               for item, location in self.locations.items()}
+        return index
+
+    def __contains__(self, item):
+        return item in self.locations
+
+    def __len__(self):
+        return len(self.locations)
+
+    def __repr__(self):
+        return "<SpatialIndex: %d items in %d cells>" % (len(self.locations),
+                                                         len(self.cells))
+
+
+class SegmentIndex:
+    """`SegmentIndex` is a uniform grid over the projected coordinates of
+    segments (straight lines between two nodes). Each item is stored in all
+    the cells covered by its segment widened by a reach, so finding the items
+    whose segment may be within reach of a node only visits the cell of that
+    node. Like `SpatialIndex`, the reach is inflated by the error bound of the
+    projection so candidates are never missed; they still need an exact
+    check.
+    """
+
+    def __init__(self, cell_size=None):
+
+        if cell_size is None:
+            cell_size = Config.params["simulation"]["close_node_threshold"]
+
+        self.cell_size = float(cell_size)
+
+        # cells[cell] = list of items
+        self.cells = {}
+
+        # segments[item] = (x1, y1, x2, y2, reach)
+        self.segments = {}
+
+    def add(self, item, src, dst, reach):
+        """Adds an item for the segment from `src` to `dst` which matches
+        the nodes within `reach` feets of the segment.
+        """
+
+        (x1, y1), (x2, y2) = src.xy, dst.xy
+        distance_to_origin = max(math.hypot(x1, y1), math.hypot(x2, y2))
+        reach = reach * (1 + 2 * Projection.max_relative_error(
+            distance_to_origin + reach))
+        self.segments[item] = (x1, y1, x2, y2, reach)
+
+        for i in range(int(math.floor((min(x1, x2) - reach) / self.cell_size)),
+                       int(math.floor((max(x1, x2) + reach) / self.cell_size))
+                       + 1):
+            for j in range(
+                    int(math.floor((min(y1, y2) - reach) / self.cell_size)),
+                    int(math.floor((max(y1, y2) + reach) / self.cell_size))
+                    + 1):
+                self.cells.setdefault((i, j), []).append(item)
+
+    def get_candidates(self, node):
+        """Returns the items, in the order they were added, whose segment is
+        within reach of the given node.
+        """
+
+        x, y = node.xy
+        cell = (int(math.floor(x / self.cell_size)),
+                int(math.floor(y / self.cell_size)))
+
+        return [item for item in self.cells.get(cell, [])
+                if self.__get_distance_to_segment(x, y, self.segments[item])
+                <= self.segments[item][4]]
+
+    @classmethod
+    def __get_distance_to_segment(cls, x, y, segment):
+        x1, y1, x2, y2, _ = segment
+        dx, dy = x2 - x1, y2 - y1
+        length_squared = dx * dx + dy * dy
+        if length_squared == 0:
+            return math.hypot(x - x1, y - y1)
+        ratio = max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) /
+                             length_squared))
+        return math.hypot(x - x1 - ratio * dx, y - y1 - ratio * dy)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def __repr__(self):
+        return "<SegmentIndex: %d items in %d cells>" % (len(self.segments),
+                                                         len(self.cells))
@@ -2,7 +2,7 @@
 import os
 import json
 import logging
-from utils import get_output_dir_name
+from utils import get_output_dir_name, format_seconds
 
 
 class StateLogger:
@@ -26,12 +26,12 @@ class StateLogger:
         """Logs the simulation states on tick."""
 
         aircrafts = [
-            self.__parse_aircraft(aircraft)
+            self.__parse_aircraft(aircraft, simulation.snapshot)
             for aircraft in simulation.airport.aircrafts
         ]
 
         state = {
-            "time": self.__parse_time(simulation.now),
+            "time": format_seconds(simulation.now),
             "aircrafts": aircrafts
         }
 
@@ -39,7 +39,7 @@ class StateLogger:
             fout.write(json.dumps(state) + "\n")
         return state
 
-    def __parse_aircraft(self, aircraft):
+    def __parse_aircraft(self, aircraft, snapshot):
 
         itinerary = self.__parse_itinerary(aircraft.itinerary)
         itinerary_index = aircraft.itinerary.index if itinerary else None
@@ -51,8 +51,8 @@ class StateLogger:
 
         return {
             "callsign": aircraft.callsign,
-            "state": aircraft.state.name,
-            "is_delayed": aircraft.is_delayed,
+            "state": snapshot.get_state(aircraft).name,
+            "is_delayed": any(snapshot.get_delay(aircraft)),
             "location": aircraft.location.geo_pos,
             "itinerary": itinerary,
             "itinerary_index": itinerary_index,
@@ -70,10 +70,6 @@ class StateLogger:
             for target in itinerary.targets
         ] if itinerary is not None else None
 
-    @classmethod
-    def __parse_time(cls, time):
-        return "%02d:%02d:%02d" % (time.hour, time.minute, time.second)
-
     @property
     def output_filename(self):
         """Gets the output filename of json file storing all the states."""
@@ -10,6 +10,8 @@ import cache
 from node import Node
 from link import Link
 from config import Config
+from projection import Projection
+from spatial_index import SegmentIndex
 
 
 class Surface:
@@ -17,6 +19,10 @@ class Surface:
     within an airport, including its gates, spot positions, runways, etc.
     """
 
+    # Bump this when the result of `break_links` or the pickled `Link`
+    # changes
+    CACHE_FORMAT_VERSION = 3
+
     def __init__(self, center, corners, image_filepath):
 
         self.logger = logging.getLogger(__name__)
@@ -33,6 +39,9 @@ class Surface:
 
         self.break_nodes = set([])
 
+        # Digest of the data files this surface is loaded from
+        self.source_hash = None
+
     def break_links(self):
         """ One node that connects to a link in the middle is not connected;
         therefore, break_links is used for cutting at the middle point and
@@ -44,7 +53,10 @@ class Surface:
 
         # Loads all_nodes from cache if exists
         if cache_enabled:
-            hash_key = cache.get_hash([], self.nodes)
+            content_hash = self.source_hash or \
+                cache.get_hash(self.links, self.nodes)
+            hash_key = cache.get_key("links", self.CACHE_FORMAT_VERSION,
+                                     content_hash, cache.get_surface_params())
             cached = cache.get(hash_key)
             if cached:
                 self.runways, self.taxiways, self.pushback_ways = cached
@@ -60,9 +72,13 @@ class Surface:
             self.__add_break_node(link.start)
             self.__add_break_node(link.end)
 
-        index = 0
-        while index < len(all_nodes):
-            index = self.__break_next_link(all_nodes, index)
+        # Nodes shared by several links only need to be checked once
+        all_nodes = list(dict.fromkeys(all_nodes))
+
+        # TODO: Not splitting runways. Should take arrivals into consideration.
+        self.taxiways = self.__break_links_at(self.taxiways, all_nodes)
+        self.pushback_ways = self.__break_links_at(self.pushback_ways,
+                                                   all_nodes)
 
         self.logger.info("Done breaking links")
         self.__get_break_nodes()
@@ -72,33 +88,54 @@ class Surface:
             to_cache = [self.runways, self.taxiways, self.pushback_ways]
             cache.put(hash_key, to_cache)
 
-    def __break_next_link(self, all_nodes, index):
-
-        for i in range(index, len(all_nodes)):
-            node = all_nodes[i]
-
-            # TODO: Not splitting runways. Should take arrivals into consideration.
-
-            # Taxiway
-            for taxiway in self.taxiways:
-                if taxiway.contains_node(node):
-                    self.logger.info("Break found at %s on %s", node, taxiway)
-                    self.__add_break_node(node)
-                    self.taxiways.remove(taxiway)
-                    self.taxiways += taxiway.break_at(node)
-                    return i
-
-            # Pushback ways
-            for pushback_way in self.pushback_ways:
-                if pushback_way.contains_node(node):
-                    self.pushback_ways.remove(pushback_way)
-                    self.pushback_ways += pushback_way.break_at(node)
-                    self.logger.info("Break found at %s on %s",
-                                     node, pushback_way)
-                    self.__add_break_node(node)
-                    return i
+    def __break_links_at(self, links, nodes):
+        """Breaks the given links at all the nodes they contain in their
+        middle and returns the resulting links. Each link is cut once at all
+        its break points; the links are found through an index of their
+        segments instead of checking every link for every node.
+        """
 
-        return len(all_nodes)
+        index = SegmentIndex()
+        for i, link in enumerate(links):
+            for j in range(len(link.nodes) - 1):
+                src, dst = link.nodes[j], link.nodes[j + 1]
+                index.add((i, j), src, dst, Link.get_segment_reach(src, dst))
+
+        # breaks[i] = list of (marker, distance from the marker, node)
+        breaks = {}
+        for node in nodes:
+            segments = {}
+            for i, j in index.get_candidates(node):
+                segments.setdefault(i, []).append(j)
+
+            for i in sorted(segments):
+                link = links[i]
+                if not link.contains_node(node, sorted(segments[i])):
+                    continue
+                marker = link.contains_node_at(node, sorted(segments[i]))
+                distance = link.nodes[marker].get_distance_to(node)
+                breaks.setdefault(i, []).append((marker, distance, node))
+                self.logger.info("Break found at %s on %s", node, link)
+                self.__add_break_node(node)
+
+        new_links = []
+        for i, link in enumerate(links):
+            if i not in breaks:
+                new_links.append(link)
+                continue
+
+            # A break point close to one found before is the same node
+            link_breaks = []
+            for marker, distance, node in breaks[i]:
+                if any(node.is_close_to(b[2]) for b in link_breaks):
+                    continue
+                link_breaks.append((marker, distance, node))
+            link_breaks.sort(key=lambda b: (b[0], b[1]))
+
+            new_links += link.break_at_nodes(
+                [(marker, node) for marker, _, node in link_breaks])
+
+        return new_links
 
     def __add_break_node(self, node):
         lat, lng = node.geo_pos["lat"], node.geo_pos["lng"]
@@ -221,8 +258,8 @@ class Spot(Node):
 class RunwayNode(Node):
     """Extends `Node` class to represent a runway node."""
 
-    def __init__(self, geo_pos):
-        Node.__init__(self, "", geo_pos)
+    def __init__(self, geo_pos, name=""):
+        Node.__init__(self, name, geo_pos)
 
 
 class Runway(Link):
@@ -284,16 +321,29 @@ class SurfaceFactory:
         cls.logger = logging.getLogger(__name__)
         surface = Surface(airport_raw["center"], airport_raw["corners"],
                           dir_path + "airport.jpg")
+
+        # Nodes of this airport are projected on a plane around its center
+        Projection.set_origin(surface.center)
+
         SurfaceFactory.__load_gates(surface, dir_path)
         SurfaceFactory.__load_spots(surface, dir_path)
         SurfaceFactory.__load_runway(surface, dir_path)
         SurfaceFactory.__load_gates_to_spots_mapping(surface, dir_path)
         SurfaceFactory.__load_taxiway(surface, dir_path)
         SurfaceFactory.__load_pushback_way(surface, dir_path)
+        surface.source_hash = SurfaceFactory.get_source_hash(dir_path)
 
         surface.break_links()
         return surface
 
+    @classmethod
+    def get_source_hash(cls, dir_path):
+        """Returns the digest of the data files a surface is loaded from."""
+        return cache.get_file_hash(
+            [dir_path + filename for filename in cls.FILES_TO_CHECK
+             if filename.endswith(".json")] +
+            [dir_path + "gates_spots.json"])
+
     @classmethod
     def __is_data_ready(cls, dir_path):
 
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
-import datetime
+import random
+import itertools
 from node import Node
 from airport import Airport
 from aircraft import Aircraft, State
@@ -22,7 +23,7 @@ class TestAirport(unittest.TestCase):
     class SimulationMock():
         @property
         def now(self):
-            return datetime.time(0, 0)
+            return 0
 
     def test_conflicts(self):
 
@@ -53,3 +54,25 @@ class TestAirport(unittest.TestCase):
 
         # Test if the third aircraft shown in conflict correctly
         self.assertEqual(len(airport.conflicts), 3)
+
+    def test_conflicts_same_as_pairwise(self):
+
+        airport = Airport.create("simple")
+        nodes = []
+        for link in airport.surface.links:
+            nodes += link.nodes
+
+        rand = random.Random(0)
+        for i in range(60):
+            airport.aircrafts.append(
+                Aircraft("A%d" % i, None, rand.choice(nodes), State.stop))
+
+        expected = [
+            pair for pair in itertools.combinations(airport.aircrafts, 2)
+            if pair[0].location.is_close_to(pair[1].location)
+        ]
+        conflicts = airport.conflicts
+
+        self.assertTrue(conflicts)
+        self.assertEqual([conflict.aircrafts for conflict in conflicts],
+                         expected)
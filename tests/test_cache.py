@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+import os
+import time
+import shutil
+import tempfile
+import cache
+
+import sys
+import unittest
+sys.path.append('..')
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = cache.CACHE_DIR
+        cache.CACHE_DIR = tempfile.mkdtemp() + "/"
+
+    def tearDown(self):
+        shutil.rmtree(cache.CACHE_DIR)
+        cache.CACHE_DIR = self.cache_dir
+
+    def test_put_and_get(self):
+
+        hits = cache.STATS["hits"]
+        misses = cache.STATS["misses"]
+
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", {"value": [1, 2, 3]})
+        self.assertEqual(cache.get("key"), {"value": [1, 2, 3]})
+
+        self.assertEqual(cache.STATS["hits"], hits + 1)
+        self.assertEqual(cache.STATS["misses"], misses + 1)
+
+        # No temporary file is left behind
+        self.assertEqual(os.listdir(cache.CACHE_DIR), ["key.pkl"])
+
+    def test_unreadable_entry(self):
+
+        cache.put("key", "value")
+        with open(cache.CACHE_DIR + "key.pkl", "wb") as fout:
+            fout.write(b"\x80")
+
+        self.assertIsNone(cache.get("key"))
+        self.assertFalse(os.path.exists(cache.CACHE_DIR + "key.pkl"))
+
+    def test_get_key(self):
+
+        params = {"close_node_threshold": 30}
+        key = cache.get_key("routes", 1, "abc", params)
+
+        self.assertEqual(key, cache.get_key("routes", 1, "abc", params))
+        self.assertNotEqual(key, cache.get_key("routes", 2, "abc", params))
+        self.assertNotEqual(key, cache.get_key("routes", 1, "abd", params))
+        self.assertNotEqual(key, cache.get_key("routes", 1, "abc",
+                                               {"close_node_threshold": 20}))
+        self.assertTrue(key.startswith("routes-"))
+
+    def test_evict_least_recently_used(self):
+
+        for key in ["k1", "k2", "k3"]:
+            cache.put(key, "x" * 1000)
+
+        # k1 is used last so k2 is the least recently used one
+        now = time.time()
+        os.utime(cache.CACHE_DIR + "k2.pkl", (now - 30, now - 30))
+        os.utime(cache.CACHE_DIR + "k3.pkl", (now - 20, now - 20))
+        os.utime(cache.CACHE_DIR + "k1.pkl", (now - 40, now - 40))
+        cache.get("k1")
+
+        cache.evict(2500)
+        self.assertEqual(sorted(os.listdir(cache.CACHE_DIR)),
+                         ["k1.pkl", "k3.pkl"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 
-from clock import Clock
+from clock import Clock, ClockException
 from config import Config
 
 import sys
@@ -17,8 +17,7 @@ class TestClock(unittest.TestCase):
         clock = Clock()
         Config.params["simulation"]["time_unit"] = self.SIM_TIME
 
-        self.assertEqual(clock.now.minute, 0)
-        self.assertEqual(clock.now.hour, 0)
+        self.assertEqual(clock.now, 0)
 
     def test_tick(self):
 
@@ -26,11 +25,28 @@ class TestClock(unittest.TestCase):
         Config.params["simulation"]["time_unit"] = self.SIM_TIME
 
         clock.tick()
-        self.assertEqual(clock.now.minute, self.SIM_TIME / 60)
+        self.assertEqual(clock.now, self.SIM_TIME)
 
         clock.tick()
         clock.tick()
-        self.assertEqual(clock.now.minute, (self.SIM_TIME * 3) / 60)
+        self.assertEqual(clock.now, self.SIM_TIME * 3)
+
+    def test_longer_than_a_day(self):
+
+        end_time = Config.params["simulation"]["end_time"]
+        Config.params["simulation"]["end_time"] = "25:00"
+        try:
+            clock = Clock()
+        finally:
+            Config.params["simulation"]["end_time"] = end_time
+
+        clock.now = 24 * 3600
+        clock.tick()
+        self.assertEqual(clock.now, 24 * 3600 + clock.sim_time)
+        self.assertTrue(repr(clock).startswith("<Clock: 24:"))
+
+        clock.now = 25 * 3600
+        self.assertRaises(ClockException, clock.tick)
 
 
 if __name__ == '__main__':
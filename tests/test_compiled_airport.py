@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+import os
+from airport import Airport
+from compiled_airport import CompiledAirport
+from routing_expert import RoutingExpert
+from surface import SurfaceFactory
+from config import Config
+
+import sys
+import unittest
+sys.path.append('..')
+
+
+class TestCompiledAirport(unittest.TestCase):
+
+    AIRPORT = "simple"
+
+    def setUp(self):
+        self.filename = CompiledAirport.FILENAME
+        CompiledAirport.FILENAME = "airport-test.bin"
+
+    def tearDown(self):
+        filepath = CompiledAirport.get_filepath(self.AIRPORT)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        CompiledAirport.FILENAME = self.filename
+
+    def test_not_compiled(self):
+        self.assertIsNone(CompiledAirport.load(self.AIRPORT))
+        self.assertIsNone(Airport.create(self.AIRPORT).compiled)
+
+    def test_same_as_data_files(self):
+
+        CompiledAirport.compile(self.AIRPORT)
+        airport = Airport.create(self.AIRPORT)
+        self.assertIsNotNone(airport.compiled)
+
+        surface = SurfaceFactory.create(
+            Config.DATA_ROOT_DIR_PATH % self.AIRPORT)
+
+        get_geometry = (lambda links: [
+            (type(link), link.name, [node.geo_pos for node in link.nodes])
+            for link in links])
+        self.assertEqual(get_geometry(airport.surface.links),
+                         get_geometry(surface.links))
+        self.assertEqual(airport.surface.nodes, surface.nodes)
+        self.assertEqual([gate.spot for gate in airport.surface.gates],
+                         [gate.spot for gate in surface.gates])
+
+        compiled_expert = RoutingExpert(airport.surface.links,
+                                        airport.surface.nodes, False,
+                                        airport.compiled)
+        routing_expert = RoutingExpert(surface.links, surface.nodes, False)
+        runway_start = surface.runways[0].start
+        for gate in surface.gates:
+            self.assertAlmostEqual(
+                compiled_expert.get_shortest_route(
+                    gate, airport.surface.runways[0].start).distance,
+                routing_expert.get_shortest_route(
+                    gate, runway_start).distance)
+
+    def test_stale(self):
+
+        CompiledAirport.compile(self.AIRPORT)
+        threshold = Config.params["simulation"]["close_node_threshold"]
+        Config.params["simulation"]["close_node_threshold"] = threshold + 1
+        try:
+            self.assertIsNone(CompiledAirport.load(self.AIRPORT))
+        finally:
+            Config.params["simulation"]["close_node_threshold"] = threshold
+        self.assertIsNotNone(CompiledAirport.load(self.AIRPORT))
+
+
+if __name__ == '__main__':
+    unittest.main()
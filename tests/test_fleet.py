@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+import random
+from copy import copy
+from node import Node
+from airport import Airport
+from aircraft import Aircraft, State
+from itinerary import Itinerary
+from fleet import Fleet
+from config import Config
+
+import sys
+import unittest
+sys.path.append('..')
+
+
+class TestFleet(unittest.TestCase):
+
+    Config.params["simulator"]["test_mode"] = True
+
+    N_TICKS = 40
+
+    def tearDown(self):
+        Config.params["simulation"]["fleet_engine"] = False
+
+    def test_same_as_aircraft_tick(self):
+
+        rand = random.Random(0)
+        airport = Airport.create("simple")
+
+        nodes = [Node("G%d" % i, {"lat": 47.822 + (i // 4) * 0.0002,
+                                  "lng": -122.079 + (i % 4) * 0.0002})
+                 for i in range(16)]
+
+        for i in range(8):
+            targets = [rand.choice(nodes)
+                       for _ in range(rand.randint(1, self.N_TICKS))]
+            aircraft = Aircraft("A%d" % i, None, targets[0], State.stop)
+            if i > 0:
+                aircraft.set_itinerary(Itinerary(targets))
+            airport.add_aircraft(aircraft)
+
+        # The same airport ticked without the fleet engine
+        expected = copy(airport)
+
+        for tick in range(self.N_TICKS):
+
+            # Delays are added in the middle of the fleet's ticks
+            if tick % 5 == 2:
+                i = rand.randrange(1, len(airport.aircrafts))
+                airport.aircrafts[i].add_uncertainty_delay()
+                expected.aircrafts[i].add_uncertainty_delay()
+            if tick % 7 == 3:
+                i = rand.randrange(1, len(airport.aircrafts))
+                airport.aircrafts[i].add_scheduler_delay()
+                expected.aircrafts[i].add_scheduler_delay()
+
+            Config.params["simulation"]["fleet_engine"] = True
+            airport.tick()
+            Config.params["simulation"]["fleet_engine"] = False
+            expected.tick()
+
+            # Aircrafts are only looked at on some ticks
+            if tick % 3 == 0:
+                for aircraft, expected_aircraft in zip(airport.aircrafts,
+                                                       expected.aircrafts):
+                    self.__assert_same(aircraft, expected_aircraft)
+
+        for aircraft, expected_aircraft in zip(airport.aircrafts,
+                                               expected.aircrafts):
+            self.__assert_same(aircraft, expected_aircraft)
+
+    def __assert_same(self, aircraft, expected):
+        self.assertIs(aircraft.location, expected.location)
+        if expected.itinerary is None:
+            return
+        self.assertEqual(aircraft.itinerary.cursor, expected.itinerary.cursor)
+        self.assertEqual(aircraft.itinerary.n_future_uncertainty_delay,
+                         expected.itinerary.n_future_uncertainty_delay)
+        self.assertEqual(aircraft.is_delayed, expected.is_delayed)
+
+    def test_same_states_as_aircraft(self):
+
+        rand = random.Random(1)
+
+        # Nodes a few feet apart are close to each other
+        nodes = [Node("N%d" % i, {"lat": 47.822 + (i // 4) * 0.0002,
+                                  "lng": -122.079 + (i % 4) * 0.00005})
+                 for i in range(16)]
+
+        aircrafts = []
+        for i in range(8):
+            targets = [rand.choice(nodes)
+                       for _ in range(rand.randint(1, self.N_TICKS))]
+            aircraft = Aircraft("A%d" % i, None, targets[0], State.stop)
+            if i > 0:
+                aircraft.set_itinerary(Itinerary(targets))
+            aircrafts.append(aircraft)
+
+        codes = {Fleet.STOP: State.stop, Fleet.HOLD: State.hold,
+                 Fleet.MOVING: State.moving}
+        fleet = Fleet(aircrafts)
+        for tick in range(self.N_TICKS):
+            if tick % 4 == 1:
+                rand.choice(aircrafts[1:]).add_scheduler_delay()
+                self.assertTrue(fleet.track(aircrafts))
+            fleet.tick()
+
+            states = [codes[code] for code in fleet.states]
+            fleet.materialise()
+            self.assertEqual(states,
+                             [aircraft.state for aircraft in aircrafts])
+
+    def test_states(self):
+
+        nodes = [Node("N%d" % i, {"lat": 47.822, "lng": -122.079 + i * 0.001})
+                 for i in range(3)]
+
+        moving = Aircraft("A1", None, nodes[0], State.stop)
+        moving.set_itinerary(Itinerary(nodes))
+        holding = Aircraft("A2", None, nodes[0], State.stop)
+        holding.set_itinerary(Itinerary(nodes))
+        holding.add_scheduler_delay()
+        stopped = Aircraft("A3", None, nodes[0], State.stop)
+
+        fleet = Fleet([moving, holding, stopped])
+        self.assertEqual(list(fleet.states),
+                         [Fleet.MOVING, Fleet.HOLD, Fleet.STOP])
+
+        fleet.tick()
+        self.assertEqual(list(fleet.states),
+                         [Fleet.MOVING, Fleet.MOVING, Fleet.STOP])
+
+        # Not materialised yet
+        self.assertEqual(moving.itinerary.index, 0)
+        fleet.materialise()
+        self.assertEqual(moving.itinerary.index, 1)
+        self.assertIs(moving.location, nodes[1])
+        self.assertIs(holding.location, nodes[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -114,6 +114,124 @@ class TestItinerary(unittest.TestCase):
         self.assertEqual(itinerary.current_target, self.n1)
         self.assertEqual(itinerary.next_target, self.n2)
 
+    def test_delayed_index(self):
+
+        # Gets a copy of the itinerary
+        itinerary = deepcopy(self.itinerary_template)
+
+        itinerary.tick()
+        itinerary.add_uncertainty_delay(2)
+        itinerary.add_scheduler_delay()
+        # n1 - [n2] - n2 - n2 - n2 - n3
+        self.assertEqual(itinerary.targets,
+                         [self.n1, self.n2, self.n2, self.n2, self.n2,
+                          self.n3])
+        self.assertEqual(itinerary.scheduler_delayed_index, [1])
+        self.assertEqual(itinerary.uncertainty_delayed_index, [2, 3])
+
+        # The route is kept as it is
+        self.assertEqual(itinerary.route, (self.n1, self.n2, self.n3))
+        self.assertEqual(itinerary.length, 6)
+
+    def test_equality(self):
+
+        itinerary = Itinerary(targets=[self.n1, self.n2, self.n3])
+        other = Itinerary(targets=(self.n1, self.n2, self.n3))
+        self.assertEqual(itinerary.route_id, other.route_id)
+        self.assertEqual(itinerary, other)
+        self.assertEqual(hash(itinerary), hash(other))
+
+        # The delays are compared as well
+        other.add_scheduler_delay()
+        self.assertNotEqual(itinerary, other)
+        itinerary.add_scheduler_delay()
+        self.assertEqual(itinerary, other)
+        self.assertEqual(hash(itinerary), hash(other))
+
+        self.assertNotEqual(itinerary.route_id,
+                            Itinerary(targets=[self.n1, self.n2]).route_id)
+
+        # On the same route, holding at another target makes a different
+        # itinerary
+        itinerary = Itinerary(targets=[self.n1, self.n2, self.n3])
+        other = Itinerary(targets=[self.n1, self.n2, self.n3])
+        itinerary.add_scheduler_delay()
+        other.tick()
+        other.add_scheduler_delay()
+        self.assertEqual(itinerary.route_id, other.route_id)
+        self.assertNotEqual(itinerary, other)
+        self.assertNotEqual(hash(itinerary), hash(other))
+
+        # Other types are never equal
+        self.assertNotEqual(itinerary, itinerary.route_id)
+        self.assertNotEqual(itinerary, None)
+
+    def test_get_remaining(self):
+
+        # Gets a copy of the itinerary
+        itinerary = deepcopy(self.itinerary_template)
+
+        itinerary.add_scheduler_delay()
+        itinerary.tick()
+        itinerary.tick()
+        itinerary.add_uncertainty_delay()
+        # n1 - n1 - [n2] - n2 - n3
+
+        remaining = itinerary.get_remaining()
+        # [n2] - n2 - n3
+        self.assertEqual(remaining.targets, [self.n2, self.n2, self.n3])
+        self.assertEqual(remaining.current_target, self.n2)
+        self.assertEqual(remaining.n_scheduler_delay, 0)
+        self.assertEqual(remaining.n_uncertainty_delay, 1)
+        self.assertTrue(remaining.is_delayed_by_uncertainty_now)
+
+        # The original one isn't changed
+        self.assertEqual(itinerary.length, 5)
+        self.assertEqual(itinerary.index, 2)
+
+    def test_restore(self):
+
+        # Gets a copy of the itinerary
+        itinerary = deepcopy(self.itinerary_template)
+
+        itinerary.add_scheduler_delay()
+        itinerary.tick()
+        itinerary.tick()
+        itinerary.add_uncertainty_delay()
+        itinerary.add_scheduler_delay()
+        # n1 - n1 - [n2] - n2 - n2 - n3
+
+        itinerary.restore()
+        # n1 - [n2] - n2 - n3
+        self.assertEqual(itinerary.targets,
+                         [self.n1, self.n2, self.n2, self.n3])
+        self.assertEqual(itinerary.index, 1)
+        self.assertEqual(itinerary.n_scheduler_delay, 0)
+        self.assertEqual(itinerary.n_uncertainty_delay, 1)
+        self.assertTrue(itinerary.is_delayed_by_uncertainty_now)
+
+    def test_restore_keeps_previous_schedule(self):
+
+        # Gets a copy of the itinerary
+        itinerary = deepcopy(self.itinerary_template)
+
+        itinerary.tick()
+        itinerary.add_scheduler_delay()
+        # n1 - [n2] - n2 - n3
+
+        remaining = itinerary.get_remaining()
+        remaining.add_scheduler_delay()
+        remaining.tick()
+        remaining.tick()
+        remaining.add_scheduler_delay()
+        # n2 - n2 - [n2] - n2 - n3
+
+        remaining.restore()
+        # [n2] - n2 - n3
+        self.assertEqual(remaining.targets, [self.n2, self.n2, self.n3])
+        self.assertEqual(remaining.index, 0)
+        self.assertEqual(remaining.n_scheduler_delay, 1)
+
     def test_is_delayed(self):
         # NOTE: is_delayed looks at the last target instead of the current one
 
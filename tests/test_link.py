@@ -47,6 +47,23 @@ class TestLink(unittest.TestCase):
         self.assertAlmostEqual(links[0].length + links[1].length,
                                link.length, 1)
 
+    def test_break_at_nodes(self):
+
+        link = Link("link-123", self.nodes)
+        Config.params["simulation"]["close_node_link_threshold"] = 10
+        breaks = [(link.contains_node_at(self.link_node1), self.link_node1)]
+        links = link.break_at_nodes(breaks)
+        self.assertEqual([l.nodes for l in links],
+                         [l.nodes for l in link.break_at(self.link_node1)])
+
+        # Cutting once at several nodes
+        links = link.break_at_nodes(breaks + [(1, self.link_node3)])
+        self.assertEqual(len(links), 3)
+        self.assertEqual(links[0].nodes, [self.n1, self.link_node1])
+        self.assertEqual(links[1].nodes,
+                         [self.link_node1, self.n2, self.link_node3])
+        self.assertEqual(links[2].nodes, [self.link_node3, self.n3])
+
     def test_break_at_end_node(self):
 
         link = Link("link-123", self.nodes)
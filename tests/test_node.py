@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 
+import pickle
+from copy import deepcopy
 from node import Node
 
 import sys
@@ -46,6 +48,32 @@ class TestNode(unittest.TestCase):
         self.assertNotEqual(n1.__hash__(), n2.__hash__())
         self.assertFalse(n1.__eq__(n2))
 
+    def test_integer_id(self):
+
+        geo_pos = {"lat": 51.5033640, "lng": -0.1276250}
+        n1 = Node("node-123", geo_pos)
+        n2 = Node("node-123", geo_pos)
+        n3 = Node("node-456", geo_pos)
+
+        self.assertTrue(isinstance(n1.id, int))
+        self.assertEqual(n1.id, n2.id)
+        self.assertNotEqual(n1.id, n3.id)
+
+    def test_copy_shares_node(self):
+
+        n1 = Node("node-123", {"lat": 51.5033640, "lng": -0.1276250})
+        nodes = deepcopy([n1])
+
+        self.assertTrue(nodes[0] is n1)
+
+    def test_pickle(self):
+
+        n1 = Node("node-123", {"lat": 51.5033640, "lng": -0.1276250})
+        n2 = pickle.loads(pickle.dumps(n1))
+
+        self.assertEqual(n1, n2)
+        self.assertEqual(n1.__hash__(), n2.__hash__())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+from config import Config
+from profiler import Profiler, PhaseTimings
+from simulation import Simulation
+
+import sys
+import unittest
+sys.path.append('..')
+
+
+class TestProfiler(unittest.TestCase):
+
+    Config.params["airport"] = "simple"
+    Config.params["uncertainty"]["enabled"] = False
+    Config.params["simulator"]["test_mode"] = True
+
+    def tearDown(self):
+        Config.params["simulator"]["profile"] = False
+
+    def test_disabled(self):
+
+        profiler = Profiler(False)
+        start = profiler.start()
+        self.assertIsNone(start)
+        profiler.stop("phase", start)
+        self.assertEqual(profiler.summary, {})
+
+    def test_histogram(self):
+
+        timings = PhaseTimings()
+        for duration in [500, 1500, 3000, 3999, 10 ** 6]:
+            timings.add(duration)
+
+        summary = timings.summary
+        self.assertEqual(summary["count"], 5)
+        self.assertEqual(summary["min"], 500 / 1e9)
+        self.assertEqual(summary["max"], 10 ** 6 / 1e9)
+        self.assertEqual(summary["histogram_us"],
+                         {"1": 1, "2": 1, "4": 2, "1024": 1})
+
+        profiler = Profiler(True)
+        profiler.stop("phase", profiler.start())
+        self.assertEqual(profiler.summary["phase"]["count"], 1)
+
+    def test_simulation_phases(self):
+
+        Config.params["simulator"]["profile"] = True
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+        simulation = Simulation()
+        for _ in range(3):
+            simulation.tick()
+
+        summary = simulation.profiler.summary
+        for phase in ["reschedule", "add_aircrafts", "airport_tick",
+                      "remove_aircrafts", "conflict_check"]:
+            self.assertIn(phase, summary)
+        self.assertEqual(summary["airport_tick"]["count"], 3)
+        self.assertGreaterEqual(summary["reschedule"]["count"], 1)
+
+        # The scheduler records its phases into the same profiler
+        self.assertIs(simulation.scheduler.profiler, simulation.profiler)
+        self.assertIn("scheduler.clone", summary)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+import os
+import json
+import random
+from node import Node
+from projection import Projection
+from config import Config
+
+import sys
+import unittest
+sys.path.append('..')
+
+
+class TestProjection(unittest.TestCase):
+
+    N_RANDOM_PAIRS = 1000
+
+    def setUp(self):
+        self.projection = (Projection.origin, Projection.east_scale,
+                           Projection.north_scale)
+        self.distance = Config.params["simulation"]["distance"]
+
+    def tearDown(self):
+        # Restores the origin under a new version so that positions cached
+        # on the origins set by these tests are projected again
+        Projection.origin, Projection.east_scale, Projection.north_scale = \
+            self.projection
+        Projection.version += 1
+        Config.params["simulation"]["distance"] = self.distance
+
+    def test_origin(self):
+
+        center = {"lat": 37.61678035, "lng": -122.37791105}
+        Projection.set_origin(center)
+
+        node = Node("center", center)
+        self.assertAlmostEqual(node.xy[0], 0.0)
+        self.assertAlmostEqual(node.xy[1], 0.0)
+
+    def test_reproject(self):
+
+        node = Node("N1", {"lat": 37.4126584, "lng": -122.05580950000001})
+
+        Projection.set_origin({"lat": 37.61678035, "lng": -122.37791105})
+        far = node.xy
+        Projection.set_origin(
+            {"lat": 37.4126584, "lng": -122.05580950000001})
+        self.assertNotEqual(node.xy, far)
+        self.assertAlmostEqual(node.xy[0], 0.0)
+
+    def test_backend(self):
+
+        n1 = Node("N1", {"lat": 37.61678035, "lng": -122.37791105})
+        n2 = Node("N2", {"lat": 37.61778035, "lng": -122.37691105})
+        Projection.set_origin(n1.geo_pos)
+
+        Config.params["simulation"]["distance"] = "planar"
+        self.assertEqual(n1.get_distance_to(n2),
+                         n1.get_planar_distance_to(n2))
+
+        Config.params["simulation"]["distance"] = "exact"
+        self.assertEqual(n1.get_distance_to(n2),
+                         n1.get_exact_distance_to(n2))
+
+    def test_error_bound_on_shipped_airports(self):
+
+        airports = sorted(os.listdir(Config.DATA_GENERATION_DIR_PATH % ""))
+        self.assertTrue(airports)
+
+        for airport in airports:
+            dir_path = Config.DATA_ROOT_DIR_PATH % airport
+            if not os.path.exists(dir_path + "airport-metadata.json"):
+                continue
+            with self.subTest(airport=airport):
+                self.__check_airport(dir_path)
+
+    def __check_airport(self, dir_path):
+
+        with open(dir_path + "airport-metadata.json") as fin:
+            Projection.set_origin(json.load(fin)["center"])
+
+        nodes, segments = [], []
+        for type_name in ["gates", "spots"]:
+            with open(dir_path + type_name + ".json") as fin:
+                for raw in json.load(fin):
+                    nodes.append(Node(raw["name"], {"lat": raw["lat"],
+                                                    "lng": raw["lng"]}))
+        for type_name in ["runways", "taxiways", "pushback_ways"]:
+            with open(dir_path + type_name + ".json") as fin:
+                for raw in json.load(fin):
+                    link_nodes = [Node(raw["name"], {"lat": n[1],
+                                                     "lng": n[0]})
+                                  for n in raw["nodes"]]
+                    nodes += link_nodes
+                    segments += zip(link_nodes[:-1], link_nodes[1:])
+
+        radius = max(Node("", {"lat": Projection.origin[0],
+                               "lng": Projection.origin[1]})
+                     .get_planar_distance_to(node) for node in nodes)
+        bound = Projection.max_relative_error(radius)
+
+        rand = random.Random(0)
+        pairs = segments + [tuple(rand.sample(nodes, 2))
+                            for _ in range(self.N_RANDOM_PAIRS)]
+
+        for src, dst in pairs:
+            exact = src.get_exact_distance_to(dst)
+            planar = src.get_planar_distance_to(dst)
+            self.assertLessEqual(abs(planar - exact),
+                                 bound * exact + 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@ from routing_expert import RoutingExpert
 from airport import Airport
 from scenario import Scenario
 from surface import RunwayNode, Runway, Spot, Gate
+from collections import deque
 
 import sys
 import unittest
@@ -113,6 +114,68 @@ class TestRoutingExpert(unittest.TestCase):
         self.assertEqual(len(routeG3toR1.nodes), 8)
         self.assertAlmostEqual(routeG3toR1.distance, 1352.6500035604972, 5)
 
+    def test_nodes_are_deduplicated(self):
+        airport_code = "simple"
+
+        self.airport = Airport.create(airport_code)
+        links = self.airport.surface.links
+        nodes = self.airport.surface.nodes
+        n_nodes = len(nodes)
+
+        routing_expert = RoutingExpert(links, nodes, False)
+
+        # The given list is left untouched and link ends are only added once
+        self.assertEqual(len(nodes), n_nodes)
+        self.assertEqual(len(routing_expert.nodes),
+                         len(set(routing_expert.nodes)))
+        for link in links:
+            self.assertIn(link.start, routing_expert.adjacency_map)
+            self.assertIn(link.end, routing_expert.adjacency_map)
+
+        # Close nodes are linked the same way as checking all the pairs
+        for start in routing_expert.nodes:
+            for end in routing_expert.nodes:
+                if start != end and start.is_close_to(end):
+                    self.assertIn(end, routing_expert.adjacency_map[start])
+
+    def test_arrival_route_is_stable(self):
+        airport_code = "simple"
+
+        self.airport = Airport.create(airport_code)
+        links = self.airport.surface.links
+        nodes = self.airport.surface.nodes
+
+        routing_expert = RoutingExpert(links, nodes, False)
+        runway_end = links[0].end
+        gate = self.airport.surface.gates[0]
+
+        # Asking the same route twice should not change the result
+        first = routing_expert.get_shortest_route(runway_end, gate)
+        second = routing_expert.get_shortest_route(runway_end, gate)
+        self.assertTrue(first.is_completed)
+        self.assertEqual(first.links, second.links)
+        self.assertEqual(first.nodes[-1], gate)
+
+    def test_route_cache_is_bounded(self):
+        airport_code = "simple"
+
+        self.airport = Airport.create(airport_code)
+        links = self.airport.surface.links
+        nodes = self.airport.surface.nodes
+
+        routing_expert = RoutingExpert(links, nodes, False)
+        routing_expert.route_cache_size = 2
+        runway_start = links[0].start
+
+        routes = [routing_expert.get_shortest_route(node, runway_start)
+                  for node in self.airport.surface.gates]
+        self.assertEqual(len(routing_expert.route_cache), 2)
+
+        # Evicted routes are reconstructed the same way
+        route = routing_expert.get_shortest_route(
+            self.airport.surface.gates[0], runway_start)
+        self.assertEqual(route.links, routes[0].links)
+
     def test_sfo_terminal_2_closest(self):
         airport_code = "sfo-terminal-2"
 
@@ -190,6 +253,74 @@ class TestRoutingExpert(unittest.TestCase):
             self.assertTrue(len(route.links) >= 1)
             self.assertTrue(route.distance > 0.0)
 
+    def test_same_distances_as_spfa(self):
+
+        for airport_code in ["simple", "sfo-terminal-2"]:
+            self.airport = Airport.create(airport_code)
+            links = self.airport.surface.links
+            nodes = self.airport.surface.nodes
+            routing_expert = RoutingExpert(links, nodes, False)
+            get_route = routing_expert._RoutingExpert__get_route
+
+            for routing_table in [routing_expert.depart_routing_table,
+                                  routing_expert.arrival_routing_table]:
+                for dest in routing_table:
+                    distances = self.__get_spfa_distances(
+                        routing_expert.adjacency_map, dest)
+                    for node in routing_expert.nodes:
+                        route = get_route(routing_table, node, dest)
+                        if route is None:
+                            self.assertEqual(node, dest)
+                        elif node not in distances:
+                            self.assertEqual(route.links, [])
+                        else:
+                            self.assertAlmostEqual(route.distance,
+                                                   distances[node], 5)
+
+    def test_routes_ignore_edge_order(self):
+
+        for airport_code in ["simple", "sfo-terminal-2"]:
+            self.airport = Airport.create(airport_code)
+            links = self.airport.surface.links
+            nodes = self.airport.surface.nodes
+            routing_expert = RoutingExpert(links, nodes, False)
+            expected = [routing_expert.depart_routing_table,
+                        routing_expert.arrival_routing_table]
+
+            # Routes of the same distance are told apart the same way
+            # whatever the order of the neighbors
+            for node, neighbors in routing_expert.adjacency_map.items():
+                routing_expert.adjacency_map[node] = \
+                    dict(reversed(list(neighbors.items())))
+            routing_expert._RoutingExpert__compile_graph()
+            find_routes = \
+                routing_expert._RoutingExpert__finds_shortest_route_dijkstra
+            found = [find_routes(routing_expert.runway_nodes),
+                     find_routes(routing_expert.spot_nodes)]
+
+            for expected_table, routing_table in zip(expected, found):
+                self.assertEqual(expected_table.keys(), routing_table.keys())
+                for dest in expected_table:
+                    self.assertEqual(list(expected_table[dest]),
+                                     list(routing_table[dest]))
+
+    @classmethod
+    def __get_spfa_distances(cls, adjacency_map, dest):
+        """Returns the shortest distances to the destination of the nodes
+        able to reach it, found by SPFA as the routes used to be.
+        """
+        distances = {dest: 0.0}
+        queue = deque([dest])
+        while queue:
+            u = queue.popleft()
+            for v, link in adjacency_map[u].items():
+                new_distance = distances[u] + link.length
+                if new_distance < distances.get(v, float("Inf")):
+                    distances[v] = new_distance
+                    if v not in queue:
+                        queue.append(v)
+        return distances
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+from airport import Airport
+from scenario import Scenario
+
+import sys
+import unittest
+sys.path.append('..')
+
+
+class TestScenario(unittest.TestCase):
+
+    def test_released_flights(self):
+
+        airport = Airport.create("sfo-terminal-2")
+        scenario = Scenario.create("sfo-terminal-2", airport.surface)
+
+        # Same flights in the same order as scanning all the flights
+        now = min(flight.appear_time
+                  for flight in scenario.departures + scenario.arrivals)
+        for _ in range(200):
+            next_time = now + 30
+            self.assertEqual(
+                scenario.get_released_departures(now, next_time),
+                [flight for flight in scenario.departures
+                 if now <= flight.appear_time < next_time])
+            self.assertEqual(
+                scenario.get_released_arrivals(now, next_time),
+                [flight for flight in scenario.arrivals
+                 if now <= flight.appear_time < next_time])
+            now = next_time
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,21 @@
 #!/usr/bin/env python3
+import yaml
 import logging
 from clock import Clock
 from copy import deepcopy
-from datetime import time
 from aircraft import Aircraft, State
 from flight import DepartureFlight
 from node import Node
 from surface import RunwayNode, Spot
-from config import Config
+from config import Config, BASE_LINE_EXPERIMENT_PLAN_FILEPATH
 from simulation import get_scheduler
 from conflict import Conflict
+from itinerary import Itinerary
 
+import os
 import sys
+import hashlib
+import time
 import unittest
 sys.path.append('..')
 
@@ -61,6 +65,10 @@ class TestScheduler(unittest.TestCase):
             self.aircraft1.logger = logger
             self.aircraft2.logger = logger
 
+        def is_occupied_at(self, node):
+            return any(aircraft.location.is_close_to(node)
+                       for aircraft in self.aircrafts)
+
         def tick(self):
             self.aircraft1.tick()
             self.aircraft2.tick()
@@ -84,6 +92,29 @@ class TestScheduler(unittest.TestCase):
                 return [Conflict(None, [self.aircraft1, self.aircraft2])]
             return []
 
+    class LocatedAirportMock(AirportMock):
+
+        # Conflicts found at different locations are different
+        @property
+        def next_conflicts(self):
+            return [Conflict((conflict.aircrafts[0].next_location,
+                              conflict.aircrafts[1].next_location),
+                             conflict.aircrafts)
+                    for conflict in super().next_conflicts]
+
+    class DeadlockAirportMock(AirportMock):
+
+        # While the second aircraft waits at its node, the first one heads
+        # for it (as if it had to pass there)
+        @property
+        def next_conflicts(self):
+            conflicts = super().next_conflicts
+            if self.aircraft1.state == State.moving and \
+               self.aircraft2.state == State.hold:
+                conflicts.append(Conflict((self.aircraft2.location,),
+                                          [self.aircraft1, self.aircraft2]))
+            return conflicts
+
     class RunwayMock():
 
         def __init__(self, runway_start):
@@ -99,31 +130,37 @@ class TestScheduler(unittest.TestCase):
             self.runway = TestScheduler.RunwayMock(runway_start)
             self.g1, self.g2, self.s1 = g1, g2, s1
 
+        def get_released_departures(self, start, end):
+            return []
+
+        def get_released_arrivals(self, start, end):
+            return []
+
         def get_flight(self, aircraft):
             if aircraft.callsign == "A1":
                 return DepartureFlight(
                     "A1", None, None, self.g1, self.s1, self.runway,
-                    time(2, 36), time(2, 36)
+                    9360, 9360
                 )
             elif aircraft.callsign == "A2":
                 return DepartureFlight(
                     "A2", None, None, self.g2, self.s1, self.runway,
-                    time(2, 36, 30), time(2, 36, 30)
+                    9390, 9390
                 )
             elif aircraft.callsign == "A3":
                 return DepartureFlight(
                     "A3", None, None, self.g2, self.s1, self.runway,
-                    time(2, 36, 1), time(2, 36, 1)
+                    9361, 9361
                 )
             elif aircraft.callsign == "A4":
                 return DepartureFlight(
                     "A4", None, None, self.g2, self.s1, self.runway,
-                    time(2, 36, 1), time(2, 36, 1)
+                    9361, 9361
                 )
             elif aircraft.callsign == "A5":
                 return DepartureFlight(
                     "A5", None, None, self.g2, self.s1, self.runway,
-                    time(2, 36, 2), time(2, 36, 2)
+                    9362, 9362
                 )
 
     class RouteMock():
@@ -162,7 +199,7 @@ class TestScheduler(unittest.TestCase):
             self.routing_expert = TestScheduler.RoutingExpertMock(
                 g1, g2, s1, runway_start)
             self.clock = Clock()
-            self.clock.now = time(2, 30)
+            self.clock.now = 9000
 
         def set_quiet(self, logger):
             self.airport.set_quiet(logger)
@@ -190,6 +227,13 @@ class TestScheduler(unittest.TestCase):
             s.set_quiet(logging.getLogger("QUIET_MODE"))
             return s
 
+    def tearDown(self):
+        Config.params["scheduler"]["time_budget_ms"] = None
+        Config.params["scheduler"]["speculative_workers"] = 0
+        Config.params["scheduler"]["speculative_hold_ticks"] = 2
+        Config.params["scheduler"]["warm_start"] = False
+        Config.params["scheduler"]["trajectory_matrix"] = True
+
     def test_deterministic_scheduler_with_one_conflict(self):
 
         Config.params["scheduler"]["name"] = "deterministic_scheduler"
@@ -249,3 +293,377 @@ class TestScheduler(unittest.TestCase):
         self.assertEqual(iti2.targets[0], self.s1)
         self.assertEqual(iti2.targets[1], self.s1)
         self.assertEqual(iti2.targets[2], self.runway_start)
+
+    def test_reservation_scheduler_with_one_conflict(self):
+
+        Config.params["scheduler"]["name"] = "reservation_scheduler"
+        Config.params["simulation"]["time_unit"] = 30
+        Config.params["simulation"]["reschedule_cycle"] = 120
+
+        # Create mock objects, then schedule it
+        simulation = self.SimulationMock(
+            self.a1, self.a3, self.g1, self.g2, self.s1, self.runway_start)
+        scheduler = get_scheduler()
+        schedule = scheduler.schedule(simulation)
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+
+        self.assertEqual(len(schedule.itineraries), 2)
+        self.assertEqual(schedule.n_delay_added, 1)
+        self.assertEqual(schedule.n_unsolvable_conflicts, 0)
+
+        # a1 departs earlier so it's planned first and a3 waits at the gate
+        iti1 = schedule.itineraries[self.a1]
+        iti2 = schedule.itineraries[self.a3]
+
+        self.assertEqual(iti1.targets, [self.g1, self.s1, self.runway_start])
+        self.assertEqual(iti2.targets, [self.g2, self.g2, self.s1,
+                                        self.runway_start])
+        self.assertEqual(iti2.n_scheduler_delay, 1)
+        self.assertEqual(iti2.index, 0)
+
+    def test_deterministic_scheduler_over_time_budget(self):
+
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+        Config.params["scheduler"]["time_budget_ms"] = 0
+
+        # Out of time on the first conflict, so it's left unsolved
+        simulation = self.SimulationMock(
+            self.a1, self.a3, self.g1, self.g2, self.s1, self.runway_start)
+        scheduler = get_scheduler()
+        schedule = scheduler.schedule(simulation)
+
+        self.assertEqual(len(schedule.itineraries), 2)
+        self.assertEqual(schedule.n_delay_added, 0)
+        self.assertEqual(schedule.n_unsolvable_conflicts, 1)
+
+        iti2 = schedule.itineraries[self.a3]
+        self.assertEqual(iti2.targets, [self.g2, self.s1, self.runway_start])
+
+    def test_deterministic_scheduler_over_time_budget_with_conflicts_left(
+            self):
+
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+        Config.params["scheduler"]["time_budget_ms"] = 0
+        Config.params["simulation"]["time_unit"] = 30
+        Config.params["simulation"]["reschedule_cycle"] = 120
+
+        # a3 meets a1 at S1 then at the runway on the routes they're
+        # following
+        a1 = Aircraft("A1", None, self.g1, State.stop)
+        a3 = Aircraft("A3", None, self.g2, State.stop)
+        a1.set_itinerary(Itinerary([self.g1, self.s1, self.runway_start]))
+        a3.set_itinerary(Itinerary([self.g2, self.s1, self.runway_start]))
+        simulation = self.SimulationMock(
+            a1, a3, self.g1, self.g2, self.s1, self.runway_start)
+        simulation.airport = self.LocatedAirportMock(simulation, a1, a3)
+        scheduler = get_scheduler()
+        schedule = scheduler.schedule(simulation)
+
+        # Both keep the itineraries they're following. The prediction stops
+        # at the first tick, so only the conflict at S1 is found and left
+        # unsolved
+        self.assertEqual(schedule.itineraries, {})
+        self.assertEqual(schedule.n_delay_added, 0)
+        self.assertEqual(schedule.n_unsolvable_conflicts, 1)
+
+    def test_deterministic_scheduler_stays_within_time_budget(self):
+
+        from simulation import Simulation
+
+        params = deepcopy(Config.params)
+        with open(BASE_LINE_EXPERIMENT_PLAN_FILEPATH) as fin:
+            Config.params.update(yaml.load(fin))
+        Config.params["simulator"]["test_mode"] = True
+        Config.params["airport"] = "sfo-terminal-2"
+        Config.params["simulation"]["reschedule_cycle"] = 7200
+        try:
+            simulation = Simulation()
+
+            # Predicting the next two hours takes far longer than the budget
+            # even without any conflict
+            Config.params["scheduler"]["time_budget_ms"] = 10
+            start = time.time()
+            simulation.scheduler.schedule(simulation)
+            self.assertLess(time.time() - start, 0.1)
+        finally:
+            Config.params.clear()
+            Config.params.update(params)
+
+    def test_deterministic_scheduler_with_deadlock(self):
+
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+        Config.params["simulation"]["time_unit"] = 30
+        Config.params["simulation"]["reschedule_cycle"] = 120
+
+        # The aircrafts aren't close to each other where they block
+        Config.params["scheduler"]["trajectory_matrix"] = False
+
+        a1 = Aircraft("A1", None, self.g1, State.stop)
+        a3 = Aircraft("A3", None, self.g2, State.stop)
+        simulation = self.SimulationMock(
+            a1, a3, self.g1, self.g2, self.s1, self.runway_start)
+        simulation.airport = self.DeadlockAirportMock(simulation, a1, a3)
+        scheduler = get_scheduler()
+        with self.assertLogs(scheduler.logger, "WARNING") as logs:
+            schedule = scheduler.schedule(simulation)
+
+        # a3 waits for a1 at G2, then a1 would have to wait for a3: the
+        # deadlock is given up instead of delaying a1
+        self.assertTrue(any("Found deadlock" in line for line in logs.output))
+        self.assertEqual(schedule.n_unsolvable_conflicts, 1)
+        self.assertEqual(schedule.n_delay_added, 1)
+        self.assertEqual(schedule.itineraries[a1].targets,
+                         [self.g1, self.s1, self.runway_start])
+        self.assertEqual(schedule.itineraries[a3].targets,
+                         [self.g2, self.g2, self.s1, self.runway_start])
+
+    def test_reservation_scheduler_with_aircraft_held_on_route(self):
+
+        Config.params["scheduler"]["name"] = "reservation_scheduler"
+        Config.params["simulation"]["time_unit"] = 30
+        Config.params["simulation"]["reschedule_cycle"] = 120
+
+        # a4 (planned after a1) is held at S1 by the uncertainty on the tick
+        # a1 would get there
+        a1 = Aircraft("A1", None, self.g1, State.stop)
+        a4 = Aircraft("A4", None, self.s1, State.stop)
+        a4.set_itinerary(Itinerary([self.s1, self.runway_start]))
+        a4.add_uncertainty_delay()
+        simulation = self.SimulationMock(
+            a1, a4, self.g1, self.g2, self.s1, self.runway_start)
+        scheduler = get_scheduler()
+        schedule = scheduler.schedule(simulation)
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+
+        # a1 waits at G1 instead of running into a4
+        self.assertEqual(schedule.n_unsolvable_conflicts, 0)
+        self.assertEqual(schedule.n_delay_added, 1)
+        self.assertEqual(schedule.itineraries[a1].targets,
+                         [self.g1, self.g1, self.s1, self.runway_start])
+        self.assertEqual(schedule.itineraries[a4].targets,
+                         [self.s1, self.s1, self.runway_start])
+
+    def test_reservation_scheduler_over_time_budget(self):
+
+        Config.params["scheduler"]["name"] = "reservation_scheduler"
+        Config.params["scheduler"]["time_budget_ms"] = 0
+        Config.params["simulation"]["time_unit"] = 30
+        Config.params["simulation"]["reschedule_cycle"] = 120
+
+        # Out of time from the start, so the aircrafts take their routes
+        # without any wait
+        simulation = self.SimulationMock(
+            self.a1, self.a3, self.g1, self.g2, self.s1, self.runway_start)
+        scheduler = get_scheduler()
+        schedule = scheduler.schedule(simulation)
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+
+        self.assertEqual(len(schedule.itineraries), 2)
+        self.assertEqual(schedule.n_delay_added, 0)
+
+        # a3 meets a1 at S1 then at the runway
+        self.assertEqual(schedule.n_unsolvable_conflicts, 2)
+
+        iti2 = schedule.itineraries[self.a3]
+        self.assertEqual(iti2.targets, [self.g2, self.s1, self.runway_start])
+
+    def test_deterministic_scheduler_warm_start(self):
+
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+        Config.params["scheduler"]["warm_start"] = True
+
+        a1 = Aircraft("A1", None, self.g1, State.stop)
+        a3 = Aircraft("A3", None, self.g2, State.stop)
+        simulation = self.SimulationMock(
+            a1, a3, self.g1, self.g2, self.s1, self.runway_start)
+        scheduler = get_scheduler()
+        schedule = scheduler.schedule(simulation)
+        self.assertEqual(schedule.n_delay_added, 1)
+
+        simulation.airport.apply_schedule(schedule)
+        simulation.tick()
+
+        # a3 keeps waiting at the gate without resolving the conflict again
+        schedule = scheduler.schedule(simulation)
+        self.assertEqual(schedule.n_delay_added, 0)
+        self.assertEqual(schedule.itineraries[a3].targets,
+                         [self.g2, self.s1, self.runway_start])
+
+        # a1 is delayed by the uncertainty so it's scheduled again
+        a1.add_uncertainty_delay()
+        schedule = scheduler.schedule(simulation)
+        self.assertEqual(schedule.itineraries[a1].targets,
+                         [self.s1, self.s1, self.runway_start])
+        self.assertEqual(schedule.itineraries[a1].n_uncertainty_delay, 1)
+
+    def test_deterministic_scheduler_with_speculative_workers(self):
+
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+        Config.params["scheduler"]["speculative_workers"] = 1
+
+        a1 = Aircraft("A1", None, self.g1, State.stop)
+        a3 = Aircraft("A3", None, self.g2, State.stop)
+        simulation = self.SimulationMock(
+            a1, a3, self.g1, self.g2, self.s1, self.runway_start)
+        scheduler = get_scheduler()
+        schedule = scheduler.schedule(simulation)
+
+        # The branch delaying a1 instead adds as many delays, so the greedy
+        # schedule delaying a3 is kept
+        self.assertEqual(len(scheduler.branched_conflicts), 1)
+        self.assertEqual(schedule.n_delay_added, 1)
+        self.assertEqual(schedule.itineraries[a1].targets,
+                         [self.g1, self.s1, self.runway_start])
+        self.assertEqual(schedule.itineraries[a3].targets,
+                         [self.g2, self.g2, self.s1, self.runway_start])
+
+    def test_deterministic_scheduler_with_speculative_hold(self):
+
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+        Config.params["scheduler"]["speculative_workers"] = 2
+        Config.params["scheduler"]["speculative_hold_ticks"] = 2
+
+        a1 = Aircraft("A1", None, self.g1, State.stop)
+        a3 = Aircraft("A3", None, self.g2, State.stop)
+        simulation = self.SimulationMock(
+            a1, a3, self.g1, self.g2, self.s1, self.runway_start)
+        scheduler = get_scheduler()
+        schedule = scheduler.schedule(simulation)
+
+        # The branch holding a3 for two ticks adds more delays, so the greedy
+        # schedule is kept
+        self.assertEqual({kind for _, kind in scheduler.branched_conflicts},
+                         {scheduler.FLIP, scheduler.HOLD})
+        self.assertEqual(schedule.n_delay_added, 1)
+        self.assertEqual(schedule.itineraries[a3].targets,
+                         [self.g2, self.g2, self.s1, self.runway_start])
+
+    def test_deterministic_scheduler_kills_branches_over_time(self):
+
+        Config.params["scheduler"]["name"] = "deterministic_scheduler"
+
+        def get_schedule(scheduler):
+            a1 = Aircraft("A1", None, self.g1, State.stop)
+            a3 = Aircraft("A3", None, self.g2, State.stop)
+            simulation = self.SimulationMock(
+                a1, a3, self.g1, self.g2, self.s1, self.runway_start)
+            schedule = scheduler.schedule(simulation)
+            return (schedule.n_delay_added, schedule.n_unsolvable_conflicts,
+                    {aircraft.callsign: itinerary.targets
+                     for aircraft, itinerary in schedule.itineraries.items()})
+
+        expected = get_schedule(get_scheduler())
+
+        # The branches never send their schedules back
+        def hang(schedule):
+            time.sleep(60)
+            os._exit(0)
+
+        Config.params["scheduler"]["speculative_workers"] = 2
+        scheduler = get_scheduler()
+        scheduler._Scheduler__end_branch = hang
+        start = time.time()
+        schedule = get_schedule(scheduler)
+
+        # They're killed long before and the conflict is resolved here
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(len(scheduler.branched_conflicts), 2)
+        self.assertEqual(schedule, expected)
+        with self.assertRaises(ChildProcessError):
+            os.waitpid(-1, os.WNOHANG)
+
+    def test_reservation_scheduler_on_simple_scenario(self):
+
+        # The simulation isn't aborted by any conflict and reschedules every
+        # 30 minutes from 00:00 to 23:00
+        schedules = self.__run_simulation("simple", 1800, True, True,
+                                          "reservation_scheduler")
+        self.assertEqual(len(schedules), 23 * 2 + 1)
+        self.assertTrue(all(n_unsolvable == 0
+                            for _, n_unsolvable, _ in schedules))
+        self.assertTrue(sum(n_delay for n_delay, _, _ in schedules) > 0)
+
+    def test_same_schedules_on_shipped_scenarios(self):
+
+        # MD5 of the schedules given by the scheduler before the incremental
+        # prediction, the trajectory matrix and the warm start were added
+        expected_digests = {
+            ("simple", 120): "a7260c669728348cd2d65df7dbe7c2eb",
+            ("simple", 1800): "f302f4b222e9c1949a807279d5bd4146",
+            ("sfo-terminal-2", 120): "33a89153d72d1e560b1b9aca8105b735",
+        }
+
+        # Resuming the prediction after a conflict is resolved, skipping the
+        # ticks without conflicts found by the trajectory matrix and keeping
+        # the itineraries followed without conflicts (warm start) give the
+        # same schedules as restarting the prediction from the beginning,
+        # looking for conflicts on every tick and scheduling every aircraft
+        # again
+        for (airport, reschedule_cycle), digest in expected_digests.items():
+            with self.subTest(airport=airport,
+                              reschedule_cycle=reschedule_cycle):
+                expected = self.__run_simulation(airport, reschedule_cycle,
+                                                 False, False)
+                self.assertEqual(
+                    hashlib.md5(repr(expected).encode()).hexdigest(), digest)
+                for options in [(True, False), (False, True), (True, True)]:
+                    self.assertEqual(self.__run_simulation(
+                        airport, reschedule_cycle, *options), expected)
+                self.assertEqual(self.__run_simulation(
+                    airport, reschedule_cycle, True, True,
+                    warm_start=True), expected)
+
+    @classmethod
+    def __run_simulation(cls, airport, reschedule_cycle,
+                         incremental_prediction, trajectory_matrix,
+                         scheduler_name="deterministic_scheduler",
+                         warm_start=False):
+
+        from simulation import Simulation, SimulationException
+        from clock import ClockException
+
+        # Runs on the base plan as other tests may have changed the config
+        params = deepcopy(Config.params)
+        with open(BASE_LINE_EXPERIMENT_PLAN_FILEPATH) as fin:
+            Config.params.update(yaml.load(fin))
+        Config.params["simulator"]["test_mode"] = True
+        Config.params["airport"] = airport
+        Config.params["simulation"]["reschedule_cycle"] = reschedule_cycle
+        Config.params["simulation"]["end_time"] = "23:00"
+        Config.params["scheduler"]["incremental_prediction"] = \
+            incremental_prediction
+        Config.params["scheduler"]["trajectory_matrix"] = trajectory_matrix
+        Config.params["scheduler"]["name"] = scheduler_name
+        Config.params["scheduler"]["warm_start"] = warm_start
+
+        schedules = []
+        try:
+            simulation = Simulation()
+            scheduler = simulation.scheduler
+
+            class SchedulerSpy():
+
+                def schedule(self, simulation):
+                    schedule = scheduler.schedule(simulation)
+                    schedules.append((
+                        schedule.n_delay_added,
+                        schedule.n_unsolvable_conflicts,
+                        sorted(
+                            (aircraft.callsign,
+                             [(target.geo_pos["lat"], target.geo_pos["lng"])
+                              for target in itinerary.targets])
+                            for aircraft, itinerary
+                            in schedule.itineraries.items())
+                    ))
+                    return schedule
+
+            simulation.scheduler = SchedulerSpy()
+            while True:
+                simulation.tick()
+        except (ClockException, SimulationException):
+            pass
+        finally:
+            Config.params.clear()
+            Config.params.update(params)
+
+        return schedules
@@ -1,6 +1,5 @@
 #!/usr/bin/env python
 
-from datetime import time
 from config import Config
 from simulation import Simulation
 from clock import ClockException
@@ -28,7 +27,7 @@ class TestSimulation(unittest.TestCase):
         simulation = Simulation()
 
         self.assertEqual(len(simulation.airport.aircrafts), 0)
-        self.assertEqual(simulation.now, time(0, 0))
+        self.assertEqual(simulation.now, 0)
 
     def test_add_aircrafts(self):
 
@@ -149,3 +148,41 @@ class TestSimulation(unittest.TestCase):
         self.assertEqual(len(simulation.airport.gate_queue[f1.from_gate]), 1)
         self.assertTrue(f2.aircraft in
                         simulation.airport.gate_queue[f1.from_gate])
+
+    def test_copy(self):
+
+        simulation = Simulation()
+
+        # Ticks til some aircrafts are moving with itineraries
+        while not any(aircraft.itinerary
+                      for aircraft in simulation.airport.aircrafts):
+            simulation.tick()
+
+        locations = {aircraft: aircraft.location
+                     for aircraft in simulation.airport.aircrafts}
+        indexes = {aircraft: aircraft.itinerary.index
+                   for aircraft in simulation.airport.aircrafts
+                   if aircraft.itinerary}
+
+        cloned = simulation.copy
+        self.assertIs(cloned.airport.surface, simulation.airport.surface)
+        for _ in range(5):
+            cloned.pre_tick()
+            for aircraft in cloned.airport.aircrafts:
+                aircraft.add_scheduler_delay()
+            cloned.tick()
+            cloned.post_tick()
+
+        # The source simulation is not changed by the clone
+        self.assertEqual(cloned.now,
+                         simulation.now + 5 * simulation.clock.sim_time)
+        for aircraft in simulation.airport.aircrafts:
+            self.assertIs(aircraft.location_index,
+                          simulation.airport.aircraft_index)
+            self.assertEqual(aircraft.location, locations[aircraft])
+            if aircraft.itinerary:
+                self.assertEqual(aircraft.itinerary.index, indexes[aircraft])
+                self.assertEqual(aircraft.itinerary.n_scheduler_delay, 0)
+        for aircraft in cloned.airport.aircrafts:
+            self.assertIs(aircraft.location_index,
+                          cloned.airport.aircraft_index)
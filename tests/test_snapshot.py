@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+from node import Node
+from airport import Airport
+from aircraft import Aircraft, State
+from itinerary import Itinerary
+from snapshot import Snapshot
+from config import Config
+
+import sys
+import unittest
+sys.path.append('..')
+
+
+class TestSnapshot(unittest.TestCase):
+
+    Config.params["simulator"]["test_mode"] = True
+
+    n1 = Node("N1", {"lat": 47.822000, "lng": -122.079057})
+    n2 = Node("N2", {"lat": 47.822000, "lng": -122.078057})
+
+    def test_computed_once(self):
+
+        airport = Airport.create("simple")
+        a1 = Aircraft("A1", None, self.n1, State.stop)
+        a1.set_itinerary(Itinerary([self.n1, self.n2]))
+        a1.add_scheduler_delay()
+        a2 = Aircraft("A2", None, self.n1, State.stop)
+        airport.add_aircraft(a1)
+        airport.add_aircraft(a2)
+
+        snapshot = Snapshot(airport, None)
+
+        for _ in range(3):
+            self.assertEqual(len(snapshot.conflicts), 1)
+            self.assertEqual(snapshot.get_state(a1), State.hold)
+            self.assertEqual(snapshot.get_state(a2), State.stop)
+            self.assertEqual(snapshot.get_delay(a2), (False, False))
+
+        self.assertEqual(snapshot.misses["conflicts"], 1)
+        self.assertEqual(snapshot.hits["conflicts"], 2)
+        self.assertEqual(snapshot.misses["state"], 2)
+        self.assertEqual(snapshot.hits["state"], 4)
+        self.assertEqual(snapshot.misses["delay"], 1)
+        self.assertEqual(snapshot.hits["delay"], 2)
+
+        # Changes made afterwards aren't seen within the same tick
+        airport.tick()
+        self.assertEqual(snapshot.get_state(a1), State.hold)
+        self.assertEqual(Snapshot(airport, None).get_state(a1), State.moving)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+import random
+from node import Node
+from projection import Projection
+from spatial_index import SpatialIndex, SegmentIndex
+from config import Config
+
+import sys
+import unittest
+sys.path.append('..')
+
+
+class TestSpatialIndex(unittest.TestCase):
+
+    CENTER = {"lat": 37.61678035, "lng": -122.37791105}
+
+    n1 = Node("N1", {"lat": 37.616780, "lng": -122.377911})
+    n2 = Node("N2", {"lat": 37.616790, "lng": -122.377921})
+    n3 = Node("N3", {"lat": 37.617780, "lng": -122.377911})
+
+    def setUp(self):
+        Projection.set_origin(self.CENTER)
+        Config.params["simulation"]["close_node_threshold"] = 30
+
+    def test_add_and_remove(self):
+
+        index = SpatialIndex()
+        index.add("A1", self.n1)
+        index.add("A2", self.n3)
+
+        self.assertEqual(len(index), 2)
+        self.assertTrue("A1" in index)
+        self.assertEqual(index.get_close_items(self.n2), ["A1"])
+
+        index.remove("A1")
+        self.assertFalse("A1" in index)
+        self.assertEqual(index.get_close_items(self.n2), [])
+        self.assertFalse(index.has_close_item(self.n1))
+
+        # Removing an unknown item is a no-op
+        index.remove("A1")
+        self.assertEqual(len(index), 1)
+
+    def test_update(self):
+
+        index = SpatialIndex()
+        index.add("A1", self.n3)
+        self.assertFalse(index.has_close_item(self.n1))
+
+        index.update("A1", self.n1)
+        self.assertTrue(index.has_close_item(self.n1))
+        self.assertFalse(index.has_close_item(self.n3))
+        self.assertEqual(len(index.cells), 1)
+
+        index.update("A1", None)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(len(index.cells), 0)
+
+    def test_is_close_to(self):
+
+        index = SpatialIndex()
+        index.add("A1", self.n1)
+
+        self.assertTrue(index.is_close_to("A1", self.n2))
+        self.assertFalse(index.is_close_to("A1", self.n3))
+        self.assertFalse(index.is_close_to("A2", self.n1))
+
+    def test_same_as_linear_scan(self):
+
+        rand = random.Random(0)
+        nodes = [
+            Node("N%d" % i, {
+                "lat": self.CENTER["lat"] + rand.uniform(-0.002, 0.002),
+                "lng": self.CENTER["lng"] + rand.uniform(-0.002, 0.002)
+            })
+            for i in range(300)
+        ]
+
+        index = SpatialIndex()
+        for node in nodes:
+            index.add(node.name, node)
+
+        for node in nodes[:50]:
+            expected = sorted(n.name for n in nodes if n.is_close_to(node))
+            self.assertEqual(sorted(index.get_close_items(node)), expected)
+
+    def test_segment_index(self):
+
+        index = SegmentIndex()
+        index.add("S1", self.n1, self.n3, 20)
+
+        # n2 is about 3 feets away from the segment between n1 and n3
+        far = Node("N4", {"lat": 37.617280, "lng": -122.376911})
+        self.assertEqual(index.get_candidates(self.n2), ["S1"])
+        self.assertEqual(index.get_candidates(far), [])
+        self.assertEqual(len(index), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+import random
+from node import Node
+from airport import Airport
+from aircraft import Aircraft, State
+from itinerary import Itinerary
+from trajectory_matrix import TrajectoryMatrix
+from config import Config
+
+import sys
+import unittest
+sys.path.append('..')
+
+
+class TestTrajectoryMatrix(unittest.TestCase):
+
+    Config.params["simulator"]["test_mode"] = True
+
+    N_TICKS = 40
+
+    def test_same_as_next_conflicts(self):
+
+        rand = random.Random(0)
+        airport = Airport.create("simple")
+
+        # A small grid so that aircrafts meet each other often
+        nodes = [Node("G%d" % i, {"lat": 47.822 + (i // 4) * 0.0002,
+                                  "lng": -122.079 + (i % 4) * 0.0002})
+                 for i in range(16)]
+
+        for i in range(8):
+            targets = [rand.choice(nodes)
+                       for _ in range(rand.randint(1, self.N_TICKS))]
+            aircraft = Aircraft("A%d" % i, None, targets[0], State.stop)
+            if i > 0:
+                aircraft.set_itinerary(Itinerary(targets))
+            airport.add_aircraft(aircraft)
+
+        trajectory = TrajectoryMatrix(airport.aircrafts, 0, self.N_TICKS - 1)
+        self.assertTrue(trajectory.is_tracking(airport.aircrafts))
+
+        n_close_ticks = 0
+        for tick in range(self.N_TICKS):
+
+            # Delays are added like the scheduler does
+            if tick % 7 == 3:
+                aircraft = rand.choice(airport.aircrafts[1:])
+                aircraft.add_scheduler_delay()
+                trajectory.update(aircraft, tick)
+
+            is_close = bool(airport.next_conflicts)
+            self.assertEqual(trajectory.is_close_at(tick), is_close)
+            n_close_ticks += is_close
+            airport.tick()
+
+        # Makes sure both cases are covered
+        self.assertTrue(0 < n_close_ticks < self.N_TICKS)
+
+
+if __name__ == '__main__':
+    unittest.main()
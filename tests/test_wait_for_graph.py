@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+from node import Node
+from aircraft import Aircraft, State
+from wait_for_graph import WaitForGraph
+from config import Config
+
+import sys
+import unittest
+sys.path.append('..')
+
+
+class TestWaitForGraph(unittest.TestCase):
+
+    Config.params["simulator"]["test_mode"] = True
+
+    n1 = Node("N1", {"lat": 47.722000, "lng": -122.079057})
+
+    a1 = Aircraft("A1", None, n1, State.stop)
+    a2 = Aircraft("A2", None, n1, State.stop)
+    a3 = Aircraft("A3", None, n1, State.stop)
+
+    def test_add(self):
+
+        waits = WaitForGraph()
+        self.assertIsNone(waits.add(self.a1, self.a2))
+        self.assertIsNone(waits.add(self.a2, self.a3))
+
+        # Waiting for the same aircraft again is fine
+        self.assertIsNone(waits.add(self.a1, self.a2))
+        self.assertEqual(waits.waiters, [self.a1, self.a2])
+
+        # a3 -> a1 -> a2 -> a3
+        self.assertEqual(waits.add(self.a3, self.a1),
+                         [self.a3, self.a1, self.a2])
+        self.assertEqual(waits.waiters, [self.a1, self.a2])
+
+    def test_release(self):
+
+        waits = WaitForGraph()
+        waits.add(self.a1, self.a2)
+        self.assertEqual(waits.add(self.a2, self.a1), [self.a2, self.a1])
+
+        # a1 moves on, so a2 can wait for it
+        waits.release(self.a1)
+        self.assertIsNone(waits.add(self.a2, self.a1))
+        self.assertEqual(waits.waiters, [self.a2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""Class file for `TrajectoryMatrix`."""
+import math
+import numpy
+
+from config import Config
+from projection import Projection
+
+
+class TrajectoryMatrix:
+    """`TrajectoryMatrix` expands the itineraries of a set of aircrafts into
+    the locations they will be heading to (`Aircraft.next_location`) on each
+    tick from `start_tick` to `end_tick`, assuming no more delays are added.
+    Rows are ticks and columns are aircrafts; the projected coordinates are
+    kept in a (ticks x aircrafts x 2) array so the separation of all the pairs
+    over the whole horizon is checked with a few NumPy operations instead of
+    one conflict lookup per tick.
+
+    Like `SpatialIndex`, the vectorised pass only finds candidates using a
+    threshold inflated by the error bound of the projection; candidates are
+    checked with `Node.is_close_to`, so a tick is reported close if and only
+    if `Airport.next_conflicts` finds a conflict among these aircrafts.
+    """
+
+    # Maximum number of pair distances computed at once
+    MAX_CHUNK_SIZE = 1 << 20
+
+    def __init__(self, aircrafts, start_tick, end_tick):
+
+        self.aircrafts = list(aircrafts)
+        self.start_tick = start_tick
+        self.end_tick = end_tick
+
+        n_ticks = end_tick - start_tick + 1
+        self.nodes = [[None] * n_ticks for _ in self.aircrafts]
+        self.xy = numpy.zeros((n_ticks, len(self.aircrafts), 2))
+
+        for column, aircraft in enumerate(self.aircrafts):
+            self.__expand(column, aircraft, 0)
+
+        # First tick (from `checked_tick`) found close; None if there isn't
+        self.checked_tick = start_tick
+        self.close_tick = self.__find_close_tick(start_tick)
+
+    def is_tracking(self, aircrafts):
+        """Returns true if this matrix is built on the given aircrafts (in the
+        same order).
+        """
+        if len(aircrafts) != len(self.aircrafts):
+            return False
+        for aircraft, tracked in zip(aircrafts, self.aircrafts):
+            if aircraft is not tracked:
+                return False
+        return True
+
+    def update(self, aircraft, tick):
+        """Expands the itinerary of the given aircraft again from `tick`; it's
+        called after the itinerary is changed at that tick.
+        """
+        column = next(i for i, tracked in enumerate(self.aircrafts)
+                      if tracked is aircraft)
+        self.__expand(column, aircraft, tick - self.start_tick)
+        self.checked_tick = tick
+        self.close_tick = self.__find_close_tick(tick)
+
+    def is_close_at(self, tick):
+        """Returns true if any two aircrafts will be heading to close locations
+        at the given tick.
+        """
+        if tick < self.checked_tick or \
+           (self.close_tick is not None and tick > self.close_tick):
+            self.checked_tick = tick
+            self.close_tick = self.__find_close_tick(tick)
+        return self.close_tick == tick
+
+    def __expand(self, column, aircraft, first_row):
+
+        nodes = self.nodes[column]
+        itinerary = aircraft.itinerary
+        location = aircraft.location
+
+        if itinerary is not None:
+            length = itinerary.length
+            index = itinerary.index
+        for row in range(first_row, len(nodes)):
+            if itinerary is None:
+                nodes[row] = location
+                continue
+            # Mirrors `Aircraft.tick` and `Aircraft.next_location`
+            if row > first_row and index < length:
+                index += 1
+                if index < length:
+                    location = itinerary.targets[index]
+            nodes[row] = itinerary.targets[index + 1] \
+                if index < length - 1 else location
+
+        self.xy[first_row:, column] = [node.xy for node in nodes[first_row:]]
+
+    def __find_close_tick(self, tick):
+
+        n_aircrafts = len(self.aircrafts)
+        if n_aircrafts < 2:
+            return None
+
+        # Inflates the threshold by the error bound of the projection and the
+        # rounding of the distances
+        threshold = Config.params["simulation"]["close_node_threshold"]
+        radius = numpy.abs(self.xy).max() * math.sqrt(2) + threshold
+        reach = threshold * (1 + 2 * Projection.max_relative_error(radius)) \
+            + 1e-6
+
+        upper = numpy.triu(numpy.ones((n_aircrafts, n_aircrafts), dtype=bool),
+                           1)
+        chunk_size = max(1, self.MAX_CHUNK_SIZE // (n_aircrafts ** 2))
+
+        first_row = tick - self.start_tick
+        for chunk_start in range(first_row, len(self.xy), chunk_size):
+            xy = self.xy[chunk_start:chunk_start + chunk_size]
+            delta = xy[:, :, numpy.newaxis, :] - xy[:, numpy.newaxis, :, :]
+            candidates = ((delta ** 2).sum(axis=3) < reach ** 2) & upper
+            for row in numpy.flatnonzero(candidates.any(axis=(1, 2))):
+                row_nodes = [nodes[chunk_start + row] for nodes in self.nodes]
+                for i, j in zip(*numpy.nonzero(candidates[row])):
+                    if row_nodes[i].is_close_to(row_nodes[j]):
+                        return self.start_tick + chunk_start + row
+        return None
+
+    def __repr__(self):
+        return "<TrajectoryMatrix: %d aircrafts from tick %d to %d>" % (
+            len(self.aircrafts), self.start_tick, self.end_tick)
@@ -1,14 +1,17 @@
 """A collection of global helper functions."""
 
 
-def str2time(time_str):
-    """Converts a string containing time information into a time object."""
+def str2seconds(time_str):
+    """Converts a "HHMM" string into the seconds since 00:00."""
+    return int(time_str[0:2]) * 3600 + int(time_str[2:4]) * 60
 
-    from datetime import time
-    hours = int(time_str[0:2])
-    mins = int(time_str[2:4])
 
-    return time(hours, mins)
+def format_seconds(seconds):
+    """Formats the seconds since 00:00 of the first day into "HH:MM:SS". The
+    hours go beyond 23 for the following days.
+    """
+    return "%02d:%02d:%02d" % (seconds // 3600, seconds // 60 % 60,
+                               seconds % 60)
 
 
 def is_valid_geo_pos(geo_pos):
@@ -22,42 +25,12 @@ def is_valid_geo_pos(geo_pos):
     return True
 
 
-def get_seconds_after(time, delta_time):
-    """Since time calculation only works on datetime (not time), so we first
-    combine self.time with today, then get the time() part. Note that if
-    overflow occurs, the output will be earlier
-    """
-    from datetime import date, datetime, timedelta
-    holder = datetime.combine(date.today(), time)
-    res = (holder + timedelta(seconds=delta_time)).time()
-    return res
-
-
-def get_seconds_before(time, delta_time):
-    """Gets `delta_time` before the given `time`."""
-    from datetime import date, datetime, timedelta
-    holder = datetime.combine(date.today(), time)
-    res = (holder - timedelta(seconds=delta_time)).time()
-    return res
-
-
 def str2sha1(data):
     """Returns the SHA-1 hash value of a given string data."""
     import hashlib
     return int(hashlib.sha1(data.encode('utf-8')).hexdigest(), 16)
 
 
-def get_seconds(time):
-    """Gets the total seconds in a time object."""
-    return (time.hour * 60 + time.minute) * 60 + time.second
-
-
-def get_time_delta(from_time, to_time):
-    """Returns the time gap between `from_time` and `to_time` in seconds."""
-    return to_time.hour * 60 * 60 + to_time.minute * 60 + to_time.second -\
-        from_time.hour * 60 * 60 + from_time.minute * 60 + from_time.second
-
-
 def random_string(length):
     """Gets a random string with a fixed length."""
     import string
@@ -0,0 +1,54 @@
+"""Class file for `WaitForGraph`."""
+
+
+class WaitForGraph:
+    """`WaitForGraph` keeps which aircraft is waiting for which other one:
+    an edge from `waiter` to `holder` is added when the scheduler delays
+    `waiter` to resolve its conflict with `holder`, and it's removed once
+    `waiter` moves on. A cycle means the aircrafts are waiting for each other
+    (e.g. two aircrafts heading to each other on a taxiway), which no amount
+    of delays can resolve.
+    """
+
+    def __init__(self):
+        # edges[waiter] = {holder: None, ...} (ordered for determinism)
+        self.edges = {}
+
+    def add(self, waiter, holder):
+        """Adds an edge from `waiter` to `holder` unless it closes a cycle;
+        returns the aircrafts on the cycle (starting from `waiter`) if it does,
+        or None.
+        """
+        path = self.__find_path(holder, waiter)
+        if path is not None:
+            return [waiter] + path[:-1]
+        self.edges.setdefault(waiter, {})[holder] = None
+        return None
+
+    def release(self, waiter):
+        """Removes the edges of an aircraft which is not waiting anymore."""
+        self.edges.pop(waiter, None)
+
+    @property
+    def waiters(self):
+        """Returns the aircrafts waiting for others."""
+        return list(self.edges)
+
+    def __find_path(self, src, dst):
+
+        # Depth-first search from `src`; returns the path to `dst` if found
+        stack = [(src, [src])]
+        visited = set()
+        while stack:
+            node, path = stack.pop()
+            if node == dst:
+                return path
+            if node in visited:
+                continue
+            visited.add(node)
+            for holder in reversed(list(self.edges.get(node, ()))):
+                stack.append((holder, path + [holder]))
+        return None
+
+    def __repr__(self):
+        return "<WaitForGraph: %d waiters>" % len(self.edges)